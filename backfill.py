@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import requests
+
+import homework
+from decoding import HomeworkRecord
+from event_store import timestamp
+from exceptions import (TheAnswerIsNot200Error, TheBackfillNotFetchedError,
+                        TheRateLimitError)
+from state_store import StateStore
+from status_cache import StatusCache
+
+
+class Backfill:
+    """Восстановление истории статусов подписчика за период.
+
+    API отдаёт каждую домашку, обновлённую после from_date, один раз и
+    только с последним статусом, поэтому запросы по окнам from_date
+    историю не восстанавливают: каждое окно вернуло бы то же, что один
+    запрос с from_date=start. Промежуточные статусы берутся из журнала
+    событий бота events (EventStore), а один запрос к API добавляет
+    последние статусы домашек, смены которых бот не записал.
+    Пересечения журнала и ответа убираются при слиянии.
+    """
+
+    def __init__(self, token, url=homework.ENDPOINT, attempts=5, backoff=1,
+                 fetch=None, events=None):
+        self.token = token
+        self.url = url
+        self.attempts = attempts
+        self.backoff = backoff
+        self.fetch = fetch or homework.fetch_api_answer
+        self.events = events
+        self.requests = 0
+
+    def _request(self, start):
+        for attempt in range(self.attempts):
+            self.requests += 1
+            try:
+                return self.fetch(
+                    self.url, start, self.token,
+                    decode=homework.API_DECODER.decode)
+            except TheRateLimitError as error:
+                time.sleep(error.retry_after or self.backoff)
+                continue
+            except (TheAnswerIsNot200Error, requests.RequestException,
+                    ValueError) as error:
+                logging.warning('Запрос с %s: %s', start, error,
+                                extra={'window': start,
+                                       'error': type(error).__name__})
+            time.sleep(self.backoff * 2 ** attempt)
+        raise TheBackfillNotFetchedError(
+            f'Ответ API с {start} не получен за {self.attempts} попыток')
+
+    def latest(self, start, end):
+        """Последние статусы домашек, обновлённых в [start, end)."""
+        response = self._request(start)
+        for error in response.get('errors', ()):
+            logging.error('Ответ API с %s: %s', start, error,
+                          extra={'window': start,
+                                 'error': type(error).__name__})
+        records = []
+        for record in homework.get_homeworks(response):
+            updated = timestamp(record.date_updated, None)
+            if updated is None or start <= updated < end:
+                records.append(record)
+        return records
+
+    def recorded(self, start, end):
+        """Смены статусов в [start, end) из журнала событий бота."""
+        if self.events is None:
+            return []
+        return [HomeworkRecord(key, name, status, updated)
+                for key, name, status, updated
+                in self.events.history(self.token, start, end)]
+
+    def run(self, start, end):
+        """Упорядоченный журнал событий и статистика прогона."""
+        began = time.perf_counter()
+        recorded = self.recorded(start, end)
+        latest = self.latest(start, end)
+        events = {}
+        for record in latest + recorded:
+            key = (StatusCache.homework_key(record), record.status,
+                   timestamp(record.date_updated, 0))
+            events.setdefault(key, record)
+        log = sorted(
+            events.values(),
+            key=lambda record: (timestamp(record.date_updated, 0),
+                                StatusCache.homework_key(record)))
+        return log, {
+            'requests': self.requests,
+            'recorded': len(recorded),
+            'events': len(log),
+            'seconds': time.perf_counter() - began,
+        }
+
+
+def write_events(events, file):
+    """Журнал событий строками JSON в порядке date_updated."""
+    for record in events:
+        file.write(json.dumps({
+            key: record.get(key) for key in record.FIELDS},
+            ensure_ascii=False) + '\n')
+
+
+def main(start, end=None, path=None):
+    """Бэкфилл истории PRACTICUM_TOKEN: даты YYYY-MM-DD.
+
+    Журнал событий берётся из STATE_FILE, если он есть.
+    """
+    begin = datetime.fromisoformat(start).timestamp()
+    finish = (datetime.fromisoformat(end).timestamp() if end
+              else time.time())
+    store = None
+    if os.path.exists(homework.STATE_FILE):
+        store = StateStore(homework.STATE_FILE)
+    try:
+        events, stats = Backfill(
+            homework.PRACTICUM_TOKEN,
+            events=store.events if store is not None else None,
+        ).run(begin, finish)
+    finally:
+        if store is not None:
+            store.close()
+    if path:
+        with open(path, 'w', encoding='utf-8') as file:
+            write_events(events, file)
+    else:
+        write_events(events, sys.stdout)
+    logging.info('Бэкфилл: запросов к API %s, из журнала %s, событий %s, '
+                 '%.2f с', stats['requests'], stats['recorded'],
+                 stats['events'], stats['seconds'])
+
+
+if __name__ == '__main__':
+    listener = homework.configure_logging()
+    try:
+        main(*sys.argv[1:])
+    finally:
+        listener.stop()
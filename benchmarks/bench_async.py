@@ -0,0 +1,63 @@
+"""Пропускная способность опросов (polls/sec): sync против async.
+
+Запуск: python benchmarks/bench_async.py [опросов] [задержка_сервера_с]
+"""
+import asyncio
+import logging
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from mock_server import start_server  # noqa: E402
+from subscriptions import Subscription  # noqa: E402
+
+
+class FakeBot:
+    """Бот, который никуда не отправляет сообщения."""
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+def bench_sync(url, subscriptions):
+    bot = FakeBot()
+    start = time.perf_counter()
+    for subscription in subscriptions:
+        homework.check_subscription(bot, subscription, url)
+    return time.perf_counter() - start
+
+
+async def bench_async(url, subscriptions, concurrency):
+    bot = FakeBot()
+    limits = homework.AsyncLimits(polls=concurrency, sends=concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        homework.async_check_subscription(limits, bot, subscription, url)
+        for subscription in subscriptions))
+    elapsed = time.perf_counter() - start
+    limits.shutdown()
+    return elapsed
+
+
+def main(count=200, delay=0.02):
+    logging.disable(logging.CRITICAL)
+    server, url = start_server(delay=delay)
+    subscriptions = [
+        Subscription(f'token-{number}', number) for number in range(count)]
+    elapsed = bench_sync(url, subscriptions)
+    print(f'sync: {count / elapsed:.1f} polls/sec')
+    for concurrency in (8, 32, 64):
+        elapsed = asyncio.run(bench_async(url, subscriptions, concurrency))
+        print(f'async, concurrency={concurrency}: '
+              f'{count / elapsed:.1f} polls/sec')
+    stats = homework.get_session().connection_stats()
+    print(f'соединений открыто: {stats["opened"]}, '
+          f'переиспользовано: {stats["reused"]}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]))
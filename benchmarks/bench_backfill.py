@@ -0,0 +1,61 @@
+"""Бэкфилл года истории против локального заменителя API.
+
+API отдаёт только последний статус домашки, поэтому бэкфилл делает один
+запрос, а промежуточные статусы берёт из журнала событий бота. В журнале
+записаны смены статусов половины домашек - как у бота, запущенного
+посреди года. Отчёт: запросов к API, событий и время прогона.
+
+Запуск: python benchmarks/bench_backfill.py [задержка API, мс]
+"""
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+os.environ.setdefault('HTTP_RETRIES', '0')
+
+from backfill import Backfill  # noqa: E402
+from event_store import EventStore  # noqa: E402
+from fake_services import FakePracticum  # noqa: E402
+
+DAY = 24 * 60 * 60
+
+
+def make_timeline(start, end, homeworks=200, seed=1):
+    rng = random.Random(seed)
+    timeline = []
+    for number in range(1, homeworks + 1):
+        taken = rng.uniform(start, end - DAY)
+        timeline.append((taken, number, f'hw-{number}', 'reviewing'))
+        timeline.append((taken + rng.uniform(60, DAY), number,
+                         f'hw-{number}', rng.choice(('approved', 'rejected'))))
+    return timeline
+
+
+def main(latency=20):
+    logging.disable(logging.CRITICAL)
+    end = int(time.time())
+    start = end - 365 * DAY
+    timeline = make_timeline(start, end)
+    journal = EventStore(sqlite3.connect(':memory:'))
+    middle = (start + end) / 2
+    with journal.connection:
+        journal.append(
+            [('token', str(number), name, status, moment)
+             for moment, number, name, status in timeline
+             if moment >= middle], 0)
+    practicum = FakePracticum({'token': timeline}, latency=latency / 1000)
+    url = practicum.start()
+    events, stats = Backfill('token', url, events=journal).run(start, end)
+    practicum.stop()
+    print(f'запросов к API {practicum.requests}, из журнала '
+          f'{stats["recorded"]}, событий {stats["events"]}, '
+          f'{stats["seconds"]:.3f} с')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""Общий бюджет запросов к API на 10 000 подписчиков.
+
+Симуляция на виртуальных часах: 10% подписчиков ждут ревью, остальные
+опрашиваются раз в RETRY_TIME. Для нескольких бюджетов (запросов в
+минуту) отчёт: цена одного решения планировщика, опросов в минуту и
+наибольшая пауза между опросами одного подписчика (устаревание).
+
+Запуск: python benchmarks/bench_budget.py [подписчиков] [часов]
+"""
+import logging
+import statistics
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from subscriptions import (AdaptivePolicy, PollScheduler,  # noqa: E402
+                           SubscriptionRegistry, request_budget)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(subscribers, hours, per_minute):
+    clock = FakeClock()
+    registry = SubscriptionRegistry()
+    for number in range(subscribers):
+        registry.add(f'token-{number}', number).reviewing = (
+            number % 10 == 0)
+    last = {subscription.token: 0.0 for subscription in registry}
+    staleness = dict.fromkeys(last, 0.0)
+
+    def poll(subscription):
+        token = subscription.token
+        staleness[token] = max(staleness[token], clock.now - last[token])
+        last[token] = clock.now
+
+    budget = request_budget(per_minute, clock) if per_minute else None
+    scheduler = PollScheduler(
+        registry, poll, 600, AdaptivePolicy(600, 120, 1800, 10 ** 6),
+        clock=clock, budget=budget)
+    end = hours * 60 * 60
+    polls = 0
+    spent = 0.0
+    while clock.now < end:
+        started = time.perf_counter()
+        polls += scheduler.run_pending()
+        delay = scheduler.delay()
+        spent += time.perf_counter() - started
+        clock.now += max(delay, 0.01)
+    for token, moment in last.items():
+        staleness[token] = max(staleness[token], end - moment)
+    return polls, spent, staleness
+
+
+def report(name, values):
+    values = sorted(values)
+    return (f'{name}: p50 {statistics.median(values) / 60:5.1f} мин, '
+            f'max {values[-1] / 60:5.1f} мин')
+
+
+def main(subscribers=10000, hours=2):
+    logging.disable(logging.CRITICAL)
+    demand = subscribers * 0.9 / 10 + subscribers * 0.1 / 2
+    print(f'подписчиков {subscribers}, спрос {demand:.0f} запросов/мин')
+    for per_minute in (0, int(demand), int(demand / 2), int(demand / 5)):
+        polls, spent, staleness = simulate(subscribers, hours, per_minute)
+        reviewing = [staleness[f'token-{number}']
+                     for number in range(0, subscribers, 10)]
+        others = [value for token, value in staleness.items()
+                  if int(token.split('-')[1]) % 10]
+        budget = f'{per_minute:>5}/мин' if per_minute else ' без лимита'
+        print(f'бюджет {budget}: {polls / hours / 60:6.0f} опросов/мин, '
+              f'{spent / polls * 1e6:5.2f} мкс на решение; устаревание '
+              f'{report("ревью", reviewing)}; '
+              f'{report("остальные", others)}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
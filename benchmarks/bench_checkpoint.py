@@ -0,0 +1,107 @@
+"""Время от перезапуска до первого опроса и стоимость чекпоинта.
+
+Запуск: python benchmarks/bench_checkpoint.py [подписчиков]
+"""
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.append(ROOT)
+
+import homework  # noqa: E402
+from mock_server import start_server  # noqa: E402
+from state_store import StateStore  # noqa: E402
+from subscriptions import PollScheduler, SubscriptionRegistry  # noqa: E402
+
+RESTART = '''
+import sys, time
+sys.path.append({root!r})
+import homework
+from state_store import StateStore
+from subscriptions import SubscriptionRegistry
+registry = SubscriptionRegistry()
+for number in range({count}):
+    registry.add(f'token-{{number}}', number)
+store = StateStore({path!r})
+store.restore(registry, homework.STATUS_CACHE)
+homework.check_subscription(
+    None, registry.get('token-0'), url={url!r}, store=store)
+'''
+
+
+class FakeBot:
+    """Бот, который никуда не отправляет сообщения."""
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+def fill_state(path, count, url):
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        registry.add(f'token-{number}', number)
+    store = StateStore(path)
+    for number in range(count):
+        for homework_id in range(10):
+            homework.STATUS_CACHE.changed(
+                f'token-{number}',
+                {'id': homework_id, 'status': 'approved'})
+    clock = [0.0]
+    scheduler = PollScheduler(
+        registry,
+        partial(homework.check_subscription, FakeBot(), url=url,
+                store=store),
+        homework.RETRY_TIME, clock=lambda: clock[0])
+    clock[0] = homework.RETRY_TIME
+    start = time.perf_counter()
+    polled = scheduler.run_pending()
+    with_store = (time.perf_counter() - start) / polled
+    store.close()
+    return with_store
+
+
+def checkpoint_cost(path, count):
+    registry = SubscriptionRegistry()
+    subscriptions = [
+        registry.add(f'token-{number}', number) for number in range(count)]
+    store = StateStore(path)
+    start = time.perf_counter()
+    for subscription in subscriptions:
+        store.checkpoint(subscription, homework.STATUS_CACHE)
+    elapsed = (time.perf_counter() - start) / count
+    store.close()
+    return elapsed
+
+
+def restart(path, count, url):
+    code = RESTART.format(root=ROOT, count=count, path=path, url=url)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True)
+    return time.perf_counter() - start
+
+
+def main(count=1000):
+    logging.disable(logging.CRITICAL)
+    server, url = start_server()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.sqlite3')
+        cold = restart(os.path.join(directory, 'cold.sqlite3'), count, url)
+        cycle = fill_state(path, count, url)
+        warm = restart(path, count, url)
+        cost = checkpoint_cost(path, count)
+    server.shutdown()
+    print(f'подписчиков: {count}')
+    print(f'перезапуск до первого опроса без состояния: {cold * 1000:.0f} мс')
+    print(f'перезапуск до первого опроса с состоянием: {warm * 1000:.0f} мс')
+    print(f'цикл опроса с чекпоинтом: {cycle * 1e6:.0f} мкс')
+    print(f'запись чекпоинта за цикл: {cost * 1e6:.0f} мкс')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
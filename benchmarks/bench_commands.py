@@ -0,0 +1,90 @@
+"""Задержка ответа на команды при одновременных пользователях.
+
+Команды обрабатываются пулом потоков, как в Dispatcher, пока поток
+опроса меняет кэш статусов.
+
+Запуск: python benchmarks/bench_commands.py [пользователей] [команд]
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from commands import BotCommands  # noqa: E402
+from status_cache import StatusCache  # noqa: E402
+from subscriptions import SubscriptionRegistry  # noqa: E402
+
+
+class FakeMessage:
+    """Сообщение, ответ на которое никуда не уходит."""
+
+    def reply_text(self, text):
+        return None
+
+
+class FakeChat:
+    """Чат с заданным id."""
+
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeUpdate:
+    """Входящая команда от чата."""
+
+    def __init__(self, chat_id):
+        self.effective_chat = FakeChat(chat_id)
+        self.message = FakeMessage()
+
+
+def poll_forever(cache, users, stop):
+    number = 0
+    while not stop.is_set():
+        number += 1
+        cache.changed(f'token-{number % users}', {
+            'id': number % 20, 'homework_name': f'hw{number % 20}',
+            'status': 'reviewing', 'date_updated': str(number)})
+
+
+def main(users=1000, commands_count=20000, workers=4):
+    registry = SubscriptionRegistry()
+    cache = StatusCache()
+    for number in range(users):
+        registry.add(f'token-{number}', number)
+        for homework_id in range(20):
+            cache.changed(f'token-{number}', {
+                'id': homework_id, 'homework_name': f'hw{homework_id}',
+                'status': 'approved', 'date_updated': '0'})
+    commands = BotCommands(registry, cache, homework.HOMEWORK_STATUSES)
+    handlers = [
+        commands.reply(commands.status), commands.reply(commands.history)]
+    stop = threading.Event()
+    poller = threading.Thread(
+        target=poll_forever, args=(cache, users, stop), daemon=True)
+    poller.start()
+
+    def handle(number):
+        start = time.perf_counter()
+        handlers[number % 2](FakeUpdate(number % users), None)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = sorted(executor.map(handle, range(commands_count)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    poller.join()
+    print(f'пользователей: {users}, команд: {commands_count}, '
+          f'потоков: {workers}')
+    print(f'команд в секунду: {commands_count / elapsed:.0f}')
+    for share in (0.5, 0.95, 0.99):
+        value = latencies[int(len(latencies) * share) - 1]
+        print(f'p{int(share * 100)}: {value * 1e6:.0f} мкс')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
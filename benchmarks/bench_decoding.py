@@ -0,0 +1,84 @@
+"""Разбор ответа API: response.json() + словари против ApiAnswerDecoder.
+
+Запуск: python benchmarks/bench_decoding.py
+"""
+import json
+import sys
+import time
+import tracemalloc
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from status_cache import StatusCache  # noqa: E402
+
+
+def make_content(count):
+    return json.dumps({
+        'homeworks': [
+            {'id': number, 'status': 'approved',
+             'homework_name': f'student__hw{number}.zip',
+             'reviewer_comment': 'Всё нравится',
+             'date_updated': '2020-02-13T14:40:57Z',
+             'lesson_name': 'Итоговый проект'}
+            for number in range(count)
+        ],
+        'current_date': 1,
+    }).encode()
+
+
+def dict_decode(content):
+    response = json.loads(content)
+    for item in response['homeworks']:
+        homework.check_homework(item)
+        homework.parse_status(item)
+    return response
+
+
+def decoder_decode(content):
+    return homework.API_DECODER.decode(content)
+
+
+def dict_path(content):
+    response = json.loads(content)
+    return homework.subscription_messages(response, 'token', StatusCache())
+
+
+def decoder_path(content):
+    response = homework.API_DECODER.decode(content)
+    return homework.subscription_messages(response, 'token', StatusCache())
+
+
+def measure(function, content, repeat):
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function(content)
+        timings.append((time.perf_counter() - start) / repeat)
+    elapsed = min(timings)
+    tracemalloc.start()
+    function(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    for count in (10, 1000, 100000):
+        content = make_content(count)
+        repeat = max(1, 20000 // count)
+        for name, function in (
+                ('разбор, словари', dict_decode),
+                ('разбор, декодер', decoder_decode),
+                ('весь цикл, словари', dict_path),
+                ('весь цикл, декодер', decoder_path)):
+            elapsed, peak = measure(function, content, repeat)
+            print(f'{count:>6} домашек, {name:<18}: '
+                  f'{elapsed * 1000:9.3f} мс, '
+                  f'пик памяти {peak / 1024:9.0f} КиБ')
+
+
+if __name__ == '__main__':
+    main()
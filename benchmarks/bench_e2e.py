@@ -0,0 +1,187 @@
+"""Сквозной нагрузочный бенчмарк бота против локальных заменителей.
+
+Бот опрашивает FakePracticum со сценарием смены статусов, ошибками и
+окном недоступности и отправляет уведомления в FakeTelegram. Отчёт:
+пропускная способность, p50/p99 задержки уведомления, время
+восстановления после сбоя. Результат дописывается строкой JSON в
+benchmarks/results/e2e.jsonl для сравнения между релизами.
+
+Запуск: python benchmarks/bench_e2e.py [подписчиков] [секунд]
+        python benchmarks/bench_e2e.py --history
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from functools import partial
+from os.path import abspath, dirname, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+RESULTS = join(ROOT, 'benchmarks', 'results', 'e2e.jsonl')
+sys.path.append(ROOT)
+os.environ.setdefault('READ_TIMEOUT', '1')
+os.environ.setdefault('HTTP_RETRIES', '0')
+
+from telegram import Bot  # noqa: E402
+
+import homework  # noqa: E402
+from circuit import CircuitBreaker  # noqa: E402
+from fake_services import FakePracticum, FakeTelegram  # noqa: E402
+from outbox import Outbox  # noqa: E402
+from status_cache import StatusCache  # noqa: E402
+from subscriptions import (AdaptivePolicy, PollScheduler,  # noqa: E402
+                           SubscriptionRegistry)
+
+VERDICTS = {
+    verdict: status for status, verdict in homework.HOMEWORK_STATUSES.items()}
+
+
+def make_timelines(subscribers, duration, start, seed=1):
+    """Каждая домашка: взята на ревью, затем принята или отклонена."""
+    rng = random.Random(seed)
+    timelines = {}
+    for number in range(subscribers):
+        events = []
+        for homework_id in range(2):
+            name = f'hw-{number}-{homework_id}'
+            taken = start + rng.uniform(1, duration * 0.6)
+            events.append((taken, homework_id, name, 'reviewing'))
+            events.append((taken + rng.uniform(1, 3), homework_id, name,
+                           rng.choice(('approved', 'rejected'))))
+        timelines[f'token-{number}'] = events
+    return timelines
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def notification_latencies(timelines, deliveries):
+    """Задержки доставки, число повторов и пропущенных итоговых статусов."""
+    events = {
+        (name, status): moment
+        for timeline in timelines.values()
+        for moment, _, name, status in timeline}
+    latencies = []
+    delivered = {}
+    for when, _, text in deliveries:
+        for line in text.split('\n\n'):
+            if not line.startswith('Изменился статус'):
+                continue
+            name = line.split('"')[1]
+            status = VERDICTS.get(line.split('". ', 1)[1])
+            key = (name, status)
+            delivered[key] = delivered.get(key, 0) + 1
+            if key in events:
+                latencies.append(when - events[key])
+    duplicates = sum(count - 1 for count in delivered.values())
+    final = {
+        (name, status) for timeline in timelines.values()
+        for _, _, name, status in timeline if status != 'reviewing'}
+    return latencies, duplicates, len(final - set(delivered))
+
+
+async def poll_until(scheduler, deadline):
+    while time.time() < deadline:
+        await scheduler.run_pending_async()
+        await asyncio.sleep(min(scheduler.delay(), 0.05))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(subscribers=50, duration=20):
+    logging.disable(logging.CRITICAL)
+    start = time.time()
+    timelines = make_timelines(subscribers, duration, start)
+    outage = (start + duration * 0.3, start + duration * 0.4)
+    practicum = FakePracticum(
+        timelines, latency=0.005, error_rate=0.02, timeout_rate=0.005,
+        malformed_rate=0.01, hang=2, outages=[outage])
+    telegram = FakeTelegram(latency=0.005, retry_after_rate=0.01)
+    url = practicum.start()
+    outbox = Outbox(
+        Bot('123:fake', base_url=telegram.start()), backoff=0.2).start()
+    homework.STATUS_CACHE = StatusCache()
+    homework.PRACTICUM_BREAKER = CircuitBreaker('practicum', 5, 1)
+    registry = SubscriptionRegistry()
+    for number in range(subscribers):
+        registry.add(f'token-{number}', number, int(start) - 1)
+    limits = homework.AsyncLimits(polls=16, sends=4)
+    scheduler = PollScheduler(
+        registry,
+        partial(homework.async_check_subscription, limits, outbox, url=url),
+        1, AdaptivePolicy(1, 0.25, 4, 1000))
+    asyncio.run(poll_until(scheduler, start + duration))
+    outbox.join(timeout=10)
+    outbox.stop(timeout=1)
+    limits.shutdown()
+    practicum.stop()
+    telegram.stop()
+
+    elapsed = time.time() - start
+    latencies, duplicates, missed = notification_latencies(
+        timelines, telegram.deliveries)
+    recovered = practicum.first_success_after(outage[1])
+    recovery = [moment - outage[1] for moment in recovered.values()]
+    return {
+        'time': int(start),
+        'revision': git_revision(),
+        'subscribers': subscribers,
+        'duration': duration,
+        'polls_per_sec': round(practicum.requests / elapsed, 1),
+        'failed_polls': practicum.failures,
+        'notifications_per_sec': round(len(latencies) / elapsed, 2),
+        'latency_p50': round(percentile(latencies, 0.5) or 0, 3),
+        'latency_p99': round(percentile(latencies, 0.99) or 0, 3),
+        'duplicates': duplicates,
+        'missed_final_statuses': missed,
+        'recovery_mean': round(sum(recovery) / max(len(recovery), 1), 3),
+        'recovery_max': round(max(recovery, default=0), 3),
+        'not_recovered': subscribers - len(recovered),
+    }
+
+
+def save(result):
+    os.makedirs(dirname(RESULTS), exist_ok=True)
+    with open(RESULTS, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(result) + '\n')
+
+
+def history():
+    if not os.path.exists(RESULTS):
+        print('Сохранённых результатов нет')
+        return
+    columns = ('revision', 'subscribers', 'polls_per_sec', 'latency_p50',
+               'latency_p99', 'duplicates', 'recovery_max')
+    print('\t'.join(columns))
+    with open(RESULTS, encoding='utf-8') as file:
+        for line in file:
+            result = json.loads(line)
+            print('\t'.join(str(result.get(column)) for column in columns))
+
+
+def main(*args):
+    if args[:1] == ('--history',):
+        return history()
+    result = run(*map(int, args))
+    save(result)
+    for key, value in result.items():
+        print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
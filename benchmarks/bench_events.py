@@ -0,0 +1,114 @@
+"""Журнал смен статусов: скорость записи и задержка запросов.
+
+Пишет events событий (по умолчанию 10 млн) пачками, как чекпоинт после
+опросов: студенты сдают домашки, ревью длится от минут до суток.
+Отчёт: событий в секунду при записи, размер файла и задержки запросов
+по студенту, по домашке за неделю, по часу времени и медианы ревью.
+
+Запуск: python benchmarks/bench_events.py [событий] [пачка]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from event_store import EventStore  # noqa: E402
+
+DAY = 24 * 60 * 60
+START = 1_600_000_000
+HOMEWORKS = 20
+
+
+def generate(count, students, seed=1):
+    """События в порядке времени: пары reviewing -> вердикт."""
+    rng = random.Random(seed)
+    span = 365 * DAY
+    moment = START
+    step = span / (count / 2)
+    pending = []
+    for number in range(count // 2):
+        moment += step
+        student = f'student-{rng.randrange(students)}'
+        homework = rng.randrange(HOMEWORKS)
+        key = str(number)
+        name = f'hw-{homework}'
+        yield (student, key, name, 'reviewing', moment)
+        pending.append((moment + rng.uniform(600, DAY), student, key, name))
+        if len(pending) >= 1000:
+            pending.sort()
+            for finished, student, key, name in pending[:500]:
+                yield (student, key, name,
+                       rng.choice(('approved', 'rejected')), finished)
+            del pending[:500]
+    for finished, student, key, name in sorted(pending):
+        yield (student, key, name, 'approved', finished)
+
+
+def week(store, rng):
+    start = START + rng.uniform(0, 358) * DAY
+    return store.events(homework=f'hw-{rng.randrange(HOMEWORKS)}',
+                        start=start, end=start + 7 * DAY)
+
+
+def hour(store, rng):
+    start = START + rng.uniform(0, 364) * DAY
+    return store.events(start=start, end=start + 60 * 60)
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, max(timings) * 1000
+
+
+def main(count=10_000_000, batch=10000):
+    students = max(count // 100, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        store = EventStore(connection)
+        started = time.perf_counter()
+        chunk = []
+        for event in generate(count, students):
+            chunk.append(event)
+            if len(chunk) == batch:
+                with connection:
+                    store.append(chunk, 0)
+                chunk = []
+        with connection:
+            store.append(chunk, 0)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(path) + os.path.getsize(path + '-wal')
+        print(f'записано {count} событий за {elapsed:.1f} с: '
+              f'{count / elapsed:.0f} событий/с, {size / 2 ** 20:.0f} МБ')
+        rng = random.Random(2)
+        queries = {
+            'по студенту': lambda: store.events(
+                student=f'student-{rng.randrange(students)}'),
+            'домашка за неделю': lambda: week(store, rng),
+            'час по времени': lambda: hour(store, rng),
+            'медиана ревью': store.review_turnaround,
+            'ревью студента': lambda: store.reviews(
+                f'student-{rng.randrange(students)}'),
+        }
+        for name, query in queries.items():
+            median, worst = timed(query, 50)
+            print(f'{name:>18}: медиана {median:7.2f} мс, '
+                  f'max {worst:7.2f} мс')
+        print(f'медиана ревью: {store.review_turnaround() / 3600:.1f} ч')
+        connection.close()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
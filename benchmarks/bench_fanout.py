@@ -0,0 +1,82 @@
+"""Задержка рассылки уведомлений одному и 50 получателям.
+
+Получатель имитирует ввод-вывод задержкой. Для каждого уведомления
+измеряется время вызова send_message (на столько задерживается опрос)
+и время до доставки последнему получателю. Для сравнения приведена
+последовательная доставка в цикле.
+
+Запуск: python benchmarks/bench_fanout.py [уведомлений] [задержка, мс]
+"""
+import logging
+import statistics
+import sys
+import threading
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from sinks import FanOut, Sink  # noqa: E402
+
+
+class LatencySink(Sink):
+
+    name = 'latency'
+
+    def __init__(self, latency, delivered):
+        super().__init__(timeout=1, retries=0)
+        self.latency = latency
+        self.delivered = delivered
+        self.lock = threading.Lock()
+
+    def send(self, chat_id, text):
+        time.sleep(self.latency)
+        with self.lock:
+            self.delivered[chat_id] = time.perf_counter()
+
+
+def percentile(values, share):
+    return sorted(values)[min(int(len(values) * share), len(values) - 1)]
+
+
+def measure(sinks_count, notifications, latency, sequential=False):
+    delivered = [{} for _ in range(sinks_count)]
+    sinks = [LatencySink(latency, delivered[number])
+             for number in range(sinks_count)]
+    fanout = None if sequential else FanOut(sinks).start()
+    sent = []
+    enqueue = []
+    for chat_id in range(notifications):
+        started = time.perf_counter()
+        if sequential:
+            for sink in sinks:
+                sink.send(chat_id, 'Изменился статус')
+        else:
+            fanout.send_message(chat_id, 'Изменился статус')
+        enqueue.append(time.perf_counter() - started)
+        sent.append(started)
+        time.sleep(latency)
+    if fanout is not None:
+        fanout.join()
+        fanout.stop()
+    latencies = [
+        max(sink_delivered[chat_id] for sink_delivered in delivered)
+        - sent[chat_id] for chat_id in range(notifications)]
+    return enqueue, latencies
+
+
+def main(notifications=50, latency=20):
+    logging.disable(logging.CRITICAL)
+    latency /= 1000
+    for sinks_count, sequential in ((1, False), (50, False), (50, True)):
+        enqueue, latencies = measure(
+            sinks_count, notifications, latency, sequential)
+        mode = 'последовательно' if sequential else 'параллельно'
+        print(f'получателей {sinks_count:>2} ({mode}): '
+              f'send_message {statistics.mean(enqueue) * 1000:7.2f} мс, '
+              f'доставка p50 {percentile(latencies, 0.5) * 1000:7.1f} мс, '
+              f'p95 {percentile(latencies, 0.95) * 1000:7.1f} мс')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,143 @@
+"""Пропускная способность журнала и его цена в цикле опроса.
+
+Сравниваются синхронный текстовый журнал с f-строками (прежний
+basicConfig) и очередь с JSON-записями из logs.py. Журнал пишется в
+файл и в медленный поток вывода (0,2 мс на запись, как заполненный
+канал stderr); для синхронного журнала время записи платит вызывающий
+поток.
+Цикл опроса - check_subscription с заменителем API и бота, в каждом
+цикле меняется статус домашки.
+
+Запуск: python benchmarks/bench_logging.py [записей] [циклов опроса]
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from logs import TEXT_FORMAT, setup_logging  # noqa: E402
+from status_cache import StatusCache  # noqa: E402
+from subscriptions import Subscription  # noqa: E402
+
+
+class SlowStream:
+
+    def __init__(self, stream, delay=0.0002):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class MockBot:
+
+    def send_message(self, chat_id, text):
+        return text
+
+
+class MockResponse:
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, status):
+        self.content = json.dumps({
+            'homeworks': [{'id': 1, 'homework_name': 'hw.zip',
+                           'status': status,
+                           'date_updated': '2022-01-01T00:00:00Z'}],
+            'current_date': 1,
+        }).encode()
+
+
+def configure(mode, stream):
+    """Журнал в stream: sync, queue или off; возвращает функцию остановки."""
+    root = logging.getLogger()
+    root.handlers.clear()
+    if mode == 'off':
+        root.setLevel(logging.CRITICAL + 1)
+        return lambda: None
+    if mode == 'sync':
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        return lambda: None
+    listener = setup_logging(logging.INFO, 'json', stream=stream,
+                             queue_size=10 ** 6)
+    return listener.stop
+
+
+def throughput(mode, records, stream):
+    stop = configure(mode, stream)
+    started = time.perf_counter()
+    for number in range(records):
+        if mode == 'sync':
+            logging.info(f'Удачная отправка сообщения в Telegram {number}')
+        else:
+            logging.info('Удачная отправка сообщения в Telegram %s', number,
+                         extra={'subscriber': number})
+    caller = time.perf_counter() - started
+    stop()
+    total = time.perf_counter() - started
+    return caller, total
+
+
+def poll_cycles(mode, cycles, stream):
+    responses = [MockResponse('reviewing'), MockResponse('approved')]
+    state = {'count': 0}
+
+    def mock_get(url, headers=None, params=None, timeout=None):
+        state['count'] += 1
+        return responses[state['count'] % 2]
+
+    homework.get_session().get = mock_get
+    homework.STATUS_CACHE = StatusCache()
+    homework.PRACTICUM_BREAKER = None
+    bot = MockBot()
+    subscription = Subscription('token', 1)
+    stop = configure(mode, stream)
+    started = time.perf_counter()
+    for _ in range(cycles):
+        homework.check_subscription(bot, subscription)
+    elapsed = time.perf_counter() - started
+    stop()
+    return elapsed / cycles
+
+
+def main(records=100000, cycles=20000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.log')
+        with open(path, 'w', encoding='utf-8') as stream:
+            slow = SlowStream(stream)
+            for name, target, count in (('файл', stream, records),
+                                        ('медленный вывод', slow,
+                                         records // 20)):
+                print(name)
+                for mode in ('sync', 'queue'):
+                    caller, total = throughput(mode, count, target)
+                    print(f'{mode:>7}: {count / total:9.0f} записей/с, '
+                          f'в вызывающем потоке '
+                          f'{caller / count * 1e6:7.1f} мкс на запись')
+            print('цикл опроса, медленный вывод')
+            baseline = poll_cycles('off', cycles, slow)
+            print(f'{"off":>7}: {baseline * 1e6:7.1f} мкс')
+            for mode in ('sync', 'queue'):
+                cycle = poll_cycles(mode, cycles // 20, slow)
+                print(f'{mode:>7}: {cycle * 1e6:7.1f} мкс, '
+                      f'журнал +{(cycle - baseline) * 1e6:7.1f} мкс')
+    logging.getLogger().handlers.clear()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""Нагрузочный тест очереди исходящих сообщений против фейкового Bot.
+
+Меряет устойчивую скорость отправки и перцентили задержки в очереди.
+
+Запуск: python benchmarks/bench_outbox.py [сообщений] [чатов]
+"""
+import logging
+import random
+import sys
+import threading
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from telegram.error import RetryAfter  # noqa: E402
+
+from outbox import Outbox  # noqa: E402
+
+
+class FakeBot:
+    """Бот с задержкой ответа и редкими RetryAfter."""
+
+    def __init__(self, latency=0.002, retry_after_rate=0.01):
+        self.latency = latency
+        self.retry_after_rate = retry_after_rate
+        self.random = random.Random(1)
+        self.delivered = []
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.latency)
+        if self.random.random() < self.retry_after_rate:
+            raise RetryAfter(0.01)
+        now = time.perf_counter()
+        for line in text.split('\n\n'):
+            self.delivered.append(now - float(line))
+
+
+def percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def run(name, messages, chats, **limits):
+    bot = FakeBot()
+    outbox = Outbox(bot, **limits).start()
+    start = time.perf_counter()
+
+    def produce(offset):
+        for number in range(offset, messages, 4):
+            outbox.send_message(number % chats, str(time.perf_counter()))
+
+    producers = [
+        threading.Thread(target=produce, args=(offset,))
+        for offset in range(4)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    enqueue = time.perf_counter() - start
+    outbox.join()
+    elapsed = time.perf_counter() - start
+    outbox.stop()
+    latencies = sorted(bot.delivered)
+    print(f'{name}: {messages} сообщений в {chats} чатов, '
+          f'постановка в очередь {enqueue * 1000:.0f} мс')
+    print(f'  отправок {outbox.sent} ({outbox.sent / elapsed:.0f}/с), '
+          f'уведомлений {len(latencies)} ({len(latencies) / elapsed:.0f}/с)')
+    print('  задержка в очереди: '
+          f'p50 {percentile(latencies, 0.5) * 1000:.0f} мс, '
+          f'p95 {percentile(latencies, 0.95) * 1000:.0f} мс, '
+          f'p99 {percentile(latencies, 0.99) * 1000:.0f} мс')
+
+
+def main(messages=5000, chats=200):
+    logging.disable(logging.CRITICAL)
+    run('без лимитов', messages, chats,
+        global_rate=10 ** 6, chat_rate=10 ** 6, chat_burst=10 ** 6)
+    run('лимиты Telegram', messages, chats)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
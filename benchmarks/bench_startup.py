@@ -0,0 +1,145 @@
+"""Время холодного старта: импорт homework и запуск --once.
+
+Импорт замеряется через python -X importtime, запуск --once - против
+локального заменителя API без новых статусов, то есть без отправки в
+Telegram. Результат дописывается строкой JSON в
+benchmarks/results/startup.jsonl для сравнения между релизами.
+--baseline сравнивает время импорта с ревизией git: она выгружается во
+временный worktree и замеряется тем же способом.
+
+Запуск: python benchmarks/bench_startup.py [повторов]
+        python benchmarks/bench_startup.py --history
+        python benchmarks/bench_startup.py --baseline <ревизия> [повторов]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+RESULTS = join(ROOT, 'benchmarks', 'results', 'startup.jsonl')
+sys.path.append(ROOT)
+
+from bench_e2e import git_revision  # noqa: E402
+from fake_services import FakePracticum  # noqa: E402
+
+
+def import_time(root=ROOT):
+    """Время импорта homework и его прямых импортов по -X importtime, с."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import homework'],
+        cwd=root, capture_output=True, text=True, check=True)
+    total = None
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == 'homework':
+            total = int(cumulative) / 1e6
+        elif name.startswith('   ') and not name.startswith('    '):
+            modules[name.strip()] = int(cumulative) / 1e6
+    return total, modules
+
+
+def once_time(url, directory):
+    """Время запуска homework.py --once до выхода, с."""
+    env = dict(
+        os.environ, PRACTICUM_TOKEN='token', TELEGRAM_TOKEN='123:fake',
+        CHAT_ID='1', STATE_FILE=join(directory, 'state.sqlite3'),
+        PRACTICUM_ENDPOINT=url, HTTP_RETRIES='0')
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, join(ROOT, 'homework.py'), '--once'],
+        cwd=directory, env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def imports_median(repeat, root=ROOT):
+    """Медиана времени импорта и самые тяжёлые прямые импорты."""
+    imports = []
+    for _ in range(repeat):
+        total, modules = import_time(root)
+        imports.append(total)
+    heavy = sorted(modules, key=modules.get, reverse=True)[:5]
+    return (round(statistics.median(imports), 3),
+            {name: round(modules[name], 3) for name in heavy})
+
+
+def run(repeat=10):
+    import_median, heaviest = imports_median(repeat)
+    practicum = FakePracticum()
+    url = practicum.start()
+    with tempfile.TemporaryDirectory() as directory:
+        once = [once_time(url, directory) for _ in range(repeat)]
+    practicum.stop()
+    return {
+        'time': int(time.time()),
+        'revision': git_revision(),
+        'import_median': import_median,
+        'once_median': round(statistics.median(once), 3),
+        'heaviest_imports': heaviest,
+    }
+
+
+def baseline(revision, repeat=10):
+    """Время импорта homework на ревизии revision из worktree."""
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run(
+            ['git', 'worktree', 'add', '--detach', directory, revision],
+            cwd=ROOT, capture_output=True, check=True)
+        try:
+            return imports_median(repeat, directory)
+        finally:
+            subprocess.run(
+                ['git', 'worktree', 'remove', '--force', directory],
+                cwd=ROOT, capture_output=True)
+
+
+def compare(revision, repeat=10):
+    before, before_heaviest = baseline(revision, repeat)
+    result = run(repeat)
+    save(result)
+    after = result['import_median']
+    print(f'импорт на {revision}: {before} с {before_heaviest}')
+    print(f'импорт на {result["revision"]}: {after} с '
+          f'{result["heaviest_imports"]}')
+    print(f'выигрыш: {before - after:.3f} с ({before / after:.1f}x), '
+          f'--once: {result["once_median"]} с')
+
+
+def save(result):
+    os.makedirs(dirname(RESULTS), exist_ok=True)
+    with open(RESULTS, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(result) + '\n')
+
+
+def history():
+    if not os.path.exists(RESULTS):
+        print('Сохранённых результатов нет')
+        return
+    print('revision\timport_median\tonce_median')
+    with open(RESULTS, encoding='utf-8') as file:
+        for line in file:
+            result = json.loads(line)
+            print(f'{result["revision"]}\t{result["import_median"]}\t'
+                  f'{result["once_median"]}')
+
+
+def main(*args):
+    if args[:1] == ('--history',):
+        return history()
+    if args[:1] == ('--baseline',):
+        return compare(args[1], *map(int, args[2:]))
+    result = run(*map(int, args))
+    save(result)
+    for key, value in result.items():
+        print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,71 @@
+"""Память и CPU на 1000 подписчиков в одном процессе.
+
+Запуск: python benchmarks/bench_subscriptions.py [количество]
+"""
+import logging
+import resource
+import sys
+import time
+import tracemalloc
+from functools import partial
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from mock_server import start_server  # noqa: E402
+from subscriptions import PollScheduler, SubscriptionRegistry  # noqa: E402
+
+
+class FakeBot:
+    """Бот, который никуда не отправляет сообщения."""
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+class FakeClock:
+    """Часы, которые сдвигаются вручную вместо sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main(count=1000):
+    logging.disable(logging.CRITICAL)
+    server, url = start_server()
+    tracemalloc.start()
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        registry.add(f'token-{number}', number)
+    clock = FakeClock()
+    scheduler = PollScheduler(
+        registry,
+        partial(homework.check_subscription, FakeBot(), url=url),
+        homework.RETRY_TIME, clock=clock)
+    state_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    polled = 0
+    while polled < count:
+        clock.now = scheduler.next_due()
+        polled += scheduler.run_pending()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    server.shutdown()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    per_thousand = 1000 / count
+    print(f'подписчиков: {count}')
+    print(f'CPU на 1000 подписчиков за окно: {cpu * per_thousand:.3f} с')
+    print(f'время на 1000 подписчиков: {wall * per_thousand:.3f} с')
+    print('память реестра и очереди на 1000: '
+          f'{state_size * per_thousand / 1024:.1f} КиБ')
+    print(f'максимальный RSS процесса: {rss / 1024:.1f} МиБ')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
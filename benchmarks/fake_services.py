@@ -0,0 +1,191 @@
+"""Локальные заменители API Практикума и Telegram Bot API.
+
+FakePracticum отдаёт статусы из сценария с внедрёнными задержками,
+ошибками 5xx, таймаутами, битым JSON и окнами недоступности.
+FakeTelegram принимает sendMessage, отвечает как Bot API и может
+требовать паузу ответом 429.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Передаёт запросы заменителю сервиса."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    service = None
+
+    def respond(self, code, body, headers=()):
+        try:
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def do_GET(self):
+        self.respond(*self.service.handle(self))
+
+    def do_POST(self):
+        self.respond(*self.service.handle(self))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeService:
+    """Общий запуск сервера заменителя в фоновом потоке."""
+
+    path = '/'
+
+    def __init__(self, latency=0, seed=1):
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = None
+
+    def chance(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def start(self):
+        handler = type('Handler', (FakeHandler,), {'service': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        return f'http://{host}:{port}{self.path}'
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request):
+        raise NotImplementedError
+
+
+class FakePracticum(FakeService):
+    """Заменитель homework_statuses со сценарием смены статусов.
+
+    timelines: {токен: [(unix-время, id, название, статус), ...]}.
+    outages: [(начало, конец)] - окна, когда API отвечает 500.
+    """
+
+    path = '/api/user_api/homework_statuses/'
+
+    def __init__(self, timelines=None, latency=0, error_rate=0,
+                 timeout_rate=0, malformed_rate=0, hang=5, outages=(),
+                 seed=1):
+        super().__init__(latency, seed)
+        self.timelines = timelines or {}
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.malformed_rate = malformed_rate
+        self.hang = hang
+        self.outages = list(outages)
+        self.requests = 0
+        self.failures = 0
+        self.successes = []
+
+    def homeworks(self, token, from_date, now):
+        latest = {}
+        for moment, number, name, status in self.timelines.get(token, ()):
+            if from_date <= moment <= now:
+                latest[number] = {
+                    'id': number, 'homework_name': name, 'status': status,
+                    'date_updated': moment}
+        return sorted(latest.values(),
+                      key=lambda homework: homework['date_updated'],
+                      reverse=True)
+
+    def handle(self, request):
+        now = time.time()
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.chance(self.timeout_rate):
+            time.sleep(self.hang)
+        query = parse_qs(urlparse(request.path).query)
+        token = request.headers.get('Authorization', '')[len('OAuth '):]
+        if any(start <= now < end for start, end in self.outages):
+            return self.fail(500)
+        if self.chance(self.error_rate):
+            return self.fail(503)
+        if self.chance(self.malformed_rate):
+            return self.fail(200, b'{"homeworks": [')
+        from_date = float(query.get('from_date', ['0'])[0])
+        body = json.dumps({
+            'homeworks': self.homeworks(token, from_date, now),
+            'current_date': int(now),
+        }).encode()
+        with self.lock:
+            self.successes.append((now, token))
+        return 200, body
+
+    def fail(self, code, body=b'{}'):
+        with self.lock:
+            self.failures += 1
+        return code, body
+
+    def first_success_after(self, moment):
+        """Время первого удачного ответа каждому токену после moment."""
+        first = {}
+        with self.lock:
+            for when, token in self.successes:
+                if when >= moment and token not in first:
+                    first[token] = when
+        return first
+
+
+class FakeTelegram(FakeService):
+    """Заменитель Bot API: запоминает доставленные сообщения."""
+
+    path = '/bot'
+
+    def __init__(self, latency=0, retry_after_rate=0, retry_after=1,
+                 seed=1):
+        super().__init__(latency, seed)
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.deliveries = []
+
+    def handle(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        length = int(request.headers.get('Content-Length', 0))
+        raw = request.rfile.read(length).decode() if length else ''
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            data = {
+                key: values[0] for key, values in parse_qs(raw).items()}
+        method = request.path.rsplit('/', 1)[-1]
+        if method == 'getMe':
+            return 200, json.dumps({'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'fake',
+                'username': 'fake_bot'}}).encode()
+        if self.chance(self.retry_after_rate):
+            return 429, json.dumps({
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests',
+                'parameters': {'retry_after': self.retry_after}}).encode()
+        chat_id = data.get('chat_id')
+        text = data.get('text', '')
+        with self.lock:
+            self.deliveries.append((time.time(), str(chat_id), text))
+            message_id = len(self.deliveries)
+        return 200, json.dumps({'ok': True, 'result': {
+            'message_id': message_id, 'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'text': text}}).encode()
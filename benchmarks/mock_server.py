@@ -0,0 +1,41 @@
+"""Локальная заглушка эндпоинта homework_statuses для бенчмарков."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class HomeworkStatusesHandler(BaseHTTPRequestHandler):
+    """Отвечает пустым списком домашек и текущей датой."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    delay = 0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({
+            'homeworks': [],
+            'current_date': int(time.time()),
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler=HomeworkStatusesHandler, delay=0):
+    """Запуск сервера в фоновом потоке, возвращает (server, url)."""
+    if delay:
+        handler = type(handler.__name__, (handler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f'http://{host}:{port}/api/user_api/homework_statuses/'
@@ -0,0 +1,151 @@
+"""Симуляция опроса: задержка обнаружения смены статуса против запросов.
+
+Воспроизводит записанную историю статусов на виртуальных часах и
+сравнивает фиксированный RETRY_TIME с адаптивным интервалом. Без файла
+истории прогоняются SEEDS синтетических историй.
+
+Запуск: python benchmarks/simulate_polling.py [timeline.json]
+Формат timeline.json: [[секунды от начала, id домашки, статус], ...]
+"""
+import json
+import logging
+import random
+import statistics
+import sys
+from functools import partial
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from status_cache import StatusCache  # noqa: E402
+from subscriptions import (AdaptivePolicy, PollScheduler,  # noqa: E402
+                           SubscriptionRegistry)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+START = 1_600_000_000
+SEEDS = 5
+
+
+def synthetic_timeline(seed=1, homeworks=8):
+    """История: сдача, ревью и доработки нескольких домашек подряд."""
+    rng = random.Random(seed)
+    events = []
+    moment = 0
+    for number in range(homeworks):
+        moment += rng.uniform(0.5, 5) * DAY
+        while True:
+            moment += rng.uniform(0.2, 12) * HOUR
+            events.append((moment, number, 'reviewing'))
+            moment += rng.uniform(0.2, 6) * HOUR
+            if rng.random() < 0.6:
+                events.append((moment, number, 'approved'))
+                break
+            events.append((moment, number, 'rejected'))
+            moment += rng.uniform(2, 48) * HOUR
+    return events
+
+
+class FakeClock:
+    """Виртуальные часы симуляции."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBot:
+    """Бот, который никуда не отправляет сообщения."""
+
+    def send_message(self, chat_id, text):
+        return None
+
+
+class Simulation:
+    """Заглушка API, отдающая статусы из истории на момент опроса."""
+
+    def __init__(self, timeline, clock):
+        self.events = sorted(
+            (START + moment, number, status)
+            for moment, number, status in timeline)
+        self.clock = clock
+        self.seen = 0
+        self.requests = 0
+        self.latencies = []
+
+    def fetch_api_answer(self, url, current_timestamp, token, cache=None,
+                         decode=None, breaker=None):
+        self.requests += 1
+        now = self.clock()
+        latest = {}
+        for moment, number, status in self.events:
+            if moment > now:
+                break
+            if moment >= current_timestamp:
+                latest[number] = (moment, status)
+        while (self.seen < len(self.events)
+               and self.events[self.seen][0] <= now):
+            self.latencies.append(now - self.events[self.seen][0])
+            self.seen += 1
+        homeworks = [
+            {'id': number, 'homework_name': f'hw{number}',
+             'status': status, 'date_updated': moment}
+            for number, (moment, status) in latest.items()
+        ]
+        homeworks.sort(key=lambda item: item['date_updated'], reverse=True)
+        return {'homeworks': homeworks, 'current_date': now}
+
+
+def simulate(timeline, policy):
+    clock = FakeClock(START)
+    simulation = Simulation(timeline, clock)
+    homework.fetch_api_answer = simulation.fetch_api_answer
+    homework.STATUS_CACHE = StatusCache()
+    registry = SubscriptionRegistry()
+    registry.add('token', 1, START)
+    scheduler = PollScheduler(
+        registry, partial(homework.check_subscription, FakeBot()),
+        homework.RETRY_TIME, policy, clock=clock)
+    end = simulation.events[-1][0] + DAY
+    while clock.now < end:
+        clock.now = scheduler.next_due()
+        scheduler.run_pending()
+    return simulation
+
+
+def report(name, simulations):
+    latencies = sorted(latency for simulation in simulations
+                       for latency in simulation.latencies)
+    requests = sum(simulation.requests for simulation in simulations)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'{name}: запросов {requests}, '
+          f'задержка обнаружения: средняя '
+          f'{statistics.mean(latencies) / 60:.1f} мин, '
+          f'p95 {p95 / 60:.1f} мин, '
+          f'максимум {latencies[-1] / 60:.1f} мин')
+
+
+def main(path=None):
+    logging.disable(logging.CRITICAL)
+    if path:
+        with open(path, encoding='utf-8') as file:
+            timelines = [json.load(file)]
+    else:
+        timelines = [synthetic_timeline(seed)
+                     for seed in range(1, SEEDS + 1)]
+    print(f'событий в истории: {sum(map(len, timelines))}')
+    report('фиксированный RETRY_TIME', [
+        simulate(timeline, None) for timeline in timelines])
+    report('адаптивный интервал', [
+        simulate(timeline, AdaptivePolicy(
+            homework.RETRY_TIME, homework.REVIEWING_RETRY_TIME,
+            homework.MAX_RETRY_TIME, homework.IDLE_POLLS,
+            random=random.Random(1).random))
+        for timeline in timelines])
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,189 @@
+"""Длительный прогон: рост памяти за тысячи ускоренных циклов опроса.
+
+Бот опрашивает локальный заменитель API, в котором статусы домашек
+меняются каждые несколько запросов, и отправляет уведомления через
+Outbox и telegram.Bot в заменитель Telegram. Часы планировщика
+виртуальные, поэтому паузы между опросами не ждутся. tracemalloc
+включается до первого опроса, а отсчёт роста начинается после разогрева,
+когда ограниченные кэши уже заполнены: за WARMUP циклов история
+статусов в StatusCache (50 переходов, статус меняется раз в 3 опроса)
+обновляется целиком. Если за остальные циклы память
+Python выросла больше порога, скрипт печатает растущие места выделения
+и завершается с кодом 1.
+
+Запуск: python benchmarks/soak.py [циклов] [подписчиков] [порог, КиБ]
+"""
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+os.environ.setdefault('READ_TIMEOUT', '1')
+os.environ.setdefault('HTTP_RETRIES', '0')
+
+from telegram import Bot  # noqa: E402
+
+import homework  # noqa: E402
+from fake_services import FakePracticum, FakeTelegram  # noqa: E402
+from outbox import Outbox  # noqa: E402
+from profiling import AllocationTracker  # noqa: E402
+from state_store import StateStore  # noqa: E402
+from subscriptions import PollScheduler, SubscriptionRegistry  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'reviewing', 'approved')
+HOMEWORKS = 5
+WARMUP = 200
+
+
+class SoakPracticum(FakePracticum):
+    """API, где каждые change запросов меняется статус одной домашки.
+
+    Домашек у подписчика HOMEWORKS, набор домашек постоянный, поэтому память бота после разогрева
+    расти не должна. Заменитель хранит только счётчик запросов токена.
+    """
+
+    def __init__(self, change=3):
+        super().__init__()
+        self.change = change
+        self.counts = {}
+
+    def handle(self, request):
+        token = request.headers.get('Authorization', '')[len('OAuth '):]
+        with self.lock:
+            count = self.counts[token] = self.counts.get(token, 0) + 1
+        step = count // self.change
+        number = step % HOMEWORKS
+        body = json.dumps({
+            'homeworks': [{
+                'id': number,
+                'homework_name': f'hw-{number}.zip',
+                'status': STATUSES[step // HOMEWORKS % len(STATUSES)],
+                'date_updated': 1_600_000_000 + step}],
+            'current_date': 1_600_000_000 + count,
+        }).encode()
+        return 200, body
+
+
+class SoakTelegram(FakeTelegram):
+    """Bot API, который только считает доставленные сообщения."""
+
+    def __init__(self):
+        super().__init__()
+        self.delivered = 0
+
+    def handle(self, request):
+        length = int(request.headers.get('Content-Length', 0))
+        request.rfile.read(length)
+        with self.lock:
+            self.delivered += 1
+        return 200, json.dumps({'ok': True, 'result': {
+            'message_id': self.delivered, 'date': int(time.time()),
+            'chat': {'id': 1, 'type': 'private'}, 'text': ''}}).encode()
+
+
+class VirtualClock:
+    """Часы планировщика, которые сдвигаются вместо ожидания."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += max(delay, 0)
+
+
+class CountingPoll:
+    """Функция опроса, которая считает вызовы."""
+
+    def __init__(self, poll):
+        self.poll = poll
+        self.calls = 0
+
+    def __call__(self, subscription):
+        self.calls += 1
+        self.poll(subscription)
+
+
+def rss():
+    """Текущий размер резидентной памяти процесса, КиБ."""
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_cycles(scheduler, registry, cycles):
+    """Прогон cycles циклов: каждый подписчик опрашивается cycles раз."""
+    target = scheduler.poll.calls + cycles * len(registry)
+    while scheduler.poll.calls < target:
+        scheduler.run_calls()
+        scheduler.run_pending()
+        scheduler.sleep(scheduler.delay())
+
+
+def main(cycles=2000, subscribers=5, threshold=256):
+    logging.disable(logging.CRITICAL)
+    practicum = SoakPracticum()
+    telegram = SoakTelegram()
+    url = practicum.start()
+    outbox = Outbox(Bot('123:fake', base_url=telegram.start()),
+                    global_rate=1e6, chat_rate=1e6, chat_burst=1e6).start()
+    registry = SubscriptionRegistry()
+    for number in range(subscribers):
+        registry.add(f'token-{number}', number)
+    directory = tempfile.mkdtemp()
+    store = StateStore(os.path.join(directory, 'state.sqlite3'))
+    clock = VirtualClock()
+    poll = CountingPoll(partial(
+        homework.check_subscription, outbox, url=url, store=store))
+    scheduler = PollScheduler(registry, poll, homework.RETRY_TIME,
+                              clock=clock, sleep=clock.sleep)
+    warmup = min(WARMUP, cycles // 2)
+    tracker = AllocationTracker(frames=5, top=10).start()
+    started = time.perf_counter()
+    run_cycles(scheduler, registry, warmup)
+    outbox.join()
+    tracker.diff()
+    baseline, rss_baseline = tracemalloc.get_traced_memory()[0], rss()
+    report = max((cycles - warmup) // 10, 1)
+    done = warmup
+    try:
+        while done < cycles:
+            step = min(report, cycles - done)
+            run_cycles(scheduler, registry, step)
+            outbox.join()
+            done += step
+            traced = tracemalloc.get_traced_memory()[0] - baseline
+            print(f'цикл {done:>6}: память Python {traced / 1024:+8.1f} '
+                  f'КиБ, RSS {rss() - rss_baseline:+7d} КиБ')
+        growth = (tracemalloc.get_traced_memory()[0] - baseline) / 1024
+        stats = tracker.diff()
+    finally:
+        tracker.stop()
+        outbox.stop(timeout=5)
+        store.close()
+        practicum.stop()
+        telegram.stop()
+    elapsed = time.perf_counter() - started
+    print(f'циклов {cycles}, опросов {poll.calls}, уведомлений '
+          f'{telegram.delivered}, {elapsed:.1f} с; рост памяти Python '
+          f'{growth:.1f} КиБ при пороге {threshold} КиБ')
+    if growth > threshold:
+        print('Память растёт. Места с наибольшим ростом:')
+        print(AllocationTracker.format(stats))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
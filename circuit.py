@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+from metrics import BREAKER_TRANSITIONS
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Предохранитель вызовов внешнего сервиса.
+
+    После threshold сбоев подряд размыкается: вызовы не выполняются
+    recovery_time секунд, затем пропускается одна пробная попытка.
+    Удачная проба замыкает предохранитель, неудачная - снова размыкает,
+    и пауза до следующей пробы удваивается, но не больше max_recovery_time.
+    """
+
+    def __init__(self, name, threshold=5, recovery_time=60,
+                 max_recovery_time=None, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.recovery_time = recovery_time
+        self.max_recovery_time = max_recovery_time or recovery_time
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.failed_probes = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'CircuitBreaker({self.name!r}, {self.state})'
+
+    def _switch(self, state):
+        self.state = state
+        BREAKER_TRANSITIONS.inc(self.name, state)
+
+    def pause(self):
+        """Текущая пауза между пробными попытками."""
+        return min(self.recovery_time * 2 ** min(self.failed_probes, 32),
+                   self.max_recovery_time)
+
+    def allow(self):
+        """Можно ли сейчас обращаться к сервису."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if now - self.opened_at < self.pause():
+                return False
+            self.opened_at = now
+            if self.state == OPEN:
+                self._switch(HALF_OPEN)
+            return True
+
+    def delay(self):
+        """Сколько ждать до следующей разрешённой попытки."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0
+            return max(
+                self.opened_at + self.pause() - self.clock(), 0)
+
+    def succeeded(self):
+        """Учёт удачного вызова, True - если сервис восстановился."""
+        with self._lock:
+            self.failures = 0
+            self.failed_probes = 0
+            if self.state == CLOSED:
+                return False
+            self._switch(CLOSED)
+        logging.info('Сервис %s снова доступен', self.name,
+                     extra={'service': self.name})
+        return True
+
+    def record(self, alive):
+        """Учёт результата вызова: alive - сервис ответил."""
+        if alive:
+            return self.succeeded()
+        self.failed()
+        return False
+
+    def failed(self):
+        """Учёт сбоя вызова."""
+        with self._lock:
+            self.failures += 1
+            if self.state == CLOSED and self.failures < self.threshold:
+                return
+            self.opened_at = self.clock()
+            if self.state == OPEN:
+                return
+            if self.state == HALF_OPEN:
+                self.failed_probes += 1
+            self._switch(OPEN)
+            pause = self.pause()
+        logging.warning(
+            'Сервис %s недоступен, следующая попытка через %s с',
+            self.name, pause, extra={'service': self.name})
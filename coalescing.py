@@ -0,0 +1,53 @@
+import threading
+
+
+class Flight:
+    """Выполняющийся запрос и его результат."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых запросов.
+
+    Пока запрос с ключом key выполняется, остальные вызовы с тем же
+    ключом не выполняют свой, а ждут его и получают тот же результат
+    или то же исключение. Законченный запрос не кэшируется.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        """Результат function(*args), общий для одновременных вызовов."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = function(*args)
+            return flight.result
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
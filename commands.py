@@ -0,0 +1,80 @@
+NOT_SUBSCRIBED = 'Этот чат не подписан на статусы домашек.'
+NOT_OWNER = 'Приостановить опрос может только чат самого подписчика.'
+
+
+class BotCommands:
+    """Ответы на команды /status, /history и /pause из кэша статусов.
+
+    Ни одна команда не делает запросов к API Практикума.
+    """
+
+    def __init__(self, registry, cache, verdicts):
+        self.registry = registry
+        self.cache = cache
+        self.verdicts = verdicts
+
+    def status(self, chat_id):
+        """Текущие статусы домашек чата."""
+        subscriptions = self.registry.by_chat(chat_id)
+        if not subscriptions:
+            return NOT_SUBSCRIBED
+        lines = []
+        for subscription in subscriptions:
+            for name, status, _ in self.cache.statuses(subscription.token):
+                lines.append(
+                    f'"{name}": {self.verdicts.get(status, status)}')
+        return '\n'.join(lines) or 'Статусов домашек пока нет.'
+
+    def history(self, chat_id):
+        """Последние смены статусов домашек чата."""
+        subscriptions = self.registry.by_chat(chat_id)
+        if not subscriptions:
+            return NOT_SUBSCRIBED
+        events = []
+        for subscription in subscriptions:
+            events.extend(self.cache.history(subscription.token))
+        if not events:
+            return 'Смен статусов пока не было.'
+        events.sort(key=lambda event: str(event[0]))
+        return '\n'.join(
+            f'{date_updated or "?"} "{name}": {status}'
+            for date_updated, name, status in events)
+
+    def pause(self, chat_id):
+        """Приостановка опроса для чата или его возобновление.
+
+        Опрос останавливается для всех чатов подписчика, поэтому
+        команда действует только в чате самого подписчика, а не в
+        чатах, которые только следят за его статусами.
+        """
+        subscriptions = self.registry.by_chat(chat_id)
+        if not subscriptions:
+            return NOT_SUBSCRIBED
+        subscriptions = [subscription for subscription in subscriptions
+                         if str(subscription.chat_id) == str(chat_id)]
+        if not subscriptions:
+            return NOT_OWNER
+        paused = not subscriptions[0].paused
+        for subscription in subscriptions:
+            subscription.paused = paused
+        if paused:
+            return 'Опрос приостановлен. Повторите /pause, чтобы продолжить.'
+        return 'Опрос возобновлён.'
+
+    def reply(self, command):
+        """Обработчик Telegram для команды с ответом в тот же чат."""
+        def handler(update, context):
+            update.message.reply_text(command(update.effective_chat.id))
+        return handler
+
+
+def start_commands(token, commands, workers=4):
+    """Приём команд long polling-ом в фоновых потоках Updater."""
+    from telegram.ext import CommandHandler, Updater
+
+    updater = Updater(token=token, workers=workers)
+    for name in ('status', 'history', 'pause'):
+        updater.dispatcher.add_handler(CommandHandler(
+            name, commands.reply(getattr(commands, name)), run_async=True))
+    updater.start_polling(drop_pending_updates=True)
+    return updater
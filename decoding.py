@@ -0,0 +1,94 @@
+import json
+
+from exceptions import TheParseStatusUnknow, TheResponseUnknownKey
+
+
+class HomeworkRecord:
+    """Проверенная домашка из ответа API: id, название, статус, дата.
+
+    Метод get повторяет словарь ответа API, поэтому запись можно
+    передавать в parse_status и кэш статусов вместо словаря.
+    """
+
+    __slots__ = ('id', 'name', 'status', 'date_updated')
+
+    FIELDS = {
+        'id': 'id',
+        'homework_name': 'name',
+        'status': 'status',
+        'date_updated': 'date_updated',
+    }
+
+    def __init__(self, id, name, status, date_updated):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.date_updated = date_updated
+
+    def __repr__(self):
+        return f'HomeworkRecord({self.name!r}, {self.status!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, HomeworkRecord):
+            return NotImplemented
+        return (self.id, self.name, self.status, self.date_updated) == (
+            other.id, other.name, other.status, other.date_updated)
+
+    def get(self, key, default=None):
+        """Значение поля по ключу ответа API."""
+        field = self.FIELDS.get(key)
+        if field is None:
+            return default
+        return getattr(self, field)
+
+    @classmethod
+    def from_dict(cls, homework, statuses):
+        """Проверка словаря домашки по схеме и создание записи."""
+        name = homework.get('homework_name')
+        if name is None:
+            raise TheResponseUnknownKey('Отсутствует ключ homework_name')
+        status = homework.get('status')
+        if status is None:
+            raise TheResponseUnknownKey('Отсутствует ключ status')
+        if status not in statuses:
+            raise TheParseStatusUnknow('Нет такого статуса')
+        return cls(homework.get('id'), name, status,
+                   homework.get('date_updated'))
+
+
+class ApiAnswerDecoder:
+    """Разбор ответа API с проверкой схемы за один проход.
+
+    Каждый объект массива homeworks превращается в HomeworkRecord
+    сразу при разборе, так что словари домашек не накапливаются.
+    Нарушения схемы собираются в ключ errors, а не прерывают разбор.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self._decoder = json.JSONDecoder(object_hook=self._object)
+
+    def _object(self, data):
+        if 'homeworks' in data or 'current_date' in data:
+            return data
+        try:
+            return HomeworkRecord.from_dict(data, self.statuses)
+        except (TheParseStatusUnknow, TheResponseUnknownKey) as error:
+            return error
+
+    def decode(self, content):
+        """Ответ API: {'homeworks': [записи], 'current_date', 'errors'}."""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        answer = self._decoder.decode(content)
+        if not isinstance(answer, dict):
+            raise TheResponseUnknownKey('Ответ API не является объектом')
+        homeworks = answer.get('homeworks')
+        if isinstance(homeworks, list):
+            answer['homeworks'] = [
+                homework for homework in homeworks
+                if isinstance(homework, HomeworkRecord)]
+            answer['errors'] = [
+                homework for homework in homeworks
+                if isinstance(homework, Exception)]
+        return answer
@@ -0,0 +1,175 @@
+from datetime import datetime
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_student ON events (student, updated);
+CREATE INDEX IF NOT EXISTS events_name ON events (name, updated);
+CREATE INDEX IF NOT EXISTS events_updated ON events (updated);
+CREATE TABLE IF NOT EXISTS open_reviews (
+    student TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    started REAL NOT NULL,
+    PRIMARY KEY (student, homework)
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    verdict TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_student ON reviews (student);
+CREATE TABLE IF NOT EXISTS turnaround (
+    minutes INTEGER PRIMARY KEY,
+    reviews INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS review_started
+AFTER INSERT ON events WHEN new.status = 'reviewing'
+BEGIN
+    INSERT OR IGNORE INTO open_reviews
+    VALUES (new.student, new.homework, new.updated);
+END;
+CREATE TRIGGER IF NOT EXISTS review_finished
+AFTER INSERT ON events WHEN new.status IN ('approved', 'rejected')
+BEGIN
+    INSERT INTO reviews (student, homework, started, finished, verdict)
+    SELECT student, homework, started, new.updated, new.status
+    FROM open_reviews
+    WHERE student = new.student AND homework = new.homework;
+    INSERT INTO turnaround
+    SELECT CAST((new.updated - started) / 60 AS INTEGER), 1
+    FROM open_reviews
+    WHERE student = new.student AND homework = new.homework
+    ON CONFLICT (minutes) DO UPDATE SET reviews = reviews + 1;
+    DELETE FROM open_reviews
+    WHERE student = new.student AND homework = new.homework;
+END;
+'''
+
+
+def timestamp(date_updated, default):
+    """Секунды эпохи из date_updated ответа API или default."""
+    if isinstance(date_updated, (int, float)):
+        return float(date_updated)
+    try:
+        return datetime.fromisoformat(
+            date_updated.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return default
+
+
+class EventStore:
+    """Журнал смен статусов домашек в SQLite, только дописывание.
+
+    Каждая смена статуса - строка events: студент (токен), ключ и
+    название домашки, статус и время смены из date_updated. Триггеры
+    при вставке ведут таблицу ревью (взята - проверена) и гистограмму
+    длительности ревью по минутам, поэтому медиана не требует
+    просмотра журнала. Записи меняются только при смене токена
+    студента (move).
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.connection.executescript(SCHEMA)
+
+    def append(self, events, seen):
+        """Запись событий (студент, ключ, название, статус, date_updated).
+
+        seen - время опроса, если в ответе нет date_updated. Транзакцию
+        открывает и закрывает вызывающий.
+        """
+        self.connection.executemany(
+            'INSERT INTO events (student, homework, name, status, updated) '
+            'VALUES (?, ?, ?, ?, ?)',
+            [(student, homework, name, status, timestamp(date_updated, seen))
+             for student, homework, name, status, date_updated in events])
+
+    def move(self, student, new_student):
+        """Перенос журнала и ревью студента на его новый токен.
+
+        Транзакцию открывает и закрывает вызывающий.
+        """
+        for table in ('events', 'open_reviews', 'reviews'):
+            self.connection.execute(
+                f'UPDATE OR REPLACE {table} SET student = ? '
+                'WHERE student = ?', (new_student, student))
+
+    def events(self, student=None, homework=None, start=None, end=None,
+               limit=None):
+        """События по студенту, названию домашки и интервалу времени.
+
+        Возвращает (студент, название, статус, время) по возрастанию
+        времени.
+        """
+        conditions = []
+        parameters = []
+        for condition, value in (('student = ?', student),
+                                 ('name = ?', homework),
+                                 ('updated >= ?', start),
+                                 ('updated < ?', end)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        query = 'SELECT student, name, status, updated FROM events'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY updated'
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        return self.connection.execute(query, parameters).fetchall()
+
+    def history(self, student, start=None, end=None):
+        """Смены статусов студента: (ключ, название, статус, время).
+
+        start и end ограничивают время смены, порядок - по времени.
+        """
+        query = ('SELECT homework, name, status, updated FROM events '
+                 'WHERE student = ?')
+        parameters = [student]
+        if start is not None:
+            query += ' AND updated >= ?'
+            parameters.append(start)
+        if end is not None:
+            query += ' AND updated < ?'
+            parameters.append(end)
+        return self.connection.execute(
+            query + ' ORDER BY updated, id', parameters).fetchall()
+
+    def review_turnaround(self, quantile=0.5):
+        """Длительность ревью в секундах для квантиля или None.
+
+        Считается по гистограмме с шагом в минуту.
+        """
+        buckets = self.connection.execute(
+            'SELECT minutes, reviews FROM turnaround ORDER BY minutes'
+        ).fetchall()
+        total = sum(reviews for _, reviews in buckets)
+        if not total:
+            return None
+        seen = 0
+        for minutes, reviews in buckets:
+            seen += reviews
+            if seen >= quantile * total:
+                return minutes * 60
+        return buckets[-1][0] * 60
+
+    def reviews(self, student=None):
+        """Законченные ревью: (студент, ключ, начало, конец, вердикт)."""
+        query = ('SELECT student, homework, started, finished, verdict '
+                 'FROM reviews')
+        parameters = ()
+        if student is not None:
+            query += ' WHERE student = ?'
+            parameters = (student,)
+        return self.connection.execute(
+            query + ' ORDER BY started', parameters).fetchall()
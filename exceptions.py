@@ -0,0 +1,47 @@
+class TheAnswerIsNot200Error(Exception):
+    """Перехват исключения - эндпоинт не доступен."""
+
+    pass
+
+
+class TheRateLimitError(TheAnswerIsNot200Error):
+    """Перехват исключения - превышен лимит запросов к API."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TheCircuitOpenError(TheAnswerIsNot200Error):
+    """Перехват исключения - предохранитель сервиса разомкнут."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TheParseStatusUnknow(Exception):
+    """Перехват исключения - недокументированный статус."""
+
+    pass
+
+
+class TheResponseUnknownKey(Exception):
+    """Перехват исключения - отсутствует ключ в запросе."""
+
+    pass
+
+
+class TheBackfillNotFetchedError(Exception):
+    """Перехват исключения - ответ API для бэкфилла не получен."""
+
+    pass
+
+
+class TheStalledCallError(Exception):
+    """Перехват исключения - зависший вызов прерван сторожем.
+
+    Не наследует OSError, чтобы urllib3 не повторял прерванный запрос.
+    """
+
+    pass
@@ -1,100 +1,340 @@
+import json
 import logging
 import os
+import signal
+import sys
+import threading
 import time
+from functools import partial
 
-import requests
-from dotenv import load_dotenv
-from telegram import Bot
-from telegram.error import TelegramError
+from dotenv import find_dotenv, load_dotenv
 
-load_dotenv()
+import metrics
+from circuit import CircuitBreaker
+from coalescing import SingleFlight
+from commands import BotCommands, start_commands
+from decoding import ApiAnswerDecoder, HomeworkRecord
+from exceptions import (TheAnswerIsNot200Error, TheCircuitOpenError,
+                        TheParseStatusUnknow, TheRateLimitError,
+                        TheResponseUnknownKey, TheStalledCallError)
+from liveness import Watchdog, start_health_server
+from outbox import Outbox, batch_messages
+from sharding import ShardedPoll, ShardLeases, default_worker_id
+from state_store import OutboxJournal, StateStore
+from status_cache import StatusCache
+from subscriptions import (AdaptivePolicy, PollScheduler, SubscriptionRegistry,
+                           load_chats, request_budget)
+
+ENV_FILE = os.getenv('ENV_FILE') or find_dotenv()
+load_dotenv(ENV_FILE)
 
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')
-RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HOMEWORK_STATUSES = {
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+SINKS_FILE = os.getenv('SINKS_FILE')
+STATE_FILE = os.getenv('STATE_FILE', 'homework_state.sqlite3')
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 0))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))
+POOL_SIZE = int(os.getenv('POOL_SIZE', max(POLL_CONCURRENCY, 10)))
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+RETRY_TIME = int(os.getenv('RETRY_TIME', 600))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', 60))
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 5))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profile')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 60))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+PROFILE_FRAMES = int(os.getenv('PROFILE_FRAMES', 10))
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 240))
+MAX_RETRY_TIME = int(os.getenv('MAX_RETRY_TIME', 15 * 60))
+IDLE_POLLS = int(os.getenv('IDLE_POLLS', 36))
+POLL_BUDGET = float(os.getenv('POLL_BUDGET', 0))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+BOT_COMMANDS = os.getenv('BOT_COMMANDS', '1') == '1'
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_RECOVERY_TIME = float(os.getenv('BREAKER_RECOVERY_TIME', 60))
+ERROR_NOTIFY_WINDOW = float(os.getenv('ERROR_NOTIFY_WINDOW', 6 * 60 * 60))
+RECOVERED_MESSAGE = 'Работа программы восстановлена'
+SHARDING = os.getenv('SHARDING', '0') == '1'
+WORKER_ID = os.getenv('WORKER_ID')
+SHARD_TTL = float(os.getenv('SHARD_TTL', 60))
+WATCHDOG_STALL = float(os.getenv('WATCHDOG_STALL', 300))
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', 0))
+HEALTH_HOST = os.getenv('HEALTH_HOST', '127.0.0.1')
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/')
+TELEGRAM_API_URL = os.getenv(
+    'TELEGRAM_API_URL', 'https://api.telegram.org/bot')
+DEFAULT_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена, в ней нашлись ошибки.'
 }
 
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO)
+def status_templates(statuses):
+    """Шаблоны уведомлений с полем {name} по вердиктам статусов."""
+    return {
+        status: 'Изменился статус проверки работы "{name}". '
+        + verdict.replace('{', '{{').replace('}', '}}')
+        for status, verdict in statuses.items()
+    }
+
+
+def load_statuses(path=None):
+    """Вердикты статусов: стандартные и дополненные из JSON-файла path."""
+    statuses = dict(DEFAULT_STATUSES)
+    if path:
+        with open(path, encoding='utf-8') as file:
+            statuses.update(json.load(file))
+    return statuses
+
+
+HOMEWORK_STATUSES = load_statuses(os.getenv('HOMEWORK_STATUSES_FILE'))
+STATUS_TEMPLATES = status_templates(HOMEWORK_STATUSES)
 
 
-class TheAnswerIsNot200Error(Exception):
-    """Перехват исключения - эндпоинт не доступен."""
+def configure_logging():
+    """Журнал через очередь: JSON или текст, с прореживанием ошибок."""
+    from logs import setup_logging
 
-    pass
+    return setup_logging(LOG_LEVEL, LOG_FORMAT,
+                         sample_window=LOG_SAMPLE_WINDOW,
+                         sample_burst=LOG_SAMPLE_BURST)
 
 
-class TheParseStatusUnknow(Exception):
-    """Перехват исключения - недокументированный статус."""
+def start_profiler():
+    """Профилирование для --profile: стеки и рост памяти в PROFILE_DIR."""
+    from profiling import Profiler
 
-    pass
+    return Profiler(PROFILE_DIR, PROFILE_INTERVAL, PROFILE_SAMPLE_INTERVAL,
+                    PROFILE_FRAMES).start()
 
 
-class TheResponseUnknownKey(Exception):
-    """Перехват исключения - отсутствует ключ в запросе."""
+SESSION = None
+SESSION_LOCK = threading.Lock()
+API_DECODER = ApiAnswerDecoder(HOMEWORK_STATUSES)
+STATUS_CACHE = StatusCache()
+PRACTICUM_BREAKER = CircuitBreaker(
+    'practicum', BREAKER_THRESHOLD, BREAKER_RECOVERY_TIME, MAX_RETRY_TIME)
+API_FLIGHTS = SingleFlight()
+WATCHDOG = Watchdog(WATCHDOG_STALL)
 
-    pass
+
+def config_errors(config):
+    """Ошибки настроек: пропущенные переменные и пустые вердикты."""
+    errors = [
+        f'Отсутствует обязательная переменная окружения {name}'
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'CHAT_ID')
+        if not config.get(name)
+    ]
+    errors.extend(
+        f'Пустой вердикт статуса {status}'
+        for status, verdict in config.get('HOMEWORK_STATUSES', {}).items()
+        if not isinstance(verdict, str) or not verdict)
+    return errors
 
 
 def check_constant_auth():
     """Проверка наличия обязательных переменных для работы бота."""
-    is_critical = True
-    if not PRACTICUM_TOKEN:
-        is_critical = False
-        logging.critical(
-            'Отсутствует обязательная переменная окружения PRACTICUM_TOKEN')
-    elif not TELEGRAM_TOKEN:
-        is_critical = False
-        logging.critical(
-            'Отсутствует обязательная переменная окружения TELEGRAM_TOKEN')
-    elif not CHAT_ID:
-        is_critical = False
-        logging.critical(
-            'Отсутствует обязательная переменная окружения CHAT_ID')
-    return is_critical
+    errors = config_errors({'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
+                            'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
+                            'CHAT_ID': CHAT_ID})
+    for error in errors:
+        logging.critical(error)
+    return not errors
+
+
+def read_config():
+    """Настройки из окружения, перечитанного .env и файлов SIGHUP-reload.
+
+    Возвращает словарь настроек и чаты подписчиков {токен: [чаты]}.
+    """
+    load_dotenv(ENV_FILE, override=True)
+    config = {
+        'PRACTICUM_TOKEN': os.getenv('PRACTICUM_TOKEN'),
+        'TELEGRAM_TOKEN': os.getenv('TELEGRAM_TOKEN'),
+        'CHAT_ID': os.getenv('CHAT_ID'),
+        'HOMEWORK_STATUSES': load_statuses(
+            os.getenv('HOMEWORK_STATUSES_FILE')),
+    }
+    chats = {}
+    path = os.getenv('SUBSCRIPTIONS_FILE')
+    if path:
+        chats = load_chats(path)
+    if config['PRACTICUM_TOKEN']:
+        chats[config['PRACTICUM_TOKEN']] = [config['CHAT_ID']] + [
+            chat_id for chat_id in chats.get(config['PRACTICUM_TOKEN'], ())
+            if str(chat_id) != str(config['CHAT_ID'])]
+    return config, chats
 
 
 def send_message(bot, message):
     """Отправка сообщения в телеграм."""
+    send_message_to(bot, CHAT_ID, message)
+
+
+def send_message_to(bot, chat_id, message):
+    """Отправка сообщения в заданный чат телеграм."""
+    from telegram.error import TelegramError
+
     try:
-        message = bot.send_message(CHAT_ID, message)
-        logging.info('Удачная отправка сообщения в Telegram')
+        message = bot.send_message(chat_id, message)
+        logging.info('Удачная отправка сообщения в Telegram',
+                     extra={'subscriber': chat_id})
     except TelegramError as error:
-        logging.error('Сбой при отправке сообщения в Telegram: '
-                      f'{error}')
+        logging.error('Сбой при отправке сообщения в Telegram: %s', error,
+                      extra={'subscriber': chat_id,
+                             'error': type(error).__name__})
+
+
+def send_to_chats(bot, chat_ids, message):
+    """Отправка сообщения во все чаты подписчика.
+
+    Рассылке FanOut чаты передаются одним вызовом: в Telegram сообщение
+    уходит в каждый чат, остальным получателям - один раз.
+    """
+    if isinstance(bot, LazyBot):
+        bot = bot.get()
+    if not hasattr(bot, 'send_to_chats'):
+        for chat_id in chat_ids:
+            send_message_to(bot, chat_id, message)
+        return
+    bot.send_to_chats(chat_ids, message)
+    logging.info('Удачная отправка сообщения в Telegram',
+                 extra={'subscriber': chat_ids[0]})
+
+
+def parse_retry_after(value):
+    """Пауза в секундах из заголовка Retry-After."""
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_session():
+    """Общая сессия к API, при первом вызове - созданная.
+
+    requests и urllib3 загружаются при первом запросе, а не при импорте.
+    """
+    global SESSION
+    if SESSION is None:
+        with SESSION_LOCK:
+            if SESSION is None:
+                from session import PooledSession
+
+                SESSION = PooledSession(POOL_SIZE, HTTP_RETRIES)
+    return SESSION
 
 
 def get_api_answer(url, current_timestamp):
-    """Получение ответа с API яндекс.практикум."""
-    headers = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
-    current_timestamp = current_timestamp or int(time.time())
-    payload = {'from_date': current_timestamp}
+    """Получение ответа с API яндекс.практикум.
+
+    Сетевые ошибки и неверный JSON записываются в лог, ответ - None.
+    """
+    import requests
+
     try:
-        response = requests.get(url, headers=headers, params=payload)
-        if response.status_code != 200:
-            raise TheAnswerIsNot200Error(
-                f'Эндпоинт {ENDPOINT} недоступен. '
-                f'Код ответа API: {response.status_code}')
-        return response.json()
+        return fetch_api_answer(url, current_timestamp, PRACTICUM_TOKEN)
     except requests.RequestException as error:
-        logging.error(f'Проблемы с запросом {error}')
+        logging.error('Проблемы с запросом %s', error,
+                      extra={'error': type(error).__name__})
     except ValueError as error:
-        logging.error(f'Недопустимое значение {error}')
+        logging.error('Недопустимое значение %s', error,
+                      extra={'error': type(error).__name__})
+
+
+def request_api(url, headers, params, breaker=None):
+    """GET к API с учётом результата в предохранителе breaker.
+
+    Пока предохранитель разомкнут, запрос не выполняется.
+    """
+    if breaker is not None and not breaker.allow():
+        raise TheCircuitOpenError(
+            f'Эндпоинт {ENDPOINT} недоступен, опрос приостановлен',
+            breaker.delay())
+    import requests
+
+    session = get_session()
+    try:
+        with metrics.REQUEST_SECONDS.time(), session.adapter.interruptible(
+                WATCHDOG, 'poll'):
+            response = session.get(
+                url, headers=headers, params=params,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    except (requests.RequestException, TheStalledCallError):
+        if breaker is not None:
+            breaker.failed()
+        raise
+    if breaker is not None:
+        breaker.record(response.status_code < 500)
+    return response
+
+
+def fetch_api_answer(url, current_timestamp, token, cache=None,
+                     decode=None, breaker=None):
+    """Получение ответа с API яндекс.практикум по токену подписчика.
+
+    С кэшем запрос условный: на ответ 304 возвращается пустой список
+    домашек без разбора тела. decode - разбор тела ответа вместо
+    response.json(). breaker - предохранитель эндпоинта. Сетевые
+    ошибки requests и ошибки разбора ответа передаются вызывающему.
+    """
+    headers = {'Authorization': f'OAuth {token}'}
+    if cache is not None:
+        headers.update(cache.request_headers(token))
+    current_timestamp = current_timestamp or int(time.time())
+    payload = {'from_date': current_timestamp}
+    response = request_api(url, headers, payload, breaker)
+    if cache is not None and response.status_code == 304:
+        cache.not_modified()
+        return {'homeworks': [], 'current_date': current_timestamp}
+    if response.status_code == 429:
+        raise TheRateLimitError(
+            f'Превышен лимит запросов к эндпоинту {ENDPOINT}',
+            parse_retry_after(response.headers.get('Retry-After')))
+    if response.status_code != 200:
+        raise TheAnswerIsNot200Error(
+            f'Эндпоинт {ENDPOINT} недоступен. '
+            f'Код ответа API: {response.status_code}')
+    if cache is not None:
+        cache.remember_response(token, response.headers)
+    with metrics.DECODE_SECONDS.time():
+        if decode is None:
+            return response.json()
+        return decode(response.content)
+
+
+def poll_api(url, current_timestamp, token):
+    """Ответ API для опроса подписчика с кэшем, декодером и предохранителем.
+
+    Одновременные опросы с тем же токеном и from_date делят один запрос
+    и один разобранный ответ.
+    """
+    return API_FLIGHTS.do(
+        (token, current_timestamp), fetch_api_answer, url, current_timestamp,
+        token, STATUS_CACHE, API_DECODER.decode, PRACTICUM_BREAKER)
 
 
 def parse_status(homework):
     """Анализ статуса проверки домашки."""
     status = homework.get('status')
-    verdict = HOMEWORK_STATUSES.get(status)
     homework_name = homework.get('homework_name')
     if homework_name is None:
         raise TheResponseUnknownKey(
@@ -102,52 +342,523 @@ def parse_status(homework):
     if status is None:
         raise TheResponseUnknownKey(
             'Отсутствует ключ status')
-    return (
-        f'Изменился статус проверки работы "{homework_name}". {verdict}')
+    template = STATUS_TEMPLATES.get(status)
+    if template is None:
+        raise TheParseStatusUnknow('Нет такого статуса')
+    return template.format(name=homework_name)
 
 
-def check_response(response):
-    """Проверка, что домашку взяли на ревью."""
-    homework = response.get('homeworks')
-    if homework is None or not isinstance(homework, list):
+def check_homework(homework):
+    """Проверка, что статус домашки документирован."""
+    if homework.get('status') in HOMEWORK_STATUSES:
+        return homework
+    raise TheParseStatusUnknow('Нет такого статуса')
+
+
+def get_homeworks(response):
+    """Список домашек из ответа API."""
+    homeworks = response.get('homeworks')
+    if homeworks is None or not isinstance(homeworks, list):
         raise TheResponseUnknownKey(
             'Отсутствует ключ homeworks или homeworks не правильного типа')
-    if not homework:
+    return homeworks
+
+
+def check_response(response):
+    """Проверка, что домашку взяли на ревью."""
+    homeworks = get_homeworks(response)
+    if not homeworks:
         return False
-    homework = homework[0]
-    status = homework.get('status')
-    if status in HOMEWORK_STATUSES:
-        return homework
-    raise TheParseStatusUnknow('Нет такого статуса')
+    return check_homework(homeworks[0])
+
+
+def subscription_messages(response, token, cache=STATUS_CACHE):
+    """Уведомления о сменах статуса, новые статусы и ошибки разбора.
+
+    Домашки разбираются от старых изменений к новым. Записи
+    HomeworkRecord уже проверены декодером, словари проверяются здесь.
+    """
+    messages = []
+    statuses = []
+    errors = list(response.get('errors', ()))
+    with metrics.PARSE_SECONDS.time():
+        for homework in reversed(get_homeworks(response)):
+            if not isinstance(homework, HomeworkRecord):
+                try:
+                    homework = HomeworkRecord.from_dict(
+                        homework, HOMEWORK_STATUSES)
+                except (TheParseStatusUnknow, TheResponseUnknownKey) as error:
+                    errors.append(error)
+                    continue
+            if cache.changed(token, homework):
+                messages.append(parse_status(homework))
+                statuses.append(homework.status)
+                logging.info('Новый статус работы', extra={
+                    'homework': homework.name,
+                    'status': homework.status})
+    return messages, statuses, errors
+
+
+def subscription_error(subscription, error):
+    """Текст ошибки для подписчика, если о таком сбое ещё не сообщали.
+
+    Пока предохранитель разомкнут, опрос не считается неудачным и о нём
+    не сообщается: следующий опрос - не раньше пробной попытки.
+    """
+    metrics.ERRORS.inc(type(error).__name__)
+    if isinstance(error, TheCircuitOpenError):
+        subscription.retry_after = error.retry_after
+        return None
+    message = f'Сбой в работе программы: {error}'
+    logging.error('Сбой в работе программы: %s', error, extra={
+        'subscriber': subscription.chat_id, 'error': type(error).__name__})
+    subscription.poll_failed(getattr(error, 'retry_after', None))
+    if subscription.error_notification_due(
+            error, time.time(), ERROR_NOTIFY_WINDOW):
+        return message
+    return None
+
+
+def log_poll(subscription, started, statuses=()):
+    """Событие завершённого опроса подписчика."""
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug('Опрос подписчика', extra={
+            'subscriber': subscription.chat_id,
+            'status': statuses[-1] if statuses else None,
+            'latency': round(time.perf_counter() - started, 4)})
+
+
+def check_subscription(bot, subscription, url=ENDPOINT, store=None):
+    """Один цикл опроса API для подписчика."""
+    started = time.perf_counter()
+    statuses = ()
+    try:
+        response = poll_api(url, subscription.from_date, subscription.token)
+        messages, statuses, errors = subscription_messages(
+            response, subscription.token, STATUS_CACHE)
+        if not errors and subscription.recovered():
+            messages.append(RECOVERED_MESSAGE)
+        for message in batch_messages(messages):
+            send_to_chats(bot, subscription.chats(), message)
+        if errors:
+            raise errors[0]
+        subscription.poll_succeeded(statuses)
+        subscription.from_date = response.get('current_date')
+    except Exception as error:
+        message = subscription_error(subscription, error)
+        if message:
+            send_to_chats(bot, subscription.chats(), message)
+    if store is not None:
+        store.checkpoint(subscription, STATUS_CACHE)
+    log_poll(subscription, started, statuses)
+
+
+class AsyncLimits:
+    """Ограничения одновременных запросов к API и отправок в Telegram.
+
+    asyncio загружается только в асинхронном режиме.
+    """
+
+    def __init__(self, polls=POLL_CONCURRENCY, sends=SEND_CONCURRENCY):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.polls = asyncio.Semaphore(polls)
+        self.sends = asyncio.Semaphore(sends)
+        self.executor = ThreadPoolExecutor(max_workers=polls + sends)
+
+    def run(self, function, *args):
+        """Вызов блокирующей функции в пуле потоков ввода-вывода."""
+        import asyncio
+
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor, function, *args)
+
+    def shutdown(self):
+        """Остановка пула потоков ввода-вывода."""
+        self.executor.shutdown(wait=False)
+
+
+async def async_fetch_api_answer(limits, url, current_timestamp, token):
+    """Неблокирующее получение ответа с API яндекс.практикум."""
+    async with limits.polls:
+        return await limits.run(poll_api, url, current_timestamp, token)
+
+
+async def async_send_to_chats(limits, bot, subscription, message):
+    """Неблокирующая отправка сообщения во все чаты подписчика."""
+    async with limits.sends:
+        return await limits.run(
+            send_to_chats, bot, subscription.chats(), message)
+
+
+async def async_check_subscription(limits, bot, subscription, url=ENDPOINT,
+                                   store=None):
+    """Один неблокирующий цикл опроса API для подписчика."""
+    started = time.perf_counter()
+    statuses = ()
+    try:
+        response = await async_fetch_api_answer(
+            limits, url, subscription.from_date, subscription.token)
+        messages, statuses, errors = subscription_messages(
+            response, subscription.token, STATUS_CACHE)
+        if not errors and subscription.recovered():
+            messages.append(RECOVERED_MESSAGE)
+        for message in batch_messages(messages):
+            await async_send_to_chats(limits, bot, subscription, message)
+        if errors:
+            raise errors[0]
+        subscription.poll_succeeded(statuses)
+        subscription.from_date = response.get('current_date')
+    except Exception as error:
+        message = subscription_error(subscription, error)
+        if message:
+            await async_send_to_chats(limits, bot, subscription, message)
+    if store is not None:
+        store.checkpoint(subscription, STATUS_CACHE)
+    log_poll(subscription, started, statuses)
+
+
+def telegram_client(token):
+    """Клиент Telegram Bot API."""
+    from telegram import Bot
+
+    return Bot(token=token, base_url=TELEGRAM_API_URL)
+
+
+def make_outbox(journal=None):
+    """Очередь отправки в Telegram с ограничением частоты.
+
+    journal - OutboxJournal, в котором очередь переживает перезапуск.
+    """
+    return Outbox(telegram_client(TELEGRAM_TOKEN),
+                  TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE,
+                  breaker=CircuitBreaker(
+                      'telegram', BREAKER_THRESHOLD, BREAKER_RECOVERY_TIME,
+                      MAX_RETRY_TIME),
+                  watchdog=WATCHDOG, journal=journal).start()
+
+
+def make_bot(journal=None, outbox=None):
+    """Отправка уведомлений через очередь outbox или новую очередь.
+
+    С SINKS_FILE уведомления параллельно рассылаются и остальным
+    получателям из файла.
+    """
+    bot = outbox or make_outbox(journal)
+    if not SINKS_FILE:
+        return bot
+    from sinks import FanOut, load_sinks
+
+    return FanOut(load_sinks(SINKS_FILE, bot)).start()
+
+
+def close_bot(bot):
+    """Отправка оставшейся очереди и остановка отправки."""
+    bot.join(timeout=READ_TIMEOUT)
+    bot.stop(timeout=READ_TIMEOUT)
+
+
+class LazyBot:
+    """Бот, который создаётся factory только при первой отправке.
+
+    Отправки из пула потоков асинхронного режима создают бота один раз.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.bot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Бот, при первом вызове - созданный factory."""
+        if self.bot is None:
+            with self._lock:
+                if self.bot is None:
+                    self.bot = self.factory()
+        return self.bot
+
+    def send_message(self, chat_id, text):
+        """Отправка сообщения, при первом вызове - создание бота."""
+        return self.get().send_message(chat_id, text)
+
+
+def start_metrics(bot):
+    """Экспорт метрик, если задан METRICS_PORT."""
+    metrics.QUEUE_DEPTH.set_function(bot.depth)
+    metrics.CACHE_HIT_RATE.set_function(
+        lambda: STATUS_CACHE.stats()['hit_rate'])
+    metrics.CONNECTIONS_REUSED.set_function(
+        lambda: get_session().connection_stats()['reused'])
+    metrics.start_http_server(METRICS_PORT, METRICS_HOST)
+
+
+class CommandsSwitch:
+    """Приём команд бота, который можно включать и перезапускать.
+
+    На воркере-лидере включается при получении лидерства, при смене
+    токена Telegram перезапускается с новым токеном.
+    """
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.updater = None
+
+    def __call__(self, enabled):
+        """Включение или выключение приёма команд."""
+        if enabled and self.updater is None:
+            self.updater = start_commands(TELEGRAM_TOKEN, self.commands)
+        elif not enabled and self.updater is not None:
+            self.updater.stop()
+            self.updater = None
+
+    def restart(self):
+        """Перезапуск с текущим токеном, если приём команд включён."""
+        if self.updater is not None:
+            self(False)
+            self(True)
+
+
+def start_watchdog():
+    """Сторож зависших вызовов и проверки живости на HEALTH_PORT."""
+    WATCHDOG.start()
+    if HEALTH_PORT:
+        start_health_server(WATCHDOG, HEALTH_PORT, HEALTH_HOST)
+
+
+def load_state():
+    """Реестр подписчиков и чекпоинт с восстановленным состоянием."""
+    registry = SubscriptionRegistry()
+    registry.add(PRACTICUM_TOKEN, CHAT_ID, int(time.time()))
+    if SUBSCRIPTIONS_FILE:
+        registry.load(SUBSCRIPTIONS_FILE)
+    store = StateStore(STATE_FILE)
+    restored = store.restore(registry, STATUS_CACHE)
+    logging.info('Восстановлено состояние подписчиков: %s', restored)
+    return registry, store
+
+
+def rotate_token(registry, store, config):
+    """Перенос состояния на новый PRACTICUM_TOKEN того же CHAT_ID.
+
+    Возвращает подписку старого токена или None, если токен не сменился.
+    """
+    token = config['PRACTICUM_TOKEN']
+    if (token == PRACTICUM_TOKEN or str(config['CHAT_ID']) != str(CHAT_ID)
+            or PRACTICUM_TOKEN not in registry or token in registry):
+        return None
+    store.move(PRACTICUM_TOKEN, token)
+    STATUS_CACHE.move(PRACTICUM_TOKEN, token)
+    logging.info('Состояние подписчика перенесено на новый токен',
+                 extra={'subscriber': CHAT_ID})
+    return registry.get(PRACTICUM_TOKEN)
+
+
+def sync_subscribers(registry, store, scheduler, chats, rotated=None):
+    """Приведение реестра к {токен: [чаты]}, новые - в расписание.
+
+    rotated - подписка старого PRACTICUM_TOKEN: опрос нового
+    продолжается с более поздней из её from_date и чекпоинта.
+    """
+    added, removed = registry.sync(chats)
+    if added:
+        store.restore(registry, STATUS_CACHE,
+                      [subscription.token for subscription in added])
+    if rotated is not None:
+        subscription = registry.get(PRACTICUM_TOKEN)
+        subscription.from_date = max(
+            subscription.from_date, rotated.from_date)
+    for subscription in added:
+        scheduler.schedule(subscription)
+    return added, removed
+
+
+def build_client(config, replace):
+    """Клиент Telegram с новым токеном, если клиента нужно заменить.
+
+    Неверный TELEGRAM_TOKEN вызывает TelegramError до того, как
+    применены какие-либо новые настройки.
+    """
+    if not replace:
+        return None
+    return telegram_client(config['TELEGRAM_TOKEN'])
+
+
+def reload_config(registry, store, scheduler, bot=None, switch=None,
+                  commands=None):
+    """Применение изменённых настроек без остановки бота.
+
+    Перечитываются .env, файл вердиктов и файл подписчиков. Если новые
+    настройки с ошибками, в том числе с неверным TELEGRAM_TOKEN, работа
+    продолжается со старыми: новые объекты создаются до замены
+    глобальных настроек. Новые подписчики восстанавливаются из
+    чекпоинта и ставятся в расписание, у оставшихся сохраняется
+    состояние опроса. Новый PRACTICUM_TOKEN
+    при том же CHAT_ID продолжает опрос старого: from_date и статусы
+    переносятся на новый токен. Возвращает, применены ли настройки.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, CHAT_ID
+    global HOMEWORK_STATUSES, STATUS_TEMPLATES, API_DECODER
+    from telegram.error import TelegramError
+
+    try:
+        config, chats = read_config()
+    except (OSError, ValueError) as error:
+        logging.error('Настройки не перечитаны: %s', error,
+                      extra={'error': type(error).__name__})
+        return False
+    errors = config_errors(config)
+    if errors:
+        for error in errors:
+            logging.error('Настройки не перечитаны: %s', error)
+        return False
+    telegram_changed = config['TELEGRAM_TOKEN'] != TELEGRAM_TOKEN
+    try:
+        client = build_client(config, telegram_changed and bot is not None)
+    except TelegramError as error:
+        logging.error('Настройки не перечитаны: %s', error,
+                      extra={'error': type(error).__name__})
+        return False
+    templates = status_templates(config['HOMEWORK_STATUSES'])
+    decoder = ApiAnswerDecoder(config['HOMEWORK_STATUSES'])
+    rotated = rotate_token(registry, store, config)
+    PRACTICUM_TOKEN = config['PRACTICUM_TOKEN']
+    TELEGRAM_TOKEN = config['TELEGRAM_TOKEN']
+    CHAT_ID = config['CHAT_ID']
+    HOMEWORK_STATUSES = config['HOMEWORK_STATUSES']
+    STATUS_TEMPLATES = templates
+    API_DECODER = decoder
+    if commands is not None:
+        commands.verdicts = HOMEWORK_STATUSES
+    if client is not None:
+        bot.replace_bot(client)
+        if switch is not None:
+            switch.restart()
+    added, removed = sync_subscribers(
+        registry, store, scheduler, chats, rotated)
+    logging.info('Настройки перечитаны: подписчиков добавлено %s, '
+                 'удалено %s', len(added), len(removed))
+    return True
+
+
+def make_poll(bot, registry, store, leases=None):
+    """Функция опроса подписчика для планировщика."""
+    if POLL_CONCURRENCY:
+        poll = partial(async_check_subscription, AsyncLimits(), bot,
+                       store=store)
+    else:
+        poll = partial(check_subscription, bot, store=store)
+    if leases is None:
+        return poll
+    return ShardedPoll(poll, leases, store, registry, STATUS_CACHE,
+                       asynchronous=bool(POLL_CONCURRENCY))
+
+
+async def check_all_async(bot, registry, store=None):
+    """Одновременный опрос всех подписчиков в пределах AsyncLimits."""
+    import asyncio
+
+    limits = AsyncLimits()
+    try:
+        await asyncio.gather(*(
+            async_check_subscription(limits, bot, subscription, store=store)
+            for subscription in registry))
+    finally:
+        limits.shutdown()
+
+
+def run_once():
+    """Один опрос всех подписчиков для запуска по расписанию (--once).
+
+    Telegram загружается, только если есть что отправить: новые
+    уведомления или сообщения, не отправленные прошлым запуском.
+    """
+    if not check_constant_auth():
+        exit()
+    start_watchdog()
+    registry, store = load_state()
+    journal = OutboxJournal(STATE_FILE)
+    bot = LazyBot(partial(make_bot, journal))
+    if len(journal):
+        bot.get()
+    try:
+        if POLL_CONCURRENCY:
+            import asyncio
+
+            asyncio.run(check_all_async(bot, registry, store))
+        else:
+            for subscription in registry:
+                check_subscription(bot, subscription, store=store)
+    finally:
+        if bot.bot is not None:
+            close_bot(bot.bot)
+        journal.close()
+        store.close()
 
 
 def main():
-    """Основная функция запуска бота."""
+    """Основная функция запуска бота.
+
+    С SHARDING=1 несколько воркеров с общим STATE_FILE делят подписчиков
+    между собой, команды бота принимает только лидер. SIGTERM завершает
+    работу после текущего опроса и отправки очереди сообщений.
+    """
     if not check_constant_auth():
         exit()
-    bot = Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    send_error = True
-    while True:
-        try:
-            response = get_api_answer(ENDPOINT, current_timestamp)
-            if not check_response(response):
-                send_message(bot, 'Домашку не взяли на ревью')
-                current_timestamp = response.get('current_date')
-            else:
-                homework = check_response(response)
-                message = parse_status(homework)
-                send_message(bot, message)
-                current_timestamp = response.get('current_date')
-            time.sleep(RETRY_TIME)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            if send_error:
-                send_message(bot, message)
-                send_error = False
-            logging.error(message)
-            time.sleep(RETRY_TIME)
+    worker_id = (WORKER_ID or default_worker_id()) if SHARDING else None
+    journal = OutboxJournal(STATE_FILE, worker_id)
+    outbox = make_outbox(journal)
+    bot = make_bot(outbox=outbox)
+    if METRICS_PORT:
+        start_metrics(bot)
+    registry, store = load_state()
+    commands = BotCommands(registry, STATUS_CACHE, HOMEWORK_STATUSES)
+    switch = CommandsSwitch(commands) if BOT_COMMANDS else None
+    leases = None
+    if SHARDING:
+        leases = ShardLeases(STATE_FILE, worker_id, SHARD_TTL, switch,
+                             on_departed=outbox.adopt).start()
+    elif switch is not None:
+        switch(True)
+    scheduler = PollScheduler(
+        registry, make_poll(bot, registry, store, leases), RETRY_TIME,
+        AdaptivePolicy(
+            RETRY_TIME, REVIEWING_RETRY_TIME, MAX_RETRY_TIME, IDLE_POLLS),
+        budget=request_budget(POLL_BUDGET) if POLL_BUDGET else None,
+        watchdog=WATCHDOG)
+    start_watchdog()
+    signal.signal(signal.SIGTERM, lambda *args: scheduler.stop())
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda *args: scheduler.call_soon(
+            lambda: reload_config(registry, store, scheduler, bot, switch,
+                                  commands)))
+    try:
+        if POLL_CONCURRENCY:
+            import asyncio
+
+            asyncio.run(scheduler.run_forever_async())
+        else:
+            scheduler.run_forever()
+    finally:
+        close_bot(bot)
+        journal.close()
+        if leases is not None:
+            leases.close()
+        store.close()
+        logging.info('Бот остановлен')
 
 
 if __name__ == '__main__':
-    main()
+    listener = configure_logging()
+    profiler = None
+    try:
+        if '--profile' in sys.argv[1:]:
+            profiler = start_profiler()
+        if '--once' in sys.argv[1:]:
+            run_once()
+        else:
+            main()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        listener.stop()
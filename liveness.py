@@ -0,0 +1,165 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+
+from metrics import WATCHDOG_CANCELS
+
+
+class Watchdog:
+    """Сторож цикла опроса и вызовов внешних сервисов.
+
+    Стадия с beat(stage, expected) должна отметиться снова не позже
+    чем через expected секунд, её отставание - на сколько она опоздала.
+    Вызов внутри call(stage, cancel) считается зависшим, если длится
+    дольше stall секунд: check() один раз вызывает его cancel. Готов
+    бот, пока ни одна стадия не отстаёт больше чем на stall секунд,
+    жив - пока отставание меньше 2 * stall, то есть пока прерывание
+    зависших вызовов помогает.
+    """
+
+    def __init__(self, stall=300, interval=None, clock=time.monotonic):
+        self.stall = stall
+        self.interval = interval or stall / 4
+        self.clock = clock
+        self.deadlines = {}
+        self.calls = {}
+        self.cancelled = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def beat(self, stage, expected=0):
+        """Стадия завершилась, следующая отметка - через expected секунд."""
+        self.deadlines[stage] = self.clock() + expected
+
+    @contextmanager
+    def call(self, stage, cancel=None):
+        """Отслеживание вызова стадии, cancel прерывает его из сторожа."""
+        call_id = next(self._ids)
+        with self._lock:
+            self.calls[call_id] = [stage, self.clock(), cancel, False]
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self.calls[call_id]
+
+    def lags(self):
+        """Отставание стадий: {стадия: {'lag', 'in_flight'}}."""
+        now = self.clock()
+        stages = {
+            stage: {'lag': max(now - deadline, 0), 'in_flight': 0}
+            for stage, deadline in list(self.deadlines.items())}
+        with self._lock:
+            calls = list(self.calls.values())
+        for stage, started, _, _ in calls:
+            state = stages.setdefault(stage, {'lag': 0, 'in_flight': 0})
+            state['lag'] = max(state['lag'], now - started)
+            state['in_flight'] += 1
+        for state in stages.values():
+            state['lag'] = round(state['lag'], 3)
+        return stages
+
+    def check(self):
+        """Прерывание вызовов, которые длятся дольше stall секунд.
+
+        Возвращает стадии прерванных вызовов.
+        """
+        now = self.clock()
+        stalled = []
+        with self._lock:
+            for call in self.calls.values():
+                stage, started, cancel, cancelled = call
+                if cancelled or now - started < self.stall:
+                    continue
+                call[3] = True
+                stalled.append((stage, now - started, cancel))
+        for stage, lag, cancel in stalled:
+            self.cancelled[stage] = self.cancelled.get(stage, 0) + 1
+            WATCHDOG_CANCELS.inc(stage)
+            logging.error('Стадия %s зависла на %.1f с, вызов прерывается',
+                          stage, lag, extra={'latency': round(lag, 3)})
+            if cancel is not None:
+                try:
+                    cancel()
+                except Exception as error:
+                    logging.error('Сбой прерывания стадии %s: %s', stage,
+                                  error,
+                                  extra={'error': type(error).__name__})
+        return [stage for stage, _, _ in stalled]
+
+    def health(self):
+        """Состояние для проверок: живость, готовность и стадии."""
+        stages = self.lags()
+        lag = max((state['lag'] for state in stages.values()), default=0)
+        thread_alive = self._thread is None or self._thread.is_alive()
+        return {
+            'live': thread_alive and lag < 2 * self.stall,
+            'ready': thread_alive and lag < self.stall,
+            'stages': stages,
+            'cancelled': dict(self.cancelled),
+        }
+
+    def run(self):
+        """Цикл проверки стадий до stop."""
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Запуск потока сторожа."""
+        self._thread = threading.Thread(
+            target=self.run, name='watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Остановка потока сторожа."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def health_handler(watchdog):
+    """Класс обработчика проверок GET /healthz и /readyz.
+
+    http.server загружается только при запуске проверок.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        """Проверки GET /healthz (живость) и /readyz (готовность)."""
+
+        def do_GET(self):
+            """Ответ JSON с отставанием стадий, код 503 при сбое проверки."""
+            checks = {'/healthz': 'live', '/readyz': 'ready'}
+            if self.path not in checks:
+                self.send_error(404)
+                return
+            health = watchdog.health()
+            body = json.dumps(health).encode()
+            self.send_response(200 if health[checks[self.path]] else 503)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Проверки не логируются."""
+            pass
+
+    return HealthHandler
+
+
+def start_health_server(watchdog, port, host='127.0.0.1'):
+    """Запуск HTTP-проверок живости и готовности в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), health_handler(watchdog))
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='health', daemon=True).start()
+    return server
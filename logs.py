@@ -0,0 +1,116 @@
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from metrics import LOG_DROPPED
+
+EVENT_FIELDS = ('subscriber', 'homework', 'status', 'latency', 'error',
+                'service', 'worker', 'window', 'suppressed')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала одной строкой JSON с полями события.
+
+    Поля из EVENT_FIELDS передаются в extra вызова логгера.
+    """
+
+    def format(self, record):
+        """Строка JSON: время, уровень, логгер, сообщение и поля."""
+        event = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in EVENT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                event[field] = value
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class ErrorSampler(logging.Filter):
+    """Прореживание повторяющихся предупреждений и ошибок.
+
+    Из записей с одним шаблоном и классом ошибки за window секунд
+    пропускаются первые burst, остальные отбрасываются. Первая запись
+    следующего окна получает поле suppressed с числом отброшенных.
+    """
+
+    def __init__(self, window=60, burst=5, clock=time.monotonic):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.clock = clock
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Пропускать ли запись."""
+        if record.levelno < logging.WARNING or not self.burst:
+            return True
+        key = (record.name, record.levelno, record.msg,
+               getattr(record, 'error', None))
+        now = self.clock()
+        with self._lock:
+            started, passed, suppressed = self.windows.get(key, (None, 0, 0))
+            if started is None or now - started >= self.window:
+                if suppressed:
+                    record.suppressed = suppressed
+                self.windows[key] = (now, 1, 0)
+                return True
+            if passed < self.burst:
+                self.windows[key] = (started, passed + 1, suppressed)
+                return True
+            self.windows[key] = (started, passed, suppressed + 1)
+        LOG_DROPPED.inc('sampled')
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Передача записей в очередь без форматирования и ожидания.
+
+    Сообщение форматируется в потоке QueueListener, поэтому аргументы
+    записи должны быть неизменяемыми: строками, числами, исключениями.
+    При переполнении очереди запись отбрасывается.
+    """
+
+    def prepare(self, record):
+        """Запись передаётся без изменений."""
+        return record
+
+    def enqueue(self, record):
+        """Постановка в очередь без ожидания."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc('queue_full')
+
+
+def setup_logging(level=logging.INFO, fmt='json', stream=None,
+                  queue_size=10000, sample_window=60, sample_burst=5):
+    """Журнал через очередь и фоновый поток записи.
+
+    Возвращает запущенный QueueListener: его stop() дописывает очередь.
+    fmt - json или text.
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(
+        JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    queue_handler.addFilter(ErrorSampler(sample_window, sample_burst))
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener = QueueListener(queue_handler.queue, handler)
+    listener.start()
+    return listener
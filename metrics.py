@@ -0,0 +1,241 @@
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def format_labels(names, values):
+    """Метки метрики в формате Prometheus."""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Registry:
+    """Набор метрик, отдаваемый экспортёру."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """Добавление метрики в набор."""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    """Счётчик, при необходимости с метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *values, amount=1):
+        """Увеличение счётчика для значений меток values."""
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def value(self, *values):
+        """Текущее значение счётчика."""
+        return self._values.get(values, 0)
+
+    def samples(self):
+        """Строки значений для экспорта."""
+        return [
+            f'{self.name}{format_labels(self.labels, values)} {value}'
+            for values, value in list(self._values.items())
+        ]
+
+
+class Gauge:
+    """Текущее значение: задаётся set или вычисляется при экспорте."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._function = None
+        registry.register(self)
+
+    def set(self, value):
+        """Запись значения."""
+        self._value = value
+
+    def set_function(self, function):
+        """Вычисление значения функцией в момент экспорта."""
+        self._function = function
+
+    def value(self):
+        """Текущее значение."""
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def samples(self):
+        """Строки значений для экспорта."""
+        return [f'{self.name} {self.value()}']
+
+
+class Timer:
+    """Контекстный менеджер, записывающий длительность в гистограмму."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS,
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value):
+        """Запись одного наблюдения."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self):
+        """Замер длительности блока with."""
+        return Timer(self)
+
+    def count(self):
+        """Количество наблюдений."""
+        return sum(self._counts)
+
+    def samples(self):
+        """Строки значений для экспорта."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'homework_api_request_seconds', 'Длительность запроса к API Практикума')
+DECODE_SECONDS = Histogram(
+    'homework_api_decode_seconds', 'Длительность разбора JSON ответа API')
+PARSE_SECONDS = Histogram(
+    'homework_parse_seconds',
+    'Длительность check_response и parse_status для ответа API')
+SEND_SECONDS = Histogram(
+    'homework_telegram_send_seconds', 'Длительность отправки в Telegram')
+ERRORS = Counter(
+    'homework_errors_total', 'Ошибки цикла опроса по классу исключения',
+    labels=('exception',))
+POLL_INTERVAL = Gauge(
+    'homework_poll_interval_seconds', 'Последний назначенный интервал опроса')
+POLL_LAG = Gauge(
+    'homework_poll_lag_seconds',
+    'Наибольшее опоздание опроса относительно назначенного времени')
+QUEUE_DEPTH = Gauge(
+    'homework_outbox_depth', 'Сообщений в очереди на отправку в Telegram')
+CACHE_HIT_RATE = Gauge(
+    'homework_status_cache_hit_rate', 'Доля попаданий в кэш статусов')
+CONNECTIONS_REUSED = Gauge(
+    'homework_connections_reused', 'Переиспользованных соединений с API')
+SINK_SECONDS = Histogram(
+    'homework_sink_send_seconds', 'Длительность доставки получателю')
+SINK_FAILURES = Counter(
+    'homework_sink_failures_total',
+    'Уведомления, не доставленные получателю после повторов',
+    labels=('sink',))
+LOG_DROPPED = Counter(
+    'homework_log_dropped_total',
+    'Отброшенные записи журнала: переполнение очереди или прореживание',
+    labels=('reason',))
+BREAKER_TRANSITIONS = Counter(
+    'homework_breaker_transitions_total',
+    'Переключения предохранителей внешних сервисов',
+    labels=('service', 'state'))
+WATCHDOG_CANCELS = Counter(
+    'homework_watchdog_cancels_total',
+    'Зависшие вызовы, прерванные сторожем, по стадии',
+    labels=('stage',))
+
+
+def metrics_handler(registry=REGISTRY):
+    """Класс обработчика GET /metrics для реестра registry.
+
+    http.server загружается только при запуске экспортёра.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Отдача метрик по GET /metrics."""
+
+        def do_GET(self):
+            """Ответ текстом метрик."""
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Запросы к экспортёру не логируются."""
+            pass
+
+    return MetricsHandler
+
+
+def start_http_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Запуск экспортёра метрик в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), metrics_handler(registry))
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,319 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from metrics import SEND_SECONDS
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def batch_sizes(messages, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Сколько уведомлений подряд входит в каждую склейку."""
+    count = 0
+    size = 0
+    for message in messages:
+        if count and size + len(message) + 2 > limit:
+            yield count
+            count = 0
+            size = 0
+        count += 1
+        size += len(message) + 2
+    if count:
+        yield count
+
+
+def batch_messages(messages, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Склейка уведомлений в сообщения не длиннее limit символов."""
+    messages = list(messages)
+    start = 0
+    for count in batch_sizes(messages, limit):
+        yield '\n\n'.join(messages[start:start + count])
+        start += count
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Сколько ждать до появления токена."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        """Забрать токен."""
+        self._refill()
+        self.tokens -= 1
+
+
+class Outbox:
+    """Очередь исходящих сообщений Telegram с ограничением частоты.
+
+    Отправка идёт из отдельного потока: общий лимит и лимит на чат -
+    корзины токенов, накопившиеся сообщения одного чата склеиваются,
+    на RetryAfter и сетевые ошибки - повтор с паузой. Сетевые ошибки
+    не отменяют отправку: после max_retries попыток пауза между
+    повторами перестаёт расти. Пока предохранитель breaker разомкнут,
+    отправка ждёт пробной попытки. Метод send_message повторяет
+    сигнатуру Bot и не ждёт Telegram.
+
+    С journal очередь сохраняется в OutboxJournal и при создании
+    Outbox восстанавливается из него: забираются сообщения этого
+    воркера и ушедших воркеров. adopt забирает сообщения воркеров,
+    ушедших позже.
+    """
+
+    def __init__(self, bot, global_rate=30, chat_rate=1, chat_burst=3,
+                 max_retries=5, backoff=1, breaker=None,
+                 clock=time.monotonic, watchdog=None, journal=None):
+        self.bot = bot
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker
+        self.clock = clock
+        self.watchdog = watchdog
+        self.journal = journal
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock)
+        self._buckets = {}
+        self._pending = OrderedDict()
+        self._not_before = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._generation = 0
+        self._sending = 0
+        self.sent = 0
+        self.dropped = 0
+        if journal is not None:
+            for number, chat_id, text in journal.claim():
+                self._pending.setdefault(chat_id, []).append(
+                    (text, (number,)))
+
+    def adopt(self):
+        """Постановка в очередь сообщений ушедших воркеров из журнала."""
+        rows = self.journal.adopt()
+        if rows:
+            logging.info('Из очереди ушедших воркеров забрано '
+                         'сообщений: %s', len(rows))
+        with self._condition:
+            for number, chat_id, text in rows:
+                self._pending.setdefault(chat_id, []).append(
+                    (text, (number,)))
+            self._condition.notify()
+
+    def send_message(self, chat_id, text):
+        """Постановка сообщения в очередь без ожидания отправки."""
+        ids = ()
+        if self.journal is not None:
+            ids = (self.journal.add(chat_id, text),)
+        with self._condition:
+            self._pending.setdefault(chat_id, []).append((text, ids))
+            self._condition.notify()
+
+    def replace_bot(self, bot):
+        """Замена клиента Telegram, очередь сохраняется."""
+        with self._condition:
+            self.bot = bot
+
+    def depth(self):
+        """Количество сообщений в очереди."""
+        with self._condition:
+            return sum(map(len, self._pending.values()))
+
+    def start(self):
+        """Запуск потока отправки."""
+        with self._condition:
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        self._thread = threading.Thread(
+            target=self.run, args=(generation,), name='outbox', daemon=True)
+        self._thread.start()
+        return self
+
+    def restart(self):
+        """Новый поток отправки вместо зависшего.
+
+        Зависший поток завершится, когда вернётся из отправки.
+        """
+        logging.error('Поток отправки в Telegram перезапускается')
+        return self.start()
+
+    def stop(self, timeout=None):
+        """Остановка потока отправки после опустошения очереди."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        """Ожидание, пока очередь опустеет."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._condition:
+            while self._pending or self._sending:
+                wait = None if deadline is None else deadline - self.clock()
+                if wait is not None and wait <= 0:
+                    return False
+                self._condition.wait(wait)
+        return True
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, self.clock)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def _next_chat(self):
+        """Чат, который можно отправить раньше всех, и пауза до него."""
+        now = self.clock()
+        best_chat = None
+        best_delay = None
+        for chat_id in self._pending:
+            delay = max(self._bucket(chat_id).delay(),
+                        self._not_before.get(chat_id, now) - now)
+            if best_delay is None or delay < best_delay:
+                best_chat, best_delay = chat_id, delay
+                if not delay:
+                    break
+        delay = max(best_delay, self.global_bucket.delay())
+        if self.breaker is not None:
+            delay = max(delay, self.breaker.delay())
+        return best_chat, delay
+
+    def _take(self):
+        """Очередная пара (чат, записи (текст, номера)) или None."""
+        with self._condition:
+            while True:
+                if not self._pending:
+                    if not self._running:
+                        return None
+                    self._condition.wait()
+                    continue
+                chat_id, delay = self._next_chat()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                if self.breaker is not None and not self.breaker.allow():
+                    continue
+                self._bucket(chat_id).consume()
+                self.global_bucket.consume()
+                self._not_before.pop(chat_id, None)
+                self._sending += 1
+                return chat_id, self._pending.pop(chat_id)
+
+    def _requeue(self, chat_id, messages, delay=0):
+        with self._condition:
+            self._pending[chat_id] = messages + self._pending.get(chat_id, [])
+            self._pending.move_to_end(chat_id, last=False)
+            if delay:
+                self._not_before[chat_id] = self.clock() + delay
+
+    def _service_alive(self, alive):
+        if self.breaker is not None:
+            self.breaker.record(alive)
+
+    def _done(self, ids):
+        if self.journal is not None and ids:
+            self.journal.remove(ids)
+
+    def _deliver(self, chat_id, entries, attempt):
+        """Отправка первой склейки сообщений чата.
+
+        Возвращает номер следующей попытки или None, если повтор не нужен.
+        """
+        from telegram.error import (BadRequest, NetworkError, RetryAfter,
+                                    TelegramError, Unauthorized)
+
+        texts = [text for text, _ in entries]
+        count = next(batch_sizes(texts))
+        if count < len(entries):
+            self._requeue(chat_id, entries[count:])
+        text = '\n\n'.join(texts[:count])
+        ids = tuple(number for _, numbers in entries[:count]
+                    for number in numbers)
+        try:
+            with SEND_SECONDS.time(), self._watched():
+                self.bot.send_message(chat_id, text)
+            self._service_alive(True)
+            self.sent += 1
+            self._done(ids)
+            return None
+        except RetryAfter as error:
+            self._service_alive(True)
+            logging.warning('Telegram просит подождать %s с',
+                            error.retry_after, extra={'subscriber': chat_id})
+            self._requeue(chat_id, [(text, ids)], error.retry_after)
+            return attempt
+        except (BadRequest, Unauthorized) as error:
+            self._service_alive(True)
+            logging.error('Сбой при отправке сообщения в Telegram: %s',
+                          error, extra={'subscriber': chat_id,
+                                        'error': type(error).__name__})
+        except NetworkError as error:
+            self._service_alive(False)
+            if attempt == self.max_retries:
+                logging.error('Сообщение в Telegram не отправлено '
+                              'после %s попыток, повтор продолжается: %s',
+                              attempt + 1, error,
+                              extra={'subscriber': chat_id,
+                                     'error': type(error).__name__})
+            self._requeue(chat_id, [(text, ids)],
+                          self.backoff * 2 ** min(attempt, self.max_retries))
+            return attempt + 1
+        except TelegramError as error:
+            logging.error('Сбой при отправке сообщения в Telegram: %s',
+                          error, extra={'subscriber': chat_id,
+                                        'error': type(error).__name__})
+        self.dropped += 1
+        self._done(ids)
+        return None
+
+    def _watched(self):
+        if self.watchdog is None:
+            return nullcontext()
+        return self.watchdog.call('send', self.restart)
+
+    def run(self, generation=None):
+        """Цикл отправки сообщений из очереди.
+
+        generation - поколение потока: после restart старый поток
+        выходит из цикла.
+        """
+        if generation is None:
+            generation = self._generation
+        attempts = {}
+        while generation == self._generation:
+            item = self._take()
+            if item is None:
+                return
+            chat_id, entries = item
+            try:
+                attempt = self._deliver(
+                    chat_id, entries, attempts.pop(chat_id, 0))
+                if attempt:
+                    attempts[chat_id] = attempt
+            finally:
+                with self._condition:
+                    self._sending -= 1
+                    self._condition.notify_all()
@@ -0,0 +1,216 @@
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+
+def frame_label(code):
+    """Подпись кадра: функция (файл:строка начала функции)."""
+    return (f'{code.co_name} '
+            f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+
+
+class StackSampler:
+    """Сэмплирование стеков всех потоков раз в interval секунд.
+
+    Снимок - кортеж объектов кода, подписи кадров строятся только при
+    записи в формате folded (поток;внешний;...;внутренний кадр число),
+    который читают flamegraph.pl, speedscope и inferno. Время ожидания
+    тоже попадает в выборку, поэтому блокирующие вызовы видны наравне
+    с работой процессора.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Один снимок стеков всех потоков, кроме своего."""
+        names = {thread.ident: thread.name
+                 for thread in threading.enumerate()}
+        own = threading.get_ident()
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            stacks.append((names.get(ident, str(ident)), tuple(codes)))
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+    def run(self):
+        """Цикл сэмплирования до stop."""
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """Запуск потока сэмплирования."""
+        self._thread = threading.Thread(
+            target=self.run, name='profile-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Остановка потока сэмплирования."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path):
+        """Запись накопленных стеков в файл folded и сброс выборки.
+
+        Возвращает число снимков в файле.
+        """
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+            samples, self.samples = self.samples, 0
+        labels = {}
+        with open(path, 'w', encoding='utf-8') as file:
+            for (thread, codes), count in stacks.most_common():
+                for code in codes:
+                    if code not in labels:
+                        labels[code] = frame_label(code)
+                stack = ';'.join(
+                    [thread] + [labels[code] for code in reversed(codes)])
+                file.write(f'{stack} {count}\n')
+        return samples
+
+
+class AllocationTracker:
+    """Рост выделений памяти между снимками tracemalloc.
+
+    Места выделения сравниваются по стеку из frames кадров, поэтому
+    видно, чей код (requests, telegram или бота) вызвал растущее
+    выделение внутри стандартной библиотеки.
+    """
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, frames=10, top=10):
+        self.frames = frames
+        self.top = top
+        self.previous = None
+
+    def start(self):
+        """Включение tracemalloc и первый снимок."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.previous = self.snapshot()
+        return self
+
+    def stop(self):
+        """Выключение tracemalloc."""
+        self.previous = None
+        tracemalloc.stop()
+
+    def snapshot(self):
+        """Снимок выделений без служебных мест."""
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def diff(self):
+        """Места с наибольшим ростом памяти со времени прошлого вызова.
+
+        Возвращает top записей StatisticDiff по убыванию роста.
+        """
+        current = self.snapshot()
+        stats = current.compare_to(self.previous, 'traceback')
+        self.previous = current
+        growing = [stat for stat in stats if stat.size_diff > 0]
+        return growing[:self.top]
+
+    @staticmethod
+    def format(stats):
+        """Текстовый отчёт: рост, число блоков и стек места выделения."""
+        lines = []
+        for stat in stats:
+            lines.append(f'+{stat.size_diff / 1024:.1f} КиБ '
+                         f'(всего {stat.size / 1024:.1f} КиБ), '
+                         f'+{stat.count_diff} блоков')
+            lines.extend(
+                f'    {line}' for line in stat.traceback.format()
+                if line.strip())
+        return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    """Режим --profile: стеки и рост памяти раз в interval секунд.
+
+    В directory пишутся stacks-NNNN.folded с выборкой стеков за период
+    и allocations-NNNN.txt с местами, где память выросла за тот же
+    период. tracemalloc замедляет каждое выделение памяти, поэтому при
+    frames=0 память не отслеживается и пишутся только стеки.
+    """
+
+    def __init__(self, directory, interval=60, sample_interval=0.01,
+                 frames=10, top=10):
+        self.directory = directory
+        self.interval = interval
+        self.sampler = StackSampler(sample_interval)
+        self.tracker = AllocationTracker(frames, top) if frames else None
+        self.dumps = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск сэмплирования, tracemalloc и периодической записи."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.tracker is not None:
+            self.tracker.start()
+        self.sampler.start()
+        self._thread = threading.Thread(
+            target=self.run, name='profile-dump', daemon=True)
+        self._thread.start()
+        logging.info('Профилирование включено, отчёты в %s',
+                     self.directory)
+        return self
+
+    def run(self):
+        """Цикл записи отчётов до stop."""
+        while not self._stopped.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        """Запись отчёта за период со времени прошлой записи."""
+        self.dumps += 1
+        name = f'{self.dumps:04d}'
+        samples = self.sampler.dump(
+            os.path.join(self.directory, f'stacks-{name}.folded'))
+        if self.tracker is None:
+            logging.info('Отчёт профилирования %s: снимков стеков %s',
+                         name, samples)
+            return []
+        stats = self.tracker.diff()
+        with open(os.path.join(self.directory, f'allocations-{name}.txt'),
+                  'w', encoding='utf-8') as file:
+            file.write(self.tracker.format(stats))
+        logging.info(
+            'Отчёт профилирования %s: снимков стеков %s, память %s КиБ, '
+            'рост за период %s КиБ', name, samples,
+            tracemalloc.get_traced_memory()[0] // 1024,
+            sum(stat.size_diff for stat in stats) // 1024)
+        return stats
+
+    def stop(self):
+        """Последний отчёт и выключение профилирования."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sampler.stop()
+        self.dump()
+        if self.tracker is not None:
+            self.tracker.stop()
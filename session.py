@@ -0,0 +1,120 @@
+import socket
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from exceptions import TheStalledCallError
+
+
+class TrackedConnection:
+    """Соединение urllib3, которое сообщает адаптеру о своих запросах."""
+
+    adapter = None
+
+    def request(self, *args, **kwargs):
+        """Запрос с регистрацией соединения за текущим потоком."""
+        self.adapter.attach(self)
+        return super().request(*args, **kwargs)
+
+
+def tracked_pool(pool_class, adapter):
+    """Класс пула urllib3 с соединениями, известными адаптеру."""
+    connection_class = type(
+        pool_class.ConnectionCls.__name__,
+        (TrackedConnection, pool_class.ConnectionCls), {'adapter': adapter})
+    return type(pool_class.__name__, (pool_class,),
+                {'ConnectionCls': connection_class})
+
+
+class InterruptibleAdapter(HTTPAdapter):
+    """HTTPAdapter, запрос которого можно прервать из другого потока.
+
+    interrupt(поток) закрывает сокет текущего запроса потока, и
+    ожидание ответа сразу завершается ошибкой. Повтор запроса этим
+    потоком до release выбрасывает TheStalledCallError, поэтому
+    прерванный запрос не повторяется по max_retries. Ошибка прерванного
+    запроса внутри interruptible тоже заменяется на TheStalledCallError.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._connections = {}
+        self._interrupted = set()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Пул соединений с отслеживанием запросов."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': tracked_pool(HTTPConnectionPool, self),
+            'https': tracked_pool(HTTPSConnectionPool, self),
+        }
+
+    def attach(self, connection):
+        """Соединение текущего запроса потока."""
+        ident = threading.get_ident()
+        if ident in self._interrupted:
+            raise TheStalledCallError('Запрос прерван сторожем')
+        self._connections[ident] = connection
+
+    def interrupt(self, ident):
+        """Прерывание текущего запроса потока ident."""
+        self._interrupted.add(ident)
+        connection = self._connections.get(ident)
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def release(self, ident):
+        """Запрос потока ident завершён."""
+        self._interrupted.discard(ident)
+        self._connections.pop(ident, None)
+
+    @contextmanager
+    def interruptible(self, watchdog, stage):
+        """Запрос текущего потока под сторожем watchdog."""
+        ident = threading.get_ident()
+        try:
+            with watchdog.call(stage, lambda: self.interrupt(ident)):
+                yield
+        except TheStalledCallError:
+            raise
+        except Exception as error:
+            if ident in self._interrupted:
+                raise TheStalledCallError(
+                    'Запрос прерван сторожем') from error
+            raise
+        finally:
+            self.release(ident)
+
+
+
+class PooledSession(requests.Session):
+    """Общая сессия с пулом keep-alive соединений к API."""
+
+    def __init__(self, pool_size=10, retries=3):
+        super().__init__()
+        self.adapter = InterruptibleAdapter(
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries, backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=('GET',)))
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+
+    def connection_stats(self):
+        """Сколько соединений открыто заново и сколько переиспользовано."""
+        opened = sent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            sent += pool.num_requests
+        return {'opened': opened, 'reused': max(sent - opened, 0)}
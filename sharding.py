@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from bisect import bisect
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    token TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+'''
+
+
+def default_worker_id():
+    """Имя воркера: хост и номер процесса."""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def ring_hash(key):
+    """Точка ключа на кольце."""
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Кольцо консистентного хеширования: токен -> воркер.
+
+    Каждый воркер занимает replicas точек, поэтому при уходе воркера
+    к остальным переходят только его токены.
+    """
+
+    def __init__(self, members=(), replicas=64):
+        self.members = sorted(members)
+        points = sorted(
+            (ring_hash(f'{member}#{replica}'), member)
+            for member in self.members for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._members = [member for _, member in points]
+
+    def owner(self, key):
+        """Воркер, отвечающий за ключ, или None для пустого кольца."""
+        if not self._members:
+            return None
+        index = bisect(self._hashes, ring_hash(key)) % len(self._hashes)
+        return self._members[index]
+
+
+class ShardLeases:
+    """Распределение подписчиков между воркерами через общую SQLite.
+
+    Воркеры продлевают запись о себе раз в ttl / 3 секунд; живые воркеры
+    образуют кольцо, по которому делятся токены. Опрашивать подписчика
+    можно только под арендой токена, поэтому два воркера не опрашивают
+    его одновременно, даже если их представления о кольце расходятся.
+    Лидер - живой воркер с наименьшим именем; при смене лидерства
+    вызывается on_leader(True или False), при уходе других воркеров -
+    on_departed().
+    """
+
+    def __init__(self, path, worker_id=None, ttl=60, on_leader=None,
+                 clock=time.time, on_departed=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.on_leader = on_leader
+        self.on_departed = on_departed
+        self.clock = clock
+        self.connection = sqlite3.connect(
+            path, timeout=ttl, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.ring = HashRing()
+        self.leader = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def heartbeat(self):
+        """Продление записи воркера и обновление кольца живых воркеров."""
+        now = self.clock()
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (self.worker_id, now + self.ttl))
+            self.connection.execute(
+                'DELETE FROM workers WHERE expires < ?', (now,))
+            workers = [worker for worker, in self.connection.execute(
+                'SELECT worker FROM workers ORDER BY worker')]
+        if workers != self.ring.members:
+            logging.info('Воркеры: %s', ', '.join(workers),
+                         extra={'worker': self.worker_id})
+            departed = set(self.ring.members) - set(workers)
+            self.ring = HashRing(workers)
+            if departed and self.on_departed is not None:
+                self.on_departed()
+        leader = workers[0] == self.worker_id
+        if leader != self.leader:
+            self.leader = leader
+            if leader:
+                logging.info('Воркер %s стал лидером', self.worker_id,
+                             extra={'worker': self.worker_id})
+            if self.on_leader is not None:
+                self.on_leader(leader)
+        return workers
+
+    def owns(self, token):
+        """Отвечает ли этот воркер за токен по кольцу."""
+        return self.ring.owner(token) == self.worker_id
+
+    def acquire(self, token):
+        """Аренда токена на ttl секунд.
+
+        None - токен арендован другим воркером, False - аренда уже была
+        у этого воркера и продлена, True - аренда только что получена.
+        """
+        now = self.clock()
+        with self._lock, self.connection:
+            renewed = self.connection.execute(
+                'UPDATE leases SET expires = ? '
+                'WHERE token = ? AND worker = ?',
+                (now + self.ttl, token, self.worker_id)).rowcount
+            if renewed:
+                return False
+            acquired = self.connection.execute(
+                'INSERT INTO leases VALUES (?, ?, ?) '
+                'ON CONFLICT (token) DO UPDATE SET '
+                'worker = excluded.worker, expires = excluded.expires '
+                'WHERE leases.expires < ?',
+                (token, self.worker_id, now + self.ttl, now)).rowcount
+        return True if acquired else None
+
+    def release(self, token):
+        """Отказ от аренды токена."""
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM leases WHERE token = ? AND worker = ?',
+                (token, self.worker_id))
+
+    def start(self):
+        """Фоновое продление записи воркера."""
+        self.heartbeat()
+        self._thread = threading.Thread(
+            target=self.run, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        """Цикл продления записи воркера."""
+        while not self._stopped.wait(self.ttl / 3):
+            try:
+                self.heartbeat()
+            except sqlite3.Error as error:
+                logging.error('Сбой продления аренды воркера: %s', error,
+                              extra={'worker': self.worker_id,
+                                     'error': type(error).__name__})
+
+    def close(self):
+        """Уход воркера: аренды сразу переходят остальным."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM leases WHERE worker = ?', (self.worker_id,))
+            self.connection.execute(
+                'DELETE FROM workers WHERE worker = ?', (self.worker_id,))
+        self.connection.close()
+
+
+async def skip_poll():
+    """Пропущенный асинхронный опрос чужого подписчика."""
+    return None
+
+
+class ShardedPoll:
+    """Обёртка функции опроса: опрашиваются только свои подписчики.
+
+    Получив аренду токена, который до этого опрашивал другой воркер,
+    состояние подписчика перечитывается из чекпоинта, поэтому уже
+    отправленные статусы не отправляются повторно. Лидер перечитывает
+    из чекпоинта и чужих подписчиков, чтобы отвечать на команды бота.
+    """
+
+    def __init__(self, poll, leases, store, registry, cache,
+                 asynchronous=False):
+        self.poll = poll
+        self.leases = leases
+        self.store = store
+        self.registry = registry
+        self.cache = cache
+        self.asynchronous = asynchronous
+
+    def claim(self, subscription):
+        """Можно ли этому воркеру опрашивать подписчика сейчас."""
+        token = subscription.token
+        if not self.leases.owns(token):
+            self.leases.release(token)
+            if self.leases.leader:
+                self.store.restore(self.registry, self.cache, [token])
+            return False
+        acquired = self.leases.acquire(token)
+        if acquired is None:
+            return False
+        if acquired:
+            self.store.restore(self.registry, self.cache, [token])
+        return True
+
+    def __call__(self, subscription):
+        """Опрос подписчика, если он принадлежит этому воркеру."""
+        if self.claim(subscription):
+            return self.poll(subscription)
+        if self.asynchronous:
+            return skip_poll()
+        return None
@@ -0,0 +1,338 @@
+import json
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+
+from metrics import SINK_FAILURES, SINK_SECONDS
+
+
+class Sink(ABC):
+    """Получатель уведомлений.
+
+    send(chat_id, text) доставляет одно уведомление и выбрасывает
+    исключение при сбое. send_to_chats получает все чаты события,
+    первый из них - чат подписчика; получатель, не связанный с чатами,
+    доставляет уведомление один раз для чата подписчика. timeout -
+    предел одной попытки: получатель передаёт его своему вводу-выводу,
+    а SinkWorker прерывает ожидание попытки, которая длится дольше.
+    retries - число повторов после сбоя.
+    """
+
+    name = 'sink'
+
+    def __init__(self, timeout=10, retries=2):
+        self.timeout = timeout
+        self.retries = retries
+
+    @abstractmethod
+    def send(self, chat_id, text):
+        """Доставка уведомления."""
+
+    def send_to_chats(self, chat_ids, text):
+        """Доставка уведомления события с чатами chat_ids."""
+        self.send(chat_ids[0], text)
+
+    def depth(self):
+        """Уведомлений, ожидающих отправки внутри получателя."""
+        return 0
+
+    def replace_bot(self, bot):
+        """Замена клиента Telegram после смены токена."""
+        pass
+
+    def close(self, timeout=None):
+        """Освобождение ресурсов получателя."""
+        pass
+
+
+class TelegramSink(Sink):
+    """Чат подписчика и дополнительные чаты Telegram через Outbox."""
+
+    name = 'telegram'
+
+    def __init__(self, bot, chat_ids=(), timeout=10, retries=0):
+        super().__init__(timeout, retries)
+        self.bot = bot
+        self.chat_ids = list(chat_ids)
+
+    def send(self, chat_id, text):
+        """Постановка уведомления в очередь отправки каждого чата."""
+        self.send_to_chats([chat_id], text)
+
+    def send_to_chats(self, chat_ids, text):
+        """Постановка уведомления в очереди чатов события и chat_ids."""
+        targets = list(chat_ids)
+        for chat_id in self.chat_ids:
+            if str(chat_id) not in map(str, targets):
+                targets.append(chat_id)
+        for target in targets:
+            self.bot.send_message(target, text)
+
+    def depth(self):
+        """Сообщений в очереди Outbox."""
+        return self.bot.depth()
+
+    def replace_bot(self, bot):
+        """Замена клиента Telegram в Outbox."""
+        self.bot.replace_bot(bot)
+
+    def close(self, timeout=None):
+        """Отправка очереди Outbox и остановка его потока.
+
+        Без timeout очередь ждёт не дольше timeout получателя.
+        """
+        self.bot.join(timeout=self.timeout if timeout is None else timeout)
+        self.bot.stop(timeout=1)
+
+
+class WebhookSink(Sink):
+    """POST уведомления в формате JSON на адрес url."""
+
+    name = 'webhook'
+
+    def __init__(self, url, timeout=10, retries=2, session=None):
+        super().__init__(timeout, retries)
+        self.url = url
+        self.session = session
+
+    def send(self, chat_id, text):
+        """Отправка JSON {'chat_id', 'text'}."""
+        if self.session is None:
+            import requests
+
+            self.session = requests.Session()
+        response = self.session.post(
+            self.url, json={'chat_id': chat_id, 'text': text},
+            timeout=self.timeout)
+        response.raise_for_status()
+
+
+class EmailSink(Sink):
+    """Письмо через SMTP-сервер host:port."""
+
+    name = 'email'
+
+    def __init__(self, host, port, sender, recipients, timeout=10,
+                 retries=2):
+        super().__init__(timeout, retries)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+
+    def send(self, chat_id, text):
+        """Отправка письма с первой строкой уведомления в теме."""
+        message = EmailMessage()
+        message['Subject'] = text.split('\n', 1)[0][:120]
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content(text)
+        import smtplib
+
+        with smtplib.SMTP(self.host, self.port,
+                          timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+class AuditSink(Sink):
+    """Журнал уведомлений строками JSON в файле path."""
+
+    name = 'audit'
+
+    def __init__(self, path, timeout=10, retries=2):
+        super().__init__(timeout, retries)
+        self.path = path
+
+    def send(self, chat_id, text):
+        """Дописывание строки {'time', 'chat_id', 'text'}.
+
+        Файл на сетевом или переполненном диске может не отвечать;
+        такую запись прерывает SinkWorker по timeout.
+        """
+        line = json.dumps({'time': time.time(), 'chat_id': chat_id,
+                           'text': text}, ensure_ascii=False)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line + '\n')
+
+
+SINK_TYPES = {
+    'telegram': TelegramSink,
+    'webhook': WebhookSink,
+    'email': EmailSink,
+    'audit': AuditSink,
+}
+
+
+def load_sinks(path, bot):
+    """Получатели из JSON-файла [{'type': ..., параметры}].
+
+    Чат подписчика в Telegram получает уведомления всегда; запись с
+    типом telegram добавляет к нему чаты chat_ids и задаёт timeout и
+    retries.
+    """
+    with open(path, encoding='utf-8') as file:
+        config = json.load(file)
+    telegram = {'chat_ids': []}
+    sinks = []
+    for options in config:
+        options = dict(options)
+        kind = options.pop('type')
+        if kind == 'telegram':
+            telegram['chat_ids'].extend(options.pop('chat_ids', ()))
+            telegram.update(options)
+            continue
+        sinks.append(SINK_TYPES[kind](**options))
+    logging.info('Получателей уведомлений: %s', len(sinks) + 1)
+    return [TelegramSink(bot, **telegram)] + sinks
+
+
+class SinkWorker:
+    """Очередь и поток доставки одного получателя."""
+
+    def __init__(self, sink, backoff=1):
+        self.sink = sink
+        self.backoff = backoff
+        self.queue = queue.Queue()
+        self._calls = None
+        self.thread = threading.Thread(
+            target=self.run, name=f'sink-{sink.name}', daemon=True)
+
+    def call(self, chat_ids, text):
+        """Одна попытка доставки не дольше timeout получателя.
+
+        Попытки идут в отдельном потоке-демоне. Если попытка не уложилась
+        в timeout, выбрасывается TimeoutError, а следующие идут в новом
+        потоке: зависший завершится сам, когда вернётся из ввода-вывода.
+        """
+        if self._calls is None:
+            self._calls = queue.Queue()
+            threading.Thread(
+                target=self.run_calls, args=(self._calls,),
+                name=f'sink-{self.sink.name}-call', daemon=True).start()
+        done = threading.Event()
+        result = {}
+        self._calls.put((chat_ids, text, done, result))
+        if not done.wait(self.sink.timeout):
+            self._calls.put(None)
+            self._calls = None
+            raise TimeoutError(
+                f'Получатель не ответил за {self.sink.timeout} с')
+        if 'error' in result:
+            raise result['error']
+
+    def run_calls(self, calls):
+        """Цикл попыток доставки до пустого элемента очереди calls."""
+        while True:
+            item = calls.get()
+            if item is None:
+                return
+            chat_ids, text, done, result = item
+            try:
+                self.sink.send_to_chats(chat_ids, text)
+            except Exception as error:
+                result['error'] = error
+            finally:
+                done.set()
+
+    def deliver(self, chat_ids, text):
+        """Доставка в чаты chat_ids с повторами.
+
+        Возвращает False, если уведомление потеряно.
+        """
+        chat_id = chat_ids[0]
+        for attempt in range(self.sink.retries + 1):
+            try:
+                with SINK_SECONDS.time():
+                    self.call(chat_ids, text)
+                return True
+            except Exception as error:
+                logging.warning(
+                    'Сбой доставки получателю %s (попытка %s): %s',
+                    self.sink.name, attempt + 1, error,
+                    extra={'subscriber': chat_id, 'service': self.sink.name,
+                           'error': type(error).__name__})
+                if attempt < self.sink.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        SINK_FAILURES.inc(self.sink.name)
+        logging.error('Уведомление не доставлено получателю %s',
+                      self.sink.name, extra={'subscriber': chat_id,
+                                             'service': self.sink.name})
+        return False
+
+    def run(self):
+        """Цикл доставки до пустого элемента очереди."""
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.deliver(*item)
+            finally:
+                self.queue.task_done()
+
+
+class FanOut:
+    """Параллельная рассылка уведомлений нескольким получателям.
+
+    У каждого получателя своя очередь и поток, поэтому медленный
+    получатель не задерживает остальных и следующий опрос. Метод
+    send_message повторяет сигнатуру Bot и не ждёт доставки; текст
+    уведомления один и тот же объект для всех получателей.
+    """
+
+    def __init__(self, sinks, backoff=1):
+        self.workers = [SinkWorker(sink, backoff) for sink in sinks]
+
+    def start(self):
+        """Запуск потоков доставки."""
+        for worker in self.workers:
+            worker.thread.start()
+        return self
+
+    def send_message(self, chat_id, text):
+        """Постановка уведомления в очередь каждого получателя."""
+        self.send_to_chats([chat_id], text)
+
+    def send_to_chats(self, chat_ids, text):
+        """Одно уведомление для всех чатов события в очередь получателей.
+
+        Telegram отправляет его в каждый чат, остальные получатели
+        доставляют его один раз.
+        """
+        chat_ids = list(chat_ids)
+        for worker in self.workers:
+            worker.queue.put((chat_ids, text))
+
+    def depth(self):
+        """Уведомлений, ещё не доставленных получателям."""
+        return sum(worker.queue.qsize() + worker.sink.depth()
+                   for worker in self.workers)
+
+    def replace_bot(self, bot):
+        """Замена клиента Telegram у получателей."""
+        for worker in self.workers:
+            worker.sink.replace_bot(bot)
+
+    def join(self, timeout=None):
+        """Ожидание, пока все очереди опустеют."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self.workers:
+            with worker.queue.all_tasks_done:
+                while worker.queue.unfinished_tasks:
+                    wait = (None if deadline is None
+                            else deadline - time.monotonic())
+                    if wait is not None and wait <= 0:
+                        return False
+                    worker.queue.all_tasks_done.wait(wait)
+        return True
+
+    def stop(self, timeout=None):
+        """Остановка потоков после опустошения очередей."""
+        for worker in self.workers:
+            worker.queue.put(None)
+        for worker in self.workers:
+            worker.thread.join(timeout)
+            worker.sink.close(timeout)
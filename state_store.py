@@ -0,0 +1,222 @@
+import sqlite3
+import threading
+import time
+
+from event_store import EventStore
+from sharding import SCHEMA as WORKERS_SCHEMA
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS subscriptions (
+    token TEXT PRIMARY KEY,
+    from_date INTEGER,
+    send_error INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    token TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT,
+    date_updated,
+    PRIMARY KEY (token, homework)
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    token TEXT NOT NULL,
+    error TEXT NOT NULL,
+    message TEXT NOT NULL,
+    notified REAL NOT NULL,
+    PRIMARY KEY (token, error, message)
+);
+'''
+
+
+class StateStore:
+    """Чекпоинт состояния бота в SQLite для тёплого перезапуска.
+
+    Хранит current_date последнего удачного ответа, флаг отправки
+    ошибки и время сообщений о сбоях по их отпечаткам для каждого
+    подписчика, а также уже отправленные статусы домашек, чтобы после
+    перезапуска не слать их повторно. Смены
+    статусов дописываются в журнал events в той же транзакции.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.events = EventStore(self.connection)
+
+    def close(self):
+        """Закрытие базы."""
+        self.connection.close()
+
+    def restore(self, registry, cache, tokens=None):
+        """Восстановление подписчиков реестра и кэша статусов.
+
+        tokens - восстановить только этих подписчиков.
+        """
+        condition, parameters = '', ()
+        if tokens is not None:
+            tokens = list(tokens)
+            condition = (
+                f' WHERE token IN ({", ".join("?" * len(tokens))})')
+            parameters = tokens
+        restored = 0
+        rows = self.connection.execute(
+            'SELECT token, from_date, send_error FROM subscriptions'
+            + condition, parameters)
+        for token, from_date, send_error in rows:
+            subscription = registry.get(token)
+            if subscription is None:
+                continue
+            subscription.from_date = from_date or subscription.from_date
+            subscription.send_error = bool(send_error)
+            restored += 1
+        rows = self.connection.execute(
+            'SELECT token, error, message, notified FROM notifications'
+            + condition, parameters)
+        for token, error, message, notified in rows:
+            subscription = registry.get(token)
+            if subscription is not None:
+                subscription.notified[(error, message)] = notified
+        rows = self.connection.execute(
+            'SELECT token, homework, status, date_updated FROM statuses'
+            + condition, parameters)
+        for token, homework, status, date_updated in rows:
+            if token in registry:
+                cache.restore(token, homework, (status, date_updated))
+        return restored
+
+    def move(self, token, new_token):
+        """Перенос состояния подписчика на новый токен того же студента.
+
+        Вместе с чекпоинтом переносятся журнал событий и открытые ревью,
+        поэтому ревью, взятое до смены токена, закрывается после неё.
+        """
+        with self.connection:
+            for table in ('subscriptions', 'statuses', 'notifications'):
+                self.connection.execute(
+                    f'UPDATE OR REPLACE {table} SET token = ? '
+                    'WHERE token = ?', (new_token, token))
+            self.events.move(token, new_token)
+
+    def checkpoint(self, subscription, cache):
+        """Атомарная запись состояния подписчика после цикла опроса."""
+        statuses = [
+            (token, homework, status, date_updated)
+            for (token, homework), (status, date_updated)
+            in cache.pop_dirty(subscription.token)
+        ]
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO subscriptions '
+                'VALUES (?, ?, ?)',
+                (subscription.token, subscription.from_date,
+                 subscription.send_error))
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)',
+                statuses)
+            self.connection.execute(
+                'DELETE FROM notifications WHERE token = ?',
+                (subscription.token,))
+            self.connection.executemany(
+                'INSERT INTO notifications VALUES (?, ?, ?, ?)',
+                [(subscription.token, error, message, notified)
+                 for (error, message), notified
+                 in subscription.notified.items()])
+            self.events.append(
+                [(token, homework, cache.name(token, homework), status,
+                  date_updated)
+                 for token, homework, status, date_updated in statuses],
+                time.time())
+
+
+class OutboxJournal:
+    """Неотправленные сообщения Outbox в SQLite.
+
+    Сообщение записывается при постановке в очередь и удаляется после
+    доставки или окончательного отказа Telegram, поэтому уведомления,
+    которые не успели уйти до остановки, отправляются после перезапуска.
+    Своё соединение с блокировкой: запись идёт из потоков опроса,
+    удаление - из потока отправки.
+
+    С worker_id журнал делят воркеры шардирования: каждое сообщение
+    помечено воркером, который его отправляет, и claim забирает только
+    свои сообщения и сообщения воркеров, чья запись в workers истекла.
+    """
+
+    def __init__(self, path, worker_id=None, clock=time.time):
+        self.worker_id = worker_id
+        self.clock = clock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'id INTEGER PRIMARY KEY, chat_id NOT NULL, text TEXT NOT NULL, '
+            'worker TEXT)')
+        columns = [column for _, column, *_ in self.connection.execute(
+            'PRAGMA table_info(outbox)')]
+        if 'worker' not in columns:
+            self.connection.execute(
+                'ALTER TABLE outbox ADD COLUMN worker TEXT')
+        if worker_id is not None:
+            self.connection.executescript(WORKERS_SCHEMA)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def close(self):
+        """Закрытие соединения."""
+        self.connection.close()
+
+    def add(self, chat_id, text):
+        """Запись сообщения, возвращает его номер."""
+        with self._lock, self.connection:
+            return self.connection.execute(
+                'INSERT INTO outbox (chat_id, text, worker) VALUES (?, ?, ?)',
+                (chat_id, text, self.worker_id)).lastrowid
+
+    def remove(self, ids):
+        """Удаление доставленных сообщений."""
+        with self._lock, self.connection:
+            self.connection.executemany(
+                'DELETE FROM outbox WHERE id = ?',
+                [(number,) for number in ids])
+
+    def claim(self):
+        """Неотправленные сообщения (номер, чат, текст) этого воркера.
+
+        Вместе со своими забираются сообщения ушедших воркеров. Без
+        worker_id возвращаются все сообщения. Порядок - порядок записи.
+        """
+        with self._lock:
+            if self.worker_id is None:
+                return self.connection.execute(
+                    'SELECT id, chat_id, text FROM outbox '
+                    'ORDER BY id').fetchall()
+            own = self.connection.execute(
+                'SELECT id, chat_id, text FROM outbox WHERE worker = ?',
+                (self.worker_id,)).fetchall()
+        return sorted(own + self.adopt())
+
+    def adopt(self):
+        """Сообщения ушедших воркеров, перешедшие этому воркеру.
+
+        Ушедший воркер - тот, чьей действующей записи нет в workers.
+        Сообщения выбираются и переписываются на этот воркер в одной
+        транзакции, поэтому одно сообщение не забирают двое.
+        """
+        with self._lock, self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            rows = self.connection.execute(
+                'SELECT id, chat_id, text FROM outbox '
+                'WHERE worker IS NULL OR (worker != ? AND worker NOT IN '
+                '(SELECT worker FROM workers WHERE expires >= ?)) '
+                'ORDER BY id', (self.worker_id, self.clock())).fetchall()
+            self.connection.executemany(
+                'UPDATE outbox SET worker = ? WHERE id = ?',
+                [(self.worker_id, number) for number, _, _ in rows])
+        return rows
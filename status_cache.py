@@ -0,0 +1,119 @@
+from collections import deque
+
+HISTORY_SIZE = 50
+
+
+class StatusCache:
+    """Последние увиденные статусы домашек и валидаторы ответов API.
+
+    Для каждого подписчика хранится также короткая история переходов,
+    из которой бот отвечает на команды без запросов к API.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._statuses = {}
+        self._names = {}
+        self._history = {}
+        self._validators = {}
+        self._dirty = {}
+        self.history_size = history_size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(map(len, self._statuses.values()))
+
+    @staticmethod
+    def homework_key(homework):
+        """Ключ домашки: id, а если его нет - название."""
+        return str(homework.get('id') or homework.get('homework_name'))
+
+    def changed(self, token, homework):
+        """Запоминает статус домашки, True - если он изменился."""
+        key = self.homework_key(homework)
+        state = (homework.get('status'), homework.get('date_updated'))
+        statuses = self._statuses.setdefault(token, {})
+        if statuses.get(key) == state:
+            self.hits += 1
+            return False
+        statuses[key] = state
+        name = homework.get('homework_name') or key
+        self._names.setdefault(token, {})[key] = name
+        history = self._history.get(token)
+        if history is None:
+            history = self._history[token] = deque(maxlen=self.history_size)
+        history.append((state[1], name, state[0]))
+        self._dirty.setdefault(token, set()).add(key)
+        self.misses += 1
+        return True
+
+    def restore(self, token, homework, state):
+        """Восстановление статуса домашки из чекпоинта."""
+        self._statuses.setdefault(token, {})[homework] = state
+
+    def move(self, token, new_token):
+        """Перенос статусов и истории на новый токен того же студента.
+
+        Валидаторы ответа не переносятся: первый запрос с новым токеном
+        безусловный.
+        """
+        for table in (self._statuses, self._names, self._history,
+                      self._dirty):
+            if token in table:
+                table[new_token] = table.pop(token)
+        self._validators.pop(token, None)
+
+    def pop_dirty(self, token):
+        """Статусы подписчика, изменённые с прошлого чекпоинта."""
+        statuses = self._statuses.get(token, {})
+        return [
+            ((token, key), statuses[key])
+            for key in self._dirty.pop(token, ())
+        ]
+
+    def name(self, token, key):
+        """Название домашки подписчика по её ключу."""
+        return self._names.get(token, {}).get(key, key)
+
+    def statuses(self, token):
+        """Текущие статусы домашек подписчика: (название, статус, дата)."""
+        names = self._names.get(token, {})
+        return [
+            (names.get(key, key), status, date_updated)
+            for key, (status, date_updated)
+            in list(self._statuses.get(token, {}).items())
+        ]
+
+    def history(self, token):
+        """Последние переходы статусов подписчика: (дата, название, статус)."""
+        return list(self._history.get(token, ()))
+
+    def request_headers(self, token):
+        """Заголовки условного запроса по валидаторам прошлого ответа."""
+        etag, last_modified = self._validators.get(token, (None, None))
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def remember_response(self, token, response_headers):
+        """Сохранение ETag и Last-Modified из ответа API."""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if etag or last_modified:
+            self._validators[token] = (etag, last_modified)
+
+    def not_modified(self):
+        """Учёт ответа 304 как попадания в кэш."""
+        self.hits += 1
+
+    def stats(self):
+        """Попадания, промахи и доля попаданий в кэш."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
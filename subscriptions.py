@@ -0,0 +1,418 @@
+import heapq
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+from metrics import POLL_INTERVAL, POLL_LAG
+from outbox import TokenBucket
+
+
+def error_fingerprint(error):
+    """Отпечаток ошибки: класс и текст без чисел."""
+    return type(error).__name__, re.sub(r'\d+', '#', str(error))
+
+
+class Subscription:
+    """Подписчик: токен Практикума, чат и дата последнего ответа.
+
+    watchers - другие чаты, следящие за тем же токеном: ментор, группа.
+    Токен опрашивается один раз, уведомления получают все чаты.
+    """
+
+    __slots__ = ('token', 'chat_id', 'from_date', 'send_error',
+                 'reviewing', 'errors', 'idle_polls', 'retry_after',
+                 'paused', 'notified', 'watchers')
+
+    def __init__(self, token, chat_id, from_date=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.from_date = from_date or int(time.time())
+        self.send_error = True
+        self.reviewing = False
+        self.errors = 0
+        self.idle_polls = 0
+        self.retry_after = None
+        self.paused = False
+        self.notified = {}
+        self.watchers = []
+
+    def __repr__(self):
+        return f'Subscription(chat_id={self.chat_id!r})'
+
+    def chats(self):
+        """Все чаты, получающие уведомления по токену."""
+        return [self.chat_id] + self.watchers
+
+    def watch(self, chat_id):
+        """Добавление чата к уведомлениям по токену."""
+        if str(chat_id) not in map(str, self.chats()):
+            self.watchers.append(chat_id)
+
+    def poll_succeeded(self, statuses):
+        """Учёт удачного опроса, statuses - новые статусы домашек."""
+        self.errors = 0
+        self.retry_after = None
+        if statuses:
+            self.idle_polls = 0
+            self.reviewing = statuses[-1] == 'reviewing'
+        else:
+            self.idle_polls += 1
+
+    def poll_failed(self, retry_after=None):
+        """Учёт неудачного опроса и подсказки сервера о паузе."""
+        self.errors += 1
+        self.retry_after = retry_after
+
+    def error_notification_due(self, error, now, window):
+        """Нужно ли сообщать об ошибке: такой не было последние window с.
+
+        now - время по часам эпохи: отпечатки сохраняются в чекпоинте,
+        поэтому окно действует и между перезапусками.
+        """
+        fingerprint = error_fingerprint(error)
+        notified = self.notified.get(fingerprint)
+        if notified is not None and now - notified < window:
+            return False
+        self.notified[fingerprint] = now
+        self.send_error = False
+        return True
+
+    def recovered(self):
+        """True, если о сбое сообщали и теперь опрос снова удачен."""
+        if self.send_error:
+            return False
+        self.send_error = True
+        self.notified.clear()
+        return True
+
+
+def load_chats(path):
+    """Чаты подписчиков из JSON-файла: {токен: [chat_id, ...]}.
+
+    Пустой список чатов - ошибка файла: такому токену некуда слать
+    уведомления.
+    """
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not isinstance(data, dict):
+        raise ValueError(f'В {path} ожидается объект {{токен: chat_id}}')
+    chats = {}
+    for token, chat_ids in data.items():
+        if not isinstance(chat_ids, list):
+            chat_ids = [chat_ids]
+        if not chat_ids:
+            raise ValueError(f'В {path} у подписчика пустой список чатов')
+        chats[token] = chat_ids
+    return chats
+
+
+class SubscriptionRegistry:
+    """Реестр подписчиков: токен -> подписка."""
+
+    def __init__(self):
+        self._subscriptions = {}
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def __iter__(self):
+        return iter(list(self._subscriptions.values()))
+
+    def __contains__(self, token):
+        return token in self._subscriptions
+
+    def get(self, token):
+        """Подписка по токену или None."""
+        return self._subscriptions.get(token)
+
+    def add(self, token, chat_id, from_date=None):
+        """Добавление подписчика, повторный токен добавляет чат."""
+        subscription = self._subscriptions.get(token)
+        if subscription is None:
+            subscription = Subscription(token, chat_id, from_date)
+            self._subscriptions[token] = subscription
+        else:
+            subscription.watch(chat_id)
+        return subscription
+
+    def remove(self, token):
+        """Удаление подписчика."""
+        return self._subscriptions.pop(token, None)
+
+    def sync(self, chats):
+        """Приведение реестра к {токен: [чаты]}, состояние опроса остаётся.
+
+        Возвращает добавленных и удалённых подписчиков.
+        """
+        removed = [self._subscriptions.pop(token)
+                   for token in list(self._subscriptions)
+                   if token not in chats]
+        added = []
+        for token, chat_ids in chats.items():
+            subscription = self._subscriptions.get(token)
+            if subscription is None:
+                subscription = self.add(token, chat_ids[0])
+                added.append(subscription)
+            subscription.chat_id = chat_ids[0]
+            subscription.watchers = []
+            for chat_id in chat_ids[1:]:
+                subscription.watch(chat_id)
+        return added, removed
+
+    def by_chat(self, chat_id):
+        """Подписки чата."""
+        chat_id = str(chat_id)
+        return [
+            subscription for subscription in self
+            if chat_id in map(str, subscription.chats())
+        ]
+
+    def load(self, path):
+        """Загрузка подписчиков из JSON-файла {токен: chat_id}.
+
+        Вместо chat_id можно указать список чатов одного токена.
+        """
+        data = load_chats(path)
+        for token, chat_ids in data.items():
+            for chat_id in chat_ids:
+                self.add(token, chat_id)
+        logging.info('Загружено подписчиков: %s', len(data))
+        return self
+
+
+def poll_offset(token, interval):
+    """Стабильное смещение опроса внутри окна interval."""
+    return zlib.crc32(token.encode()) / 2 ** 32 * interval
+
+
+class AdaptivePolicy:
+    """Интервал опроса подписчика по результатам его последних опросов.
+
+    Пока работа на ревью, опрос частый; после ошибок и долгого простоя
+    интервал растёт экспоненциально до maximum. Подсказка сервера
+    Retry-After соблюдается всегда.
+    """
+
+    def __init__(self, base, fast, maximum, idle_polls, jitter=0.1,
+                 random=random.random):
+        self.base = base
+        self.fast = fast
+        self.maximum = maximum
+        self.idle_polls = idle_polls
+        self.jitter = jitter
+        self.random = random
+
+    def backoff(self, attempts):
+        """Экспоненциальная пауза base * 2 ** attempts, не больше maximum."""
+        return min(self.base * 2 ** min(attempts, 32), self.maximum)
+
+    def next_interval(self, subscription):
+        """Пауза до следующего опроса подписчика."""
+        if subscription.errors:
+            interval = self.backoff(subscription.errors - 1)
+        elif subscription.reviewing:
+            interval = self.fast
+        elif subscription.idle_polls > self.idle_polls:
+            interval = self.backoff(
+                subscription.idle_polls - self.idle_polls)
+        else:
+            interval = self.base
+        interval *= 1 + self.jitter * (2 * self.random() - 1)
+        if subscription.retry_after:
+            interval = max(interval, subscription.retry_after)
+        return interval
+
+
+def request_budget(per_minute, clock=time.monotonic):
+    """Бюджет запросов к API: per_minute в минуту, запас на 10 секунд."""
+    rate = per_minute / 60
+    return TokenBucket(rate, max(rate * 10, 1), clock)
+
+
+class PollScheduler:
+    """Опрос всех подписчиков, равномерно распределённый по окну.
+
+    Без policy подписчики опрашиваются раз в interval, с policy -
+    с интервалом policy.next_interval(subscription). После stop циклы
+    опроса завершаются, не начиная новых опросов. call_soon выполняет
+    функцию в потоке цикла между опросами, например перечитывание
+    настроек по сигналу.
+
+    budget - общая корзина запросов к API на всех подписчиков. Когда
+    запросов не хватает, опоздавшие подписчики ждут в куче и
+    опрашиваются по назначенному времени: раньше всех тот, кто ждёт
+    дольше. Работы на ревью назначаются чаще, поэтому при перегрузке
+    получают больше опросов, но остальные не голодают.
+
+    watchdog получает отметку стадии cycle после каждого опроса и перед
+    сном до следующего.
+    """
+
+    def __init__(self, registry, poll, interval, policy=None,
+                 clock=time.monotonic, sleep=None, budget=None,
+                 watchdog=None):
+        self.registry = registry
+        self.poll = poll
+        self.interval = interval
+        self.policy = policy
+        self.budget = budget
+        self.clock = clock
+        self.watchdog = watchdog
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self.sleep = sleep or self._wait
+        self._calls = deque()
+        self._queue = []
+        self._scheduled = set()
+        start = clock()
+        for subscription in registry:
+            self.schedule(subscription, start)
+
+    def schedule(self, subscription, start=None):
+        """Постановка подписчика в очередь со своим смещением."""
+        if subscription.token in self._scheduled:
+            return
+        if start is None:
+            start = self.clock()
+        due = start + poll_offset(subscription.token, self.interval)
+        self._push(due, subscription.token)
+
+    def _push(self, due, token):
+        self._scheduled.add(token)
+        heapq.heappush(self._queue, (due, token))
+
+    def next_due(self):
+        """Время ближайшего опроса или None."""
+        return self._queue[0][0] if self._queue else None
+
+    def pop_due(self):
+        """Подписчики, чьё время подошло, в пределах бюджета запросов."""
+        now = self.clock()
+        subscriptions = []
+        lag = 0
+        while self._queue and self._queue[0][0] <= now:
+            if self.budget is not None and self.budget.delay():
+                break
+            due, token = heapq.heappop(self._queue)
+            self._scheduled.discard(token)
+            subscription = self.registry.get(token)
+            if subscription is None:
+                continue
+            if self.budget is not None and not subscription.paused:
+                self.budget.consume()
+            lag = max(lag, now - due)
+            subscriptions.append(subscription)
+        if subscriptions:
+            POLL_LAG.set(lag)
+        return subscriptions
+
+    def reschedule(self, subscription):
+        """Планирование следующего опроса после текущего."""
+        if self.policy is None:
+            interval = self.interval
+        else:
+            interval = self.policy.next_interval(subscription)
+        POLL_INTERVAL.set(interval)
+        if subscription.token not in self._scheduled:
+            self._push(self.clock() + interval, subscription.token)
+
+    def delay(self):
+        """Сколько ждать до ближайшего опроса."""
+        due = self.next_due()
+        delay = self.interval if due is None else due - self.clock()
+        if delay <= 0 and self.budget is not None:
+            return self.budget.delay()
+        return max(delay, 0)
+
+    def stop(self):
+        """Остановка циклов опроса."""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _wait(self, timeout):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def cycle_done(self, delay):
+        """Отметка завершённого цикла для сторожа, возвращает delay."""
+        if self.watchdog is not None:
+            self.watchdog.beat('cycle', delay)
+        return delay
+
+    def call_soon(self, function):
+        """Вызов function в цикле опроса до следующих опросов.
+
+        Можно вызывать из обработчика сигнала и из других потоков.
+        """
+        self._calls.append(function)
+        self._wakeup.set()
+
+    def run_calls(self):
+        """Выполнение функций, переданных в call_soon.
+
+        Ошибка в функции записывается в лог и не останавливает цикл.
+        """
+        while self._calls:
+            function = self._calls.popleft()
+            try:
+                function()
+            except Exception as error:
+                logging.exception('Сбой отложенного вызова: %s', error,
+                                  extra={'error': type(error).__name__})
+
+    @property
+    def stopped(self):
+        """Вызывался ли stop."""
+        return self._stopped.is_set()
+
+    def run_pending(self):
+        """Опрос всех подписчиков, чьё время подошло."""
+        subscriptions = self.pop_due()
+        for subscription in subscriptions:
+            try:
+                if not subscription.paused and not self.stopped:
+                    self.poll(subscription)
+            finally:
+                self.reschedule(subscription)
+                self.cycle_done(0)
+        return len(subscriptions)
+
+    def run_forever(self):
+        """Цикл опроса до вызова stop."""
+        while not self.stopped:
+            self.run_calls()
+            self.run_pending()
+            self.sleep(self.cycle_done(self.delay()))
+
+    async def run_pending_async(self):
+        """Одновременный опрос подписчиков, poll возвращает корутину."""
+        subscriptions = self.pop_due()
+        import asyncio
+
+        await asyncio.gather(*map(self._poll_async, subscriptions))
+        return len(subscriptions)
+
+    async def _poll_async(self, subscription):
+        try:
+            if not subscription.paused:
+                await self.poll(subscription)
+        finally:
+            self.reschedule(subscription)
+            self.cycle_done(0)
+
+    async def run_forever_async(self):
+        """Неблокирующий цикл опроса до вызова stop.
+
+        Флаг stop проверяется не реже раза в секунду.
+        """
+        import asyncio
+
+        while not self.stopped:
+            self.run_calls()
+            await self.run_pending_async()
+            await asyncio.sleep(self.cycle_done(min(self.delay(), 1)))
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+from subscriptions import Subscription
+from utils import MockBot
+
+
+class TestAsync:
+
+    def test_async_check_subscription_limits(self, monkeypatch):
+        import homework
+
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def mock_fetch_api_answer(url, current_timestamp, token, cache=None,
+                                  decode=None, breaker=None):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 42,
+            }
+
+        monkeypatch.setattr(homework, 'fetch_api_answer',
+                            mock_fetch_api_answer)
+        bot = MockBot()
+        subscriptions = [Subscription(f'token-{i}', i) for i in range(12)]
+
+        async def run():
+            limits = homework.AsyncLimits(polls=4, sends=2)
+            await asyncio.gather(*(
+                homework.async_check_subscription(limits, bot, subscription)
+                for subscription in subscriptions))
+            limits.shutdown()
+
+        asyncio.run(run())
+        assert 1 < state['peak'] <= 4, (
+            'Проверьте, что опросы идут параллельно в пределах лимита'
+        )
+        assert len(bot.sent) == 12
+        assert all(sub.from_date == 42 for sub in subscriptions)
+
+    def test_async_error_notified_once(self, monkeypatch):
+        import homework
+
+        def mock_fetch_api_answer(url, current_timestamp, token, cache=None,
+                                  decode=None, breaker=None):
+            return {}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer',
+                            mock_fetch_api_answer)
+        bot = MockBot()
+        subscription = Subscription('token', 1)
+
+        async def run():
+            limits = homework.AsyncLimits(polls=1, sends=1)
+            for _ in range(3):
+                await homework.async_check_subscription(
+                    limits, bot, subscription)
+            limits.shutdown()
+
+        asyncio.run(run())
+        assert len(bot.sent) == 1, (
+            'Проверьте, что об ошибке сообщается только один раз'
+        )
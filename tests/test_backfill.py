@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from os.path import abspath, dirname, join
+
+import homework
+from backfill import Backfill, write_events
+from benchmarks.fake_services import FakePracticum
+from event_store import EventStore
+
+ROOT = dirname(dirname(abspath(__file__)))
+DAY = 24 * 60 * 60
+
+
+class TestBackfill:
+
+    def test_timeline_merges_journal_and_api(self):
+        now = int(time.time())
+        start = now - 10 * DAY
+        timeline = []
+        for number in range(10):
+            taken = start + number * DAY + 60
+            timeline.append((taken, number + 1, f'hw-{number}',
+                             'reviewing'))
+            timeline.append((taken + 600, number + 1, f'hw-{number}',
+                             'approved'))
+        journal = EventStore(sqlite3.connect(':memory:'))
+        with journal.connection:
+            journal.append(
+                [('token', str(number), name, status, updated)
+                 for updated, number, name, status in timeline[:10]], 0)
+        practicum = FakePracticum({'token': timeline})
+        url = practicum.start()
+        try:
+            events, stats = Backfill(
+                'token', url, backoff=0.01, events=journal).run(start, now)
+        finally:
+            practicum.stop()
+        assert practicum.requests == 1 and stats['requests'] == 1, (
+            'API отдаёт только последний статус домашки - достаточно '
+            'одного запроса')
+        assert [(event.name, event.status) for event in events] == [
+            ('hw-0', 'reviewing'), ('hw-0', 'approved'),
+            ('hw-1', 'reviewing'), ('hw-1', 'approved'),
+            ('hw-2', 'reviewing'), ('hw-2', 'approved'),
+            ('hw-3', 'reviewing'), ('hw-3', 'approved'),
+            ('hw-4', 'reviewing'), ('hw-4', 'approved'),
+            ('hw-5', 'approved'), ('hw-6', 'approved'),
+            ('hw-7', 'approved'), ('hw-8', 'approved'),
+            ('hw-9', 'approved')], (
+            'Промежуточные статусы берутся из журнала событий, последние - '
+            'из ответа API, без повторов')
+        file = io.StringIO()
+        write_events(events, file)
+        first = json.loads(file.getvalue().splitlines()[0])
+        assert first['homework_name'] == 'hw-0', (
+            'Журнал пишется строками JSON с полями ответа API')
+
+    def test_iso_dates_filtered_by_period(self):
+        start = datetime(2021, 11, 1, tzinfo=timezone.utc).timestamp()
+
+        def fetch(url, from_date, token, decode):
+            return homework.API_DECODER.decode(json.dumps({
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw-1', 'status': 'approved',
+                     'date_updated': '2021-11-02T10:00:00Z'},
+                    {'id': 2, 'homework_name': 'hw-2', 'status': 'approved',
+                     'date_updated': '2021-11-01T10:00:00Z'}],
+                'current_date': int(start)}).encode())
+
+        events, stats = Backfill('token', fetch=fetch).run(
+            start, start + 3 * DAY)
+        assert [event.name for event in events] == ['hw-2', 'hw-1'], (
+            'Даты ISO 8601 с Z должны разбираться и упорядочивать события')
+
+    def test_command_reports_stats(self, tmp_path):
+        practicum = FakePracticum()
+        url = practicum.start()
+        start = (date.today() - timedelta(days=3)).isoformat()
+        env = dict(os.environ, PRACTICUM_TOKEN='token',
+                   PRACTICUM_ENDPOINT=url, HTTP_RETRIES='0',
+                   LOG_FORMAT='text', STATE_FILE=str(tmp_path / 'state'))
+        try:
+            result = subprocess.run(
+                [sys.executable, join(ROOT, 'backfill.py'), start],
+                cwd=ROOT, env=env, capture_output=True, text=True,
+                timeout=30, check=True)
+        finally:
+            practicum.stop()
+        assert 'запросов к API 1' in result.stderr, (
+            'Команда бэкфилла должна сообщать число запросов и время')
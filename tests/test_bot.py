@@ -126,7 +126,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_response_get))
 
         import homework
 
@@ -172,7 +172,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_500_response_get))
 
         import homework
 
@@ -255,7 +255,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_response_get))
 
         import homework
 
@@ -292,7 +292,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_response_get))
 
         import homework
 
@@ -325,7 +325,8 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
+        monkeypatch.setattr(requests.Session, 'get',
+                            staticmethod(mock_no_homeworks_response_get))
 
         import homework
 
@@ -358,7 +359,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_empty_response_get))
 
         import homework
 
@@ -384,7 +385,7 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_response_get))
 
         import homework
 
@@ -0,0 +1,116 @@
+import json
+
+import requests
+
+from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from exceptions import TheAnswerIsNot200Error, TheParseStatusUnknow
+from status_cache import StatusCache
+from subscriptions import AdaptivePolicy, PollScheduler, Subscription
+from utils import FakeClock, MockBot
+
+HOUR = 60 * 60
+
+
+class MockResponse:
+
+    def __init__(self, status_code, now):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = json.dumps(
+            {'homeworks': [], 'current_date': int(now)}).encode()
+
+
+def simulate_outage(monkeypatch, breaker_enabled, subscribers=50):
+    """Три часа опроса, из них час API отвечает 500."""
+    import homework
+
+    clock = FakeClock()
+    outage = (HOUR, 2 * HOUR)
+    requests_made = []
+
+    def mock_get(url, headers=None, params=None, timeout=None):
+        requests_made.append(clock.now)
+        failing = outage[0] <= clock.now < outage[1]
+        return MockResponse(500 if failing else 200, clock.now)
+
+    breaker = None
+    if breaker_enabled:
+        breaker = CircuitBreaker('practicum', 5, 60, 1800, clock=clock)
+    monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_get))
+    monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+    monkeypatch.setattr(homework, 'PRACTICUM_BREAKER', breaker)
+    bot = MockBot()
+    registry = homework.SubscriptionRegistry()
+    for number in range(subscribers):
+        registry.add(f'token-{number}', number, 1)
+    scheduler = PollScheduler(
+        registry, lambda subscription: homework.check_subscription(
+            bot, subscription),
+        600, AdaptivePolicy(600, 120, 1800, 144), clock=clock)
+    while clock.now < 3 * HOUR:
+        scheduler.run_pending()
+        clock.sleep(max(scheduler.delay(), 1))
+    wasted = sum(outage[0] <= moment < outage[1] for moment in requests_made)
+    return wasted, bot.sent
+
+
+class TestCircuitBreaker:
+
+    def test_opens_probes_and_closes(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', threshold=2, recovery_time=10,
+                                 max_recovery_time=40, clock=clock)
+        breaker.failed()
+        assert breaker.state == CLOSED, 'Один сбой не размыкает'
+        breaker.failed()
+        assert breaker.state == OPEN and not breaker.allow(), (
+            'После threshold сбоев вызовы должны отклоняться')
+        clock.sleep(10)
+        assert breaker.allow() and breaker.state == HALF_OPEN, (
+            'После паузы должна пропускаться пробная попытка')
+        assert not breaker.allow(), 'Пробная попытка должна быть одна'
+        breaker.failed()
+        clock.sleep(10)
+        assert not breaker.allow() and breaker.delay() == 10, (
+            'После неудачной пробы пауза должна удваиваться')
+        clock.sleep(10)
+        assert breaker.allow()
+        assert breaker.succeeded() and breaker.state == CLOSED, (
+            'Удачная проба замыкает предохранитель')
+        assert not breaker.succeeded(), (
+            'Восстановление сообщается один раз')
+
+    def test_error_notifications_deduplicated(self):
+        import homework
+
+        subscription = Subscription('token', 1)
+        first = homework.subscription_error(
+            subscription, TheAnswerIsNot200Error('Код ответа API: 500'))
+        repeat = homework.subscription_error(
+            subscription, TheAnswerIsNot200Error('Код ответа API: 502'))
+        other = homework.subscription_error(
+            subscription, TheParseStatusUnknow('Нет такого статуса'))
+        assert first and other and repeat is None, (
+            'Об ошибке одного класса и вида сообщается один раз, '
+            'о новой ошибке - сразу')
+        assert subscription.recovered() and not subscription.recovered(), (
+            'После сбоя должно быть одно сообщение о восстановлении')
+
+    def test_hour_outage_wastes_few_requests(self, monkeypatch):
+        import homework
+
+        wasted_without, _ = simulate_outage(monkeypatch, False)
+        wasted, sent = simulate_outage(monkeypatch, True)
+        assert wasted <= 15 and wasted * 5 < wasted_without, (
+            f'За час сбоя с предохранителем {wasted} запросов, '
+            f'без него {wasted_without}: разомкнутый предохранитель '
+            f'должен заменять опросы редкими пробами')
+        errors = [chat_id for chat_id, text in sent
+                  if text.startswith('Сбой')]
+        recovered = [chat_id for chat_id, text in sent
+                     if text == homework.RECOVERED_MESSAGE]
+        assert errors and len(set(errors)) == len(errors), (
+            'Каждому подписчику - не больше одного сообщения о сбое')
+        assert sorted(errors) == sorted(recovered), (
+            'Каждый узнавший о сбое подписчик должен один раз узнать '
+            'о восстановлении')
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from coalescing import SingleFlight
+from status_cache import StatusCache
+from subscriptions import SubscriptionRegistry
+from utils import MockBot
+
+
+class MockResponse:
+
+    status_code = 200
+    headers = {}
+    content = json.dumps({
+        'homeworks': [{'id': 1, 'homework_name': 'hw.zip',
+                       'status': 'approved',
+                       'date_updated': '2022-01-01T00:00:00Z'}],
+        'current_date': 42,
+    }).encode()
+
+
+class TestCoalescing:
+
+    def test_concurrent_calls_share_one_request(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        results = []
+
+        def fetch():
+            started.set()
+            time.sleep(0.1)
+            return {'homeworks': []}
+
+        def call():
+            results.append(flights.do(('token', 1), fetch))
+
+        first = threading.Thread(target=call)
+        first.start()
+        started.wait()
+        others = [threading.Thread(target=call) for _ in range(99)]
+        for thread in others:
+            thread.start()
+        for thread in [first] + others:
+            thread.join()
+        assert flights.calls == 1 and flights.shared == 99, (
+            'Одновременные вызовы с одним ключом должны делить один запрос')
+        assert all(result is results[0] for result in results), (
+            'Все вызовы должны получить один и тот же разобранный ответ')
+        flights.do(('token', 1), fetch)
+        assert flights.calls == 2, 'Законченный запрос не должен кэшироваться'
+
+    def test_error_shared_with_waiters(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fetch():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError('сбой')
+
+        def call():
+            try:
+                flights.do('key', fetch)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 5 and flights.calls == 1, (
+            'Ошибка запроса должна доставаться всем ожидающим')
+
+    @pytest.mark.parametrize('watchers', [1, 10, 100])
+    def test_upstream_requests_flat_as_watchers_grow(self, monkeypatch,
+                                                     tmp_path, watchers):
+        import homework
+
+        requests_made = []
+
+        def mock_get(url, headers=None, params=None, timeout=None):
+            requests_made.append(params)
+            return MockResponse()
+
+        monkeypatch.setattr(requests.Session, 'get', staticmethod(mock_get))
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'PRACTICUM_BREAKER', None)
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps(
+            {f'token-{watchers}': list(range(watchers))}))
+        registry = SubscriptionRegistry().load(path)
+        bot = MockBot()
+        for subscription in registry:
+            homework.check_subscription(bot, subscription)
+        assert len(requests_made) == 1, (
+            f'При {watchers} чатах на токен к API должен уйти один запрос, '
+            f'а ушло {len(requests_made)}')
+        message = homework.parse_status(
+            {'homework_name': 'hw.zip', 'status': 'approved'})
+        assert sorted(bot.sent) == [
+            (chat_id, message) for chat_id in range(watchers)], (
+            'Уведомление должно прийти в каждый чат, следящий за токеном')
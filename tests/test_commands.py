@@ -0,0 +1,93 @@
+from commands import NOT_OWNER, NOT_SUBSCRIBED, BotCommands
+from status_cache import StatusCache
+from subscriptions import PollScheduler, SubscriptionRegistry
+
+
+class MockMessage:
+
+    def __init__(self):
+        self.replies = []
+
+    def reply_text(self, text):
+        self.replies.append(text)
+
+
+class MockChat:
+
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class MockUpdate:
+
+    def __init__(self, chat_id):
+        self.effective_chat = MockChat(chat_id)
+        self.message = MockMessage()
+
+
+def make_commands():
+    import homework
+
+    registry = SubscriptionRegistry()
+    registry.add('token', '100')
+    cache = StatusCache()
+    cache.changed('token', {'id': 1, 'homework_name': 'hw1',
+                            'status': 'reviewing', 'date_updated': '1'})
+    cache.changed('token', {'id': 1, 'homework_name': 'hw1',
+                            'status': 'approved', 'date_updated': '2'})
+    return registry, BotCommands(
+        registry, cache, homework.HOMEWORK_STATUSES)
+
+
+class TestCommands:
+
+    def test_status_from_cache(self, monkeypatch):
+        import homework
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Команды не должны обращаться к API')
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', fail)
+        registry, commands = make_commands()
+        update = MockUpdate(100)
+        commands.reply(commands.status)(update, None)
+        assert update.message.replies == [
+            f'"hw1": {homework.HOMEWORK_STATUSES["approved"]}'], (
+            'Проверьте, что /status отвечает из кэша статусов'
+        )
+
+    def test_history(self):
+        registry, commands = make_commands()
+        assert commands.history(100) == (
+            '1 "hw1": reviewing\n2 "hw1": approved')
+
+    def test_not_subscribed(self):
+        registry, commands = make_commands()
+        assert commands.status(200) == NOT_SUBSCRIBED
+
+    def test_pause_skips_polls(self):
+        registry, commands = make_commands()
+        polled = []
+        now = [0.0]
+        scheduler = PollScheduler(registry, polled.append, 600,
+                                  clock=lambda: now[0])
+        commands.pause(100)
+        now[0] = 600
+        scheduler.run_pending()
+        assert polled == [], (
+            'Проверьте, что /pause приостанавливает опрос'
+        )
+        commands.pause(100)
+        now[0] = 1200
+        scheduler.run_pending()
+        assert len(polled) == 1
+
+    def test_pause_only_by_owner(self):
+        registry, commands = make_commands()
+        subscription = next(iter(registry))
+        registry.add(subscription.token, 300)
+        assert commands.pause(300) == NOT_OWNER, (
+            'Чат, который только следит за статусами, не может '
+            'приостановить опрос подписчика')
+        assert not subscription.paused
+        assert commands.status(300) != NOT_SUBSCRIBED
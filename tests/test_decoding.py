@@ -0,0 +1,65 @@
+import json
+
+from decoding import ApiAnswerDecoder, HomeworkRecord
+from exceptions import TheParseStatusUnknow, TheResponseUnknownKey
+from status_cache import StatusCache
+
+
+def make_content(homeworks):
+    return json.dumps({'homeworks': homeworks, 'current_date': 42}).encode()
+
+
+class TestDecoding:
+
+    def test_records_and_violations_in_one_pass(self):
+        import homework
+
+        decoder = ApiAnswerDecoder(homework.HOMEWORK_STATUSES)
+        answer = decoder.decode(make_content([
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+             'date_updated': 'd', 'reviewer_comment': 'ok'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'unknown'},
+            {'id': 3, 'status': 'approved'},
+        ]))
+        assert answer['current_date'] == 42
+        assert answer['homeworks'] == [
+            HomeworkRecord(1, 'hw1', 'approved', 'd')], (
+            'Проверьте, что домашки превращаются в записи HomeworkRecord'
+        )
+        assert [type(error) for error in answer['errors']] == [
+            TheParseStatusUnknow, TheResponseUnknownKey], (
+            'Проверьте, что нарушения схемы собираются в errors'
+        )
+
+    def test_record_is_compatible_with_parse_status(self):
+        import homework
+
+        record = HomeworkRecord(1, 'hw1', 'rejected', None)
+        assert homework.parse_status(record) == (
+            'Изменился статус проверки работы "hw1". '
+            f'{homework.HOMEWORK_STATUSES["rejected"]}')
+
+    def test_decoded_and_dict_paths_agree(self):
+        import homework
+
+        homeworks = [
+            {'id': number, 'homework_name': f'hw{number}',
+             'status': 'reviewing', 'date_updated': str(number)}
+            for number in range(50)
+        ]
+        content = make_content(homeworks)
+        decoded = homework.API_DECODER.decode(content)
+        assert homework.subscription_messages(
+            decoded, 'token', StatusCache()) == (
+            homework.subscription_messages(
+                json.loads(content), 'token', StatusCache()))
+
+    def test_homeworks_not_a_list(self):
+        import homework
+
+        answer = homework.API_DECODER.decode(b'{"homeworks": {}}')
+        try:
+            homework.subscription_messages(answer, 'token', StatusCache())
+        except TheResponseUnknownKey:
+            return
+        assert False, 'Проверьте обработку homeworks неправильного типа'
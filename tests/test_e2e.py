@@ -0,0 +1,62 @@
+import time
+from functools import partial
+
+from telegram import Bot
+
+from benchmarks.fake_services import FakePracticum, FakeTelegram
+from circuit import CircuitBreaker
+from outbox import Outbox
+from status_cache import StatusCache
+from subscriptions import PollScheduler, SubscriptionRegistry
+
+
+class TestEndToEnd:
+
+    def test_statuses_delivered_once_despite_faults(self, monkeypatch):
+        import homework
+
+        start = time.time()
+        timelines = {
+            f'token-{number}': [
+                (start + 0.3, 1, f'hw-{number}', 'reviewing'),
+                (start + 0.8, 1, f'hw-{number}', 'approved'),
+            ]
+            for number in range(3)
+        }
+        practicum = FakePracticum(
+            timelines, error_rate=0.2, malformed_rate=0.2,
+            outages=[(start + 0.4, start + 0.7)])
+        telegram = FakeTelegram(retry_after_rate=0.2, retry_after=0)
+        url = practicum.start()
+        outbox = Outbox(Bot('123:fake', base_url=telegram.start()),
+                        backoff=0.05).start()
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'PRACTICUM_BREAKER',
+                            CircuitBreaker('practicum', 3, 0.2))
+        registry = SubscriptionRegistry()
+        for number in range(3):
+            registry.add(f'token-{number}', number, int(start) - 1)
+        scheduler = PollScheduler(
+            registry, partial(homework.check_subscription, outbox, url=url),
+            0.1)
+        try:
+            while time.time() < start + 2:
+                scheduler.run_pending()
+                time.sleep(scheduler.delay())
+            assert outbox.join(timeout=5)
+        finally:
+            outbox.stop(timeout=1)
+            practicum.stop()
+            telegram.stop()
+        texts = [
+            line for _, _, text in telegram.deliveries
+            for line in text.split('\n\n')
+            if line.startswith('Изменился статус')]
+        approved = homework.HOMEWORK_STATUSES['approved']
+        for number in range(3):
+            assert texts.count(
+                f'Изменился статус проверки работы "hw-{number}". '
+                f'{approved}') == 1, (
+                'Проверьте, что итоговый статус доставлен ровно один раз'
+            )
+        assert practicum.failures > 0
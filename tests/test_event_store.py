@@ -0,0 +1,95 @@
+import sqlite3
+
+from event_store import EventStore
+from state_store import StateStore
+from status_cache import StatusCache
+from subscriptions import SubscriptionRegistry
+from utils import MockBot
+
+HOUR = 60 * 60
+
+
+def answer(status, date_updated):
+    return {
+        'homeworks': [{'id': 7, 'homework_name': 'hw', 'status': status,
+                       'date_updated': date_updated}],
+        'current_date': 1636000000,
+    }
+
+
+class TestEventStore:
+
+    def test_checkpoint_records_transitions_once(self, monkeypatch,
+                                                 tmp_path):
+        import homework
+
+        path = tmp_path / 'state.sqlite3'
+        answers = [answer('reviewing', '2021-11-01T10:00:00Z'),
+                   answer('reviewing', '2021-11-01T10:00:00Z'),
+                   answer('approved', '2021-11-01T13:30:00Z')]
+        for response in answers:
+            monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+            monkeypatch.setattr(homework, 'fetch_api_answer',
+                                lambda *args: response)
+            registry = SubscriptionRegistry()
+            subscription = registry.add('token', 1, 1)
+            store = StateStore(path)
+            store.restore(registry, homework.STATUS_CACHE)
+            homework.check_subscription(MockBot(), subscription, store=store)
+            store.close()
+        store = StateStore(path)
+        events = store.events.events(student='token')
+        turnaround = store.events.review_turnaround()
+        store.close()
+        assert [status for _, _, status, _ in events] == [
+            'reviewing', 'approved'], (
+            'Каждая смена статуса записывается один раз, '
+            'в том числе после перезапуска')
+        assert events[0][1] == 'hw' and events[0][3] == 1635760800
+        assert turnaround == 3.5 * HOUR, (
+            'Медиана длительности ревью считается по переходу '
+            'reviewing -> approved')
+
+    def test_queries_and_turnaround(self):
+        store = EventStore(sqlite3.connect(':memory:'))
+        events = []
+        for number in range(10):
+            start = number * HOUR
+            events.append(('student-1', str(number), f'hw-{number}',
+                           'reviewing', start))
+            events.append(('student-1', str(number), f'hw-{number}',
+                           'approved', start + (number + 1) * 600))
+        events.append(('student-2', 'x', 'hw-0', 'reviewing', 0))
+        with store.connection:
+            store.append(events, 0)
+        assert len(store.events(student='student-1')) == 20
+        assert [row[0] for row in store.events(homework='hw-0')] == [
+            'student-1', 'student-2', 'student-1'], (
+            'Проверьте выборку по названию домашки')
+        assert len(store.events(start=2 * HOUR, end=4 * HOUR)) == 4, (
+            'Проверьте выборку по интервалу времени')
+        assert store.review_turnaround() == 3000, (
+            'Медиана из длительностей 10..100 минут - 50 минут')
+        assert store.review_turnaround(1) == 6000
+        assert len(store.reviews('student-1')) == 10
+        assert store.reviews('student-2') == [], (
+            'Незаконченное ревью не попадает в статистику')
+
+    def test_rotated_token_closes_open_review(self):
+        store = StateStore(':memory:')
+        with store.connection:
+            store.events.append(
+                [('token-old', '7', 'hw', 'reviewing', 0)], 0)
+        store.move('token-old', 'token-new')
+        with store.connection:
+            store.events.append(
+                [('token-new', '7', 'hw', 'approved', HOUR)], HOUR)
+        assert store.events.reviews() == [
+            ('token-new', '7', 0, HOUR, 'approved')], (
+            'Ревью, взятое до смены токена, закрывается после неё')
+        assert store.events.review_turnaround() == HOUR
+        assert len(store.events.events(student='token-new')) == 2, (
+            'Журнал событий переносится на новый токен')
+        assert store.connection.execute(
+            'SELECT COUNT(*) FROM open_reviews').fetchone()[0] == 0
+        store.close()
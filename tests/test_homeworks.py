@@ -0,0 +1,77 @@
+import time
+import tracemalloc
+
+from outbox import TELEGRAM_MESSAGE_LIMIT, batch_messages
+from status_cache import StatusCache
+from subscriptions import Subscription
+from utils import MockBot
+
+
+def make_response(count, status='approved'):
+    return {
+        'homeworks': [
+            {'id': number, 'homework_name': f'hw{number}', 'status': status}
+            for number in range(count)
+        ],
+        'current_date': count,
+    }
+
+
+class TestHomeworks:
+
+    def test_all_homeworks_batched(self, monkeypatch):
+        import homework
+
+        response = make_response(500)
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'fetch_api_answer',
+                            lambda *args: response)
+        bot = MockBot()
+        homework.check_subscription(bot, Subscription('token', 1))
+        text = '\n\n'.join(bot.texts)
+        assert all(f'"hw{number}"' in text for number in range(500)), (
+            'Проверьте, что обрабатываются все домашки из ответа'
+        )
+        assert 1 < len(bot.sent) < 50, (
+            'Проверьте, что уведомления объединяются в пакеты'
+        )
+        assert all(
+            len(message) <= TELEGRAM_MESSAGE_LIMIT
+            for message in bot.texts)
+        assert text.index('"hw499"') < text.index('"hw0"'), (
+            'Проверьте, что уведомления идут от старых изменений к новым'
+        )
+
+    def test_unknown_status_does_not_drop_others(self):
+        import homework
+
+        response = make_response(3)
+        response['homeworks'][1]['status'] = 'unknown'
+        messages, _, errors = homework.subscription_messages(
+            response, 'token', StatusCache())
+        assert len(messages) == 2
+        assert isinstance(errors[0], homework.TheParseStatusUnknow)
+
+    def test_linear_in_time_and_memory(self):
+        import homework
+
+        def measure(count):
+            response = make_response(count)
+            tracemalloc.start()
+            start = time.perf_counter()
+            messages, _, _ = homework.subscription_messages(
+                response, 'token', StatusCache())
+            list(batch_messages(messages))
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return elapsed, peak
+
+        small_time, small_peak = measure(500)
+        large_time, large_peak = measure(5000)
+        assert large_time < small_time * 30, (
+            'Проверьте, что разбор ответа растёт линейно по времени'
+        )
+        assert large_peak < small_peak * 20, (
+            'Проверьте, что разбор ответа растёт линейно по памяти'
+        )
@@ -0,0 +1,187 @@
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import homework
+import metrics
+from circuit import CircuitBreaker
+from liveness import Watchdog, start_health_server
+from outbox import Outbox
+from status_cache import StatusCache
+from subscriptions import PollScheduler, Subscription, SubscriptionRegistry
+from utils import FakeClock, MockBot
+
+
+class HangingBot(MockBot):
+    """Бот, у которого первая отправка зависает до события hang."""
+
+    def __init__(self, hang):
+        super().__init__()
+        self.hang = hang
+        self.hung = False
+        self.delivered = []
+
+    def send_message(self, chat_id, text):
+        if not self.hung:
+            self.hung = True
+            self.hang.wait()
+        super().send_message(chat_id, text)
+        self.delivered.append(time.monotonic())
+
+
+class HangingServer:
+    """HTTP-сервер, который отдаёт тело по байту раз в 0.1 с.
+
+    Каждое чтение сокета успевает до таймаута, поэтому read timeout
+    requests не спасает от зависания. С silent сервер молчит, не
+    отправляя даже заголовков.
+    """
+
+    def __init__(self, silent=False):
+        self.silent = silent
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen()
+        self.requests = 0
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.accept, daemon=True).start()
+        host, port = self.server.getsockname()
+        return f'http://{host}:{port}/'
+
+    def accept(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            self.requests += 1
+            threading.Thread(
+                target=self.trickle, args=(connection,), daemon=True).start()
+
+    def trickle(self, connection):
+        try:
+            connection.recv(65536)
+            if self.silent:
+                self.stopped.wait()
+                return
+            connection.sendall(b'HTTP/1.1 200 OK\r\n'
+                               b'Content-Type: application/json\r\n'
+                               b'Content-Length: 100000\r\n\r\n')
+            while not self.stopped.wait(0.1):
+                connection.sendall(b' ')
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.server.close()
+
+
+def get_health(port, path):
+    try:
+        with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+class TestLiveness:
+
+    @pytest.mark.parametrize('silent', [False, True])
+    def test_hanging_api_call_is_cancelled(self, monkeypatch, silent):
+        watchdog = Watchdog(stall=0.5, interval=0.05).start()
+        monkeypatch.setattr(homework, 'WATCHDOG', watchdog)
+        monkeypatch.setattr(homework, 'READ_TIMEOUT', 60 if silent else 1)
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'PRACTICUM_BREAKER',
+                            CircuitBreaker('practicum', 5, 60))
+        server = HangingServer(silent)
+        url = server.start()
+        bot = MockBot()
+        subscription = Subscription('token-hang', 1, 0)
+        stalled = metrics.ERRORS.value('TheStalledCallError')
+        try:
+            started = time.monotonic()
+            homework.check_subscription(bot, subscription, url)
+            recovery = time.monotonic() - started
+        finally:
+            server.stop()
+            watchdog.stop()
+        assert recovery < 0.5 + 1, (
+            'Зависший запрос к API должен прерываться через stall секунд, '
+            f'а не через {recovery:.1f} с')
+        assert server.requests == 1, (
+            'Прерванный сторожем запрос не должен повторяться')
+        assert watchdog.cancelled == {'poll': 1}
+        assert metrics.ERRORS.value('TheStalledCallError') == stalled + 1, (
+            'Прерванный опрос должен считаться сбоем TheStalledCallError')
+        assert bot.texts == [
+            'Сбой в работе программы: Запрос прерван сторожем'], (
+            'Подписчик должен получить сообщение о прерванном опросе')
+
+    def test_stuck_send_restarts_outbox(self):
+        watchdog = Watchdog(stall=0.3, interval=0.05).start()
+        hang = threading.Event()
+        bot = HangingBot(hang)
+        outbox = Outbox(bot, chat_rate=100, watchdog=watchdog).start()
+        try:
+            started = time.monotonic()
+            outbox.send_message(1, 'зависнет')
+            outbox.send_message(2, 'дойдёт')
+            deadline = time.monotonic() + 5
+            while not bot.delivered and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            hang.set()
+            outbox.stop(timeout=1)
+            watchdog.stop()
+        assert bot.texts[0] == 'дойдёт', (
+            'После перезапуска потока отправки очередь должна отправляться')
+        assert bot.delivered[0] - started < 0.3 + 1, (
+            'Зависшая отправка должна перезапускаться через stall секунд')
+        assert watchdog.cancelled == {'send': 1}
+
+    def test_health_reports_stage_lag(self):
+        clock = FakeClock()
+        watchdog = Watchdog(stall=60, clock=clock)
+        registry = SubscriptionRegistry()
+        registry.add('token', 1)
+        scheduler = PollScheduler(registry, lambda subscription: None, 600,
+                                  clock=clock, watchdog=watchdog)
+        server = start_health_server(watchdog, 0)
+        port = server.server_address[1]
+        try:
+            scheduler.cycle_done(600)
+            clock.now = 590
+            code, health = get_health(port, '/readyz')
+            assert code == 200 and health['stages']['cycle']['lag'] == 0, (
+                'Стадия не отстаёт, пока не прошла назначенная пауза')
+            clock.now = 700
+            code, health = get_health(port, '/readyz')
+            assert code == 503 and health['stages']['cycle']['lag'] == 100, (
+                'Цикл опоздал на 100 с - бот не готов')
+            code, _ = get_health(port, '/healthz')
+            assert code == 200, 'Опоздание меньше 2 * stall - бот жив'
+            clock.now = 800
+            code, _ = get_health(port, '/healthz')
+            assert code == 503, 'Опоздание больше 2 * stall - бот завис'
+            with watchdog.call('poll'):
+                clock.now = 830
+                _, health = get_health(port, '/readyz')
+                assert health['stages']['poll'] == {
+                    'lag': 30, 'in_flight': 1}, (
+                    'Отставание стадии вызова - длительность самого '
+                    'старого вызова')
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,98 @@
+import io
+import json
+import logging
+import queue
+import time
+
+from circuit import CircuitBreaker
+from logs import ErrorSampler, JsonFormatter, NonBlockingQueueHandler
+from logs import setup_logging
+from utils import FakeClock
+
+
+class SlowStream(io.StringIO):
+
+    def write(self, text):
+        time.sleep(0.01)
+        return super().write(text)
+
+
+def make_record(message, *args, level=logging.ERROR, **fields):
+    record = logging.LogRecord(
+        'root', level, __file__, 1, message, args, None)
+    record.__dict__.update(fields)
+    return record
+
+
+class TestLogs:
+
+    def test_json_record_has_event_fields(self):
+        line = JsonFormatter().format(make_record(
+            'Сбой: %s', 'нет связи', subscriber=7, homework='hw',
+            status='approved', latency=0.25))
+        event = json.loads(line)
+        assert event['message'] == 'Сбой: нет связи', (
+            'Сообщение должно собираться из шаблона и аргументов')
+        assert (event['subscriber'], event['homework'], event['status'],
+                event['latency']) == (7, 'hw', 'approved', 0.25), (
+            'Поля события из extra должны попадать в JSON')
+
+    def test_repeated_errors_sampled(self):
+        clock = FakeClock()
+        sampler = ErrorSampler(window=60, burst=2, clock=clock)
+        passed = [sampler.filter(make_record('Сбой: %s', number,
+                                             error='OSError'))
+                  for number in range(5)]
+        other = sampler.filter(make_record('Сбой: %s', 1, error='KeyError'))
+        info = sampler.filter(make_record('Опрос', level=logging.INFO))
+        assert passed == [True, True, False, False, False], (
+            'За окно должны проходить только первые burst одинаковых ошибок')
+        assert other and info, (
+            'Ошибки другого класса и информационные записи не прореживаются')
+        clock.now = 61
+        record = make_record('Сбой: %s', 9, error='OSError')
+        assert sampler.filter(record) and record.suppressed == 3, (
+            'В новом окне запись должна сообщать число отброшенных')
+
+    def test_slow_stream_does_not_block_caller(self):
+        stream = SlowStream()
+        listener = setup_logging(logging.INFO, 'json', stream=stream)
+        try:
+            started = time.perf_counter()
+            for number in range(50):
+                logging.info('Запись %s', number, extra={'subscriber': 1})
+            elapsed = time.perf_counter() - started
+        finally:
+            listener.stop()
+            logging.getLogger().handlers.clear()
+        lines = stream.getvalue().splitlines()
+        assert elapsed < 0.1, (
+            'Запись в журнал не должна ждать вывода в поток')
+        assert len(lines) == 50 and json.loads(lines[-1])['message'] == (
+            'Запись 49'), 'После stop() очередь должна быть дописана'
+
+    def test_full_queue_drops_records(self):
+        from metrics import LOG_DROPPED
+
+        before = LOG_DROPPED.value('queue_full')
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        handler.handle(make_record('Первая'))
+        handler.handle(make_record('Вторая'))
+        assert LOG_DROPPED.value('queue_full') == before + 1, (
+            'При переполнении очереди запись отбрасывается и учитывается')
+
+    def test_breaker_warnings_sampled(self, caplog):
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', threshold=1, recovery_time=10,
+                                 max_recovery_time=10 ** 6, clock=clock)
+        with caplog.at_level(logging.WARNING):
+            for _ in range(5):
+                clock.now += breaker.pause()
+                breaker.allow()
+                breaker.failed()
+        sampler = ErrorSampler(window=10 ** 6, burst=2, clock=clock)
+        assert len({record.getMessage() for record in caplog.records}) == 5
+        assert [sampler.filter(record) for record in caplog.records] == [
+            True, True, False, False, False], (
+            'Предупреждения с разными паузами - один шаблон, их нужно '
+            'прореживать')
@@ -0,0 +1,85 @@
+import time
+import urllib.request
+
+import requests
+
+from metrics import Counter, Gauge, Histogram, Registry, start_http_server
+from utils import MockBot
+
+
+class TestMetrics:
+
+    def test_render(self):
+        registry = Registry()
+        errors = Counter('errors_total', 'Ошибки', labels=('exception',),
+                         registry=registry)
+        depth = Gauge('depth', 'Очередь', registry=registry)
+        latency = Histogram('latency_seconds', 'Задержка',
+                            buckets=(0.1, 1), registry=registry)
+        errors.inc('TheAnswerIsNot200Error')
+        errors.inc('TheAnswerIsNot200Error')
+        depth.set_function(lambda: 3)
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+        text = registry.render()
+        assert 'errors_total{exception="TheAnswerIsNot200Error"} 2' in text
+        assert 'depth 3' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+
+    def test_exporter(self):
+        registry = Registry()
+        Gauge('answer', 'Ответ', registry=registry).set(42)
+        server = start_http_server(0, registry=registry)
+        try:
+            url = 'http://{}:{}/metrics'.format(*server.server_address)
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert 'answer 42' in response.read().decode()
+        finally:
+            server.shutdown()
+
+    def test_timer_overhead(self):
+        histogram = Histogram('overhead', 'Накладные расходы',
+                              registry=Registry())
+        count = 10000
+        start = time.perf_counter()
+        for _ in range(count):
+            with histogram.time():
+                pass
+        per_call = (time.perf_counter() - start) / count
+        assert histogram.count() == count
+        assert per_call < 20e-6, (
+            'Проверьте, что замер длительности стоит микросекунды'
+        )
+
+    def test_error_counted_by_class(self, monkeypatch):
+        import homework
+        import metrics
+        from subscriptions import Subscription
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', lambda *args: {})
+        before = metrics.ERRORS.value('TheResponseUnknownKey')
+        homework.check_subscription(MockBot(), Subscription('token', 1))
+        assert metrics.ERRORS.value('TheResponseUnknownKey') == before + 1
+
+    def test_network_error_counted_by_class(self, monkeypatch):
+        import homework
+        import metrics
+        from subscriptions import Subscription
+
+        def request_api(*args):
+            raise requests.ConnectionError('нет соединения')
+
+        monkeypatch.setattr(homework, 'request_api', request_api)
+        before = metrics.ERRORS.value('ConnectionError')
+        bot = MockBot()
+        homework.check_subscription(bot, Subscription('token-network', 1))
+        assert metrics.ERRORS.value('ConnectionError') == before + 1, (
+            'Сетевая ошибка должна считаться по своему классу'
+        )
+        assert bot.texts == ['Сбой в работе программы: нет соединения'], (
+            'Подписчик должен узнать о сетевой ошибке, а не о разборе None'
+        )
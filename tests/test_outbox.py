@@ -0,0 +1,173 @@
+import threading
+import time
+
+from telegram.error import BadRequest, RetryAfter, TimedOut
+
+from circuit import CLOSED, CircuitBreaker
+from outbox import Outbox, TokenBucket
+from sharding import ShardLeases
+from state_store import OutboxJournal
+from utils import FakeClock, MockBot
+
+
+class TestOutbox:
+
+    def test_token_bucket(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        bucket.consume()
+        bucket.consume()
+        assert bucket.delay() == 0.5, (
+            'Проверьте, что токены пополняются со скоростью rate'
+        )
+        clock.now = 10
+        assert bucket.delay() == 0
+        assert bucket.tokens == 2, 'Токенов не может быть больше capacity'
+
+    def test_merges_pending_messages(self):
+        bot = MockBot()
+        outbox = Outbox(bot)
+        for number in range(5):
+            outbox.send_message(1, f'message {number}')
+        outbox.send_message(2, 'other chat')
+        outbox.start()
+        assert outbox.join(timeout=5)
+        outbox.stop()
+        assert bot.sent == [
+            (1, '\n\n'.join(f'message {number}' for number in range(5))),
+            (2, 'other chat'),
+        ], 'Проверьте, что сообщения одного чата склеиваются'
+
+    def test_retry_after_and_network_errors(self):
+        bot = MockBot(errors=[RetryAfter(0.05), TimedOut(), None])
+        outbox = Outbox(bot, backoff=0.01).start()
+        outbox.send_message(1, 'text')
+        assert outbox.join(timeout=5)
+        outbox.stop()
+        assert bot.sent == [(1, 'text')], (
+            'Проверьте, что после RetryAfter и сетевой ошибки '
+            'сообщение отправляется повторно'
+        )
+
+    def test_bad_request_dropped(self):
+        bot = MockBot(errors=[BadRequest('chat not found')])
+        outbox = Outbox(bot).start()
+        outbox.send_message(1, 'text')
+        assert outbox.join(timeout=5)
+        outbox.stop()
+        assert bot.sent == [] and outbox.dropped == 1
+
+    def test_producer_does_not_block(self):
+        bot = MockBot(delay=0.2)
+        outbox = Outbox(bot).start()
+        start = time.perf_counter()
+        for chat_id in range(20):
+            outbox.send_message(chat_id, 'text')
+        assert time.perf_counter() - start < 0.1, (
+            'Проверьте, что постановка в очередь не ждёт Telegram'
+        )
+        outbox.stop(timeout=0)
+
+    def test_chat_rate_limit(self):
+        bot = MockBot()
+        outbox = Outbox(bot, chat_rate=20, chat_burst=1).start()
+        done = threading.Event()
+
+        def produce():
+            for number in range(5):
+                outbox.send_message(1, f'message {number}')
+                outbox.join(timeout=5)
+            done.set()
+
+        start = time.perf_counter()
+        threading.Thread(target=produce).start()
+        assert done.wait(timeout=5)
+        outbox.stop()
+        assert len(bot.sent) == 5
+        assert time.perf_counter() - start >= 4 / 20, (
+            'Проверьте, что соблюдается лимит сообщений на чат'
+        )
+
+    def test_breaker_pauses_sending(self):
+        bot = MockBot(errors=[TimedOut(), TimedOut(), TimedOut()])
+        breaker = CircuitBreaker('telegram', threshold=2, recovery_time=0.1,
+                                 max_recovery_time=1)
+        outbox = Outbox(bot, backoff=0.01, breaker=breaker).start()
+        start = time.perf_counter()
+        outbox.send_message(1, 'message')
+        assert outbox.join(timeout=5)
+        outbox.stop()
+        assert bot.sent == [(1, 'message')] and breaker.state == CLOSED
+        assert time.perf_counter() - start >= 0.1 + 0.2, (
+            'Проверьте, что при разомкнутом предохранителе отправка ждёт '
+            'пробной попытки, а пауза после неудачной пробы растёт'
+        )
+
+    def test_network_errors_never_drop(self):
+        bot = MockBot(errors=[TimedOut()] * 8)
+        outbox = Outbox(bot, chat_rate=1000, max_retries=2,
+                        backoff=0.001).start()
+        outbox.send_message(1, 'text')
+        assert outbox.join(timeout=5)
+        outbox.stop()
+        assert bot.sent == [(1, 'text')] and outbox.dropped == 0, (
+            'Проверьте, что сетевые ошибки не отменяют отправку'
+        )
+
+    def test_journal_resends_after_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        journal = OutboxJournal(path)
+        outage = MockBot(errors=[TimedOut()] * 1000)
+        outbox = Outbox(outage, backoff=0.01, journal=journal).start()
+        outbox.send_message(1, 'первое')
+        outbox.send_message(1, 'второе')
+        assert not outbox.join(timeout=0.2)
+        outbox.stop(timeout=0)
+        journal.close()
+        journal = OutboxJournal(path)
+        assert len(journal) == 2, 'Неотправленная очередь хранится в журнале'
+        bot = MockBot()
+        outbox = Outbox(bot, journal=journal).start()
+        assert outbox.join(timeout=5)
+        outbox.stop()
+        assert bot.sent == [(1, 'первое\n\nвторое')], (
+            'Проверьте, что после перезапуска очередь отправляется из журнала'
+        )
+        assert len(journal) == 0, 'Отправленные сообщения удаляются'
+        journal.close()
+
+    def test_journal_shared_by_workers(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        clock = FakeClock()
+        leases = ShardLeases(path, 'worker-a', ttl=60, clock=clock)
+        leases.heartbeat()
+        first = OutboxJournal(path, 'worker-a', clock)
+        first.add(1, 'от воркера A')
+        second = OutboxJournal(path, 'worker-b', clock)
+        bot = MockBot()
+        outbox = Outbox(bot, journal=second).start()
+        outbox.send_message(2, 'от воркера B')
+        assert outbox.join(timeout=5)
+        assert bot.sent == [(2, 'от воркера B')], (
+            'Воркер не должен отправлять очередь другого живого воркера'
+        )
+        assert first.claim() == [(1, 1, 'от воркера A')]
+        survivor = ShardLeases(path, 'worker-b', ttl=60, clock=clock,
+                               on_departed=outbox.adopt)
+        survivor.heartbeat()
+        clock.now = 61
+        survivor.heartbeat()
+        assert outbox.join(timeout=5)
+        assert bot.sent[-1] == (1, 'от воркера A'), (
+            'Очередь ушедшего воркера забирает живой воркер'
+        )
+        assert first.claim() == [], 'Сообщение забирает только один воркер'
+        restarted = Outbox(MockBot(), journal=second)
+        assert restarted.depth() == 0, (
+            'Доставленные сообщения не отправляются после перезапуска'
+        )
+        outbox.stop()
+        for connection in (leases.connection, survivor.connection):
+            connection.close()
+        first.close()
+        second.close()
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from os.path import abspath, dirname, join
+
+from benchmarks.fake_services import FakePracticum
+from profiling import AllocationTracker, Profiler, StackSampler
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+LEAK = []
+
+
+def busy_poll(stopped):
+    while not stopped.is_set():
+        sum(range(1000))
+
+
+def leaking_cycle():
+    LEAK.append(bytearray(10000))
+
+
+class TestProfiling:
+
+    def test_sampler_writes_folded_stacks(self, tmp_path):
+        stopped = threading.Event()
+        worker = threading.Thread(
+            target=busy_poll, args=(stopped,), name='poll')
+        worker.start()
+        sampler = StackSampler(0.001).start()
+        time.sleep(0.2)
+        sampler.stop()
+        stopped.set()
+        worker.join()
+        path = tmp_path / 'stacks.folded'
+        samples = sampler.dump(path)
+        lines = path.read_text().splitlines()
+        assert samples > 10 and lines
+        stacks = {}
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            stacks[stack] = int(count)
+        poll_stacks = [stack for stack in stacks if stack.startswith('poll;')]
+        assert poll_stacks, 'Стек начинается с имени потока'
+        assert any(stack.split(';')[-1].startswith('busy_poll ')
+                   for stack in poll_stacks), (
+            'Проверьте, что в стеке есть кадр работающей функции')
+        assert not sampler.stacks, 'После записи выборка сбрасывается'
+
+    def test_tracker_points_at_growing_site(self):
+        LEAK.clear()
+        tracker = AllocationTracker(frames=5, top=3).start()
+        try:
+            for _ in range(100):
+                leaking_cycle()
+            stats = tracker.diff()
+        finally:
+            tracker.stop()
+            LEAK.clear()
+        assert stats[0].size_diff >= 100 * 10000
+        assert stats[0].traceback[-1].lineno == (
+            leaking_cycle.__code__.co_firstlineno + 1), (
+            'Первым должно быть место, где память растёт')
+
+    def test_profiler_dumps_reports(self, tmp_path):
+        profiler = Profiler(str(tmp_path), interval=60,
+                            sample_interval=0.001).start()
+        for _ in range(20):
+            leaking_cycle()
+            time.sleep(0.005)
+        profiler.stop()
+        LEAK.clear()
+        assert (tmp_path / 'stacks-0001.folded').read_text()
+        report = (tmp_path / 'allocations-0001.txt').read_text()
+        assert 'test_profiling.py' in report, (
+            'В отчёте о памяти должно быть растущее место выделения')
+
+    def test_profile_mode_writes_reports(self, tmp_path):
+        practicum = FakePracticum()
+        url = practicum.start()
+        env = dict(
+            os.environ, PRACTICUM_TOKEN='token', TELEGRAM_TOKEN='123:fake',
+            CHAT_ID='1', STATE_FILE=str(tmp_path / 'state.sqlite3'),
+            PRACTICUM_ENDPOINT=url, HTTP_RETRIES='0', BOT_COMMANDS='0',
+            PROFILE_DIR=str(tmp_path / 'profile'))
+        try:
+            subprocess.run(
+                [sys.executable, join(ROOT, 'homework.py'), '--profile',
+                 '--once'], cwd=str(tmp_path), env=env, capture_output=True,
+                timeout=30, check=True)
+        finally:
+            practicum.stop()
+        assert sorted(os.listdir(tmp_path / 'profile')) == [
+            'allocations-0001.txt', 'stacks-0001.folded'], (
+            'С --profile при завершении должен записываться отчёт')
@@ -0,0 +1,188 @@
+import json
+
+import pytest
+
+import homework
+from state_store import StateStore
+from status_cache import StatusCache
+from subscriptions import PollScheduler, SubscriptionRegistry
+from utils import FakeClock
+
+
+class MockUpdater:
+
+    def __init__(self):
+        self.clients = []
+
+    def replace_bot(self, client):
+        self.clients.append(client)
+
+
+def write_config(directory, telegram_token, statuses, chats,
+                 practicum_token='token-main'):
+    statuses_file = directory / 'statuses.json'
+    statuses_file.write_text(json.dumps(statuses))
+    subscriptions_file = directory / 'subscriptions.json'
+    subscriptions_file.write_text(json.dumps(chats))
+    (directory / '.env').write_text(
+        f'PRACTICUM_TOKEN={practicum_token}\n'
+        f'TELEGRAM_TOKEN={telegram_token}\n'
+        'CHAT_ID=1\n'
+        f'HOMEWORK_STATUSES_FILE={statuses_file}\n'
+        f'SUBSCRIPTIONS_FILE={subscriptions_file}\n')
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'CHAT_ID',
+                 'HOMEWORK_STATUSES_FILE', 'SUBSCRIPTIONS_FILE'):
+        monkeypatch.setenv(name, '')
+    for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'CHAT_ID',
+                 'HOMEWORK_STATUSES', 'STATUS_TEMPLATES', 'API_DECODER'):
+        monkeypatch.setattr(homework, name, getattr(homework, name))
+    monkeypatch.setattr(homework, 'ENV_FILE', str(tmp_path / '.env'))
+    return tmp_path
+
+
+class TestReload:
+
+    def test_scheduler_reload_keeps_polls_exact(self):
+        interval = 60
+        tokens = [f'token-{number}' for number in range(20)]
+        registry = SubscriptionRegistry()
+        for number, token in enumerate(tokens):
+            registry.add(token, number)
+        clock = FakeClock()
+        polls = {}
+        reloads = []
+
+        def reload():
+            current = [token for token in tokens
+                       if len(reloads) % 2 == 0 or token != 'token-7']
+            added, _ = registry.sync(
+                {token: [tokens.index(token)] for token in current})
+            for subscription in added:
+                scheduler.schedule(subscription)
+            reloads.append(clock.now)
+
+        def poll(subscription):
+            polls.setdefault(subscription.token, []).append(clock.now)
+            if len(sum(polls.values(), [])) % 7 == 0:
+                scheduler.call_soon(reload)
+            if clock.now >= 3600:
+                scheduler.stop()
+
+        scheduler = PollScheduler(
+            registry, poll, interval, clock=clock, sleep=clock.sleep)
+        scheduler.run_forever()
+        assert len(reloads) > 50, 'Перечитывание должно выполняться часто'
+        for token in tokens:
+            gaps = [later - earlier for earlier, later
+                    in zip(polls[token], polls[token][1:])]
+            assert all(gap >= interval - 1e-6 for gap in gaps), (
+                'Перечитывание не должно приводить к повторным опросам')
+            if token != 'token-7':
+                assert gaps == pytest.approx([interval] * len(gaps)), (
+                    'Перечитывание не должно сдвигать и пропускать опросы '
+                    'оставшихся подписчиков')
+
+    def test_reload_config_applies_or_keeps(self, config_dir, tmp_path):
+        registry = SubscriptionRegistry()
+        registry.add('token-main', '1')
+        registry.add('token-old', '2')
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        clock = FakeClock()
+        scheduler = PollScheduler(
+            registry, lambda subscription: None, 60, clock=clock)
+        bot = MockUpdater()
+        write_config(config_dir, '123:new', {'approved': 'Принято!'},
+                     {'token-new': 3})
+        assert homework.reload_config(registry, store, scheduler, bot)
+        assert homework.HOMEWORK_STATUSES['approved'] == 'Принято!'
+        assert 'reviewing' in homework.HOMEWORK_STATUSES, (
+            'Файл вердиктов дополняет стандартные статусы')
+        assert sorted(sub.token for sub in registry) == [
+            'token-main', 'token-new'], (
+            'Проверьте, что список подписчиков приводится к файлу')
+        assert len(bot.clients) == 1, (
+            'При смене TELEGRAM_TOKEN клиент Telegram заменяется')
+        clock.now = 60
+        assert 'token-new' in [sub.token for sub in scheduler.pop_due()], (
+            'Новый подписчик должен попасть в расписание')
+        write_config(config_dir, '', {'approved': 'Другой вердикт'},
+                     {'token-other': 4})
+        assert not homework.reload_config(registry, store, scheduler, bot)
+        assert homework.TELEGRAM_TOKEN == '123:new'
+        assert homework.HOMEWORK_STATUSES['approved'] == 'Принято!', (
+            'Настройки с ошибками не должны применяться')
+        assert sorted(sub.token for sub in registry) == [
+            'token-main', 'token-new']
+        write_config(config_dir, '123:new', {}, {'token-new': []})
+        assert not homework.reload_config(registry, store, scheduler, bot), (
+            'Пустой список чатов подписчика - ошибка файла подписчиков')
+        assert sorted(sub.token for sub in registry) == [
+            'token-main', 'token-new']
+        store.close()
+
+    def test_malformed_telegram_token_keeps_config(self, config_dir,
+                                                   tmp_path, monkeypatch):
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token-main')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '123:old')
+        registry = SubscriptionRegistry()
+        registry.add('token-main', '1')
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        scheduler = PollScheduler(
+            registry, lambda subscription: None, 60, clock=FakeClock())
+        bot = MockUpdater()
+        write_config(config_dir, 'garbage', {'approved': 'Принято!'}, {},
+                     practicum_token='token-p2')
+        assert not homework.reload_config(registry, store, scheduler, bot), (
+            'Неверный TELEGRAM_TOKEN - ошибка настроек')
+        assert (homework.PRACTICUM_TOKEN, homework.TELEGRAM_TOKEN) == (
+            'token-main', '123:old'), (
+            'При ошибке настроек старые настройки не должны заменяться')
+        assert homework.HOMEWORK_STATUSES.get('approved') != 'Принято!'
+        assert bot.clients == [] and 'token-main' in registry
+        calls = []
+
+        def failing():
+            raise RuntimeError('сбой перечитывания')
+
+        scheduler.call_soon(failing)
+        scheduler.call_soon(lambda: calls.append(True))
+        scheduler.run_calls()
+        assert calls == [True], (
+            'Сбой отложенного вызова не должен останавливать цикл опроса')
+        store.close()
+
+    def test_rotated_token_keeps_state(self, config_dir, tmp_path,
+                                       monkeypatch):
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        registry = SubscriptionRegistry()
+        subscription = registry.add('token-main', '1', 1000)
+        homework.STATUS_CACHE.changed('token-main', {
+            'id': 7, 'homework_name': 'hw', 'status': 'reviewing'})
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        store.checkpoint(subscription, homework.STATUS_CACHE)
+        subscription.from_date = 2000
+        scheduler = PollScheduler(
+            registry, lambda subscription: None, 60, clock=FakeClock())
+        write_config(config_dir, '123:new', {}, {},
+                     practicum_token='token-rotated')
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token-main')
+        monkeypatch.setattr(homework, 'CHAT_ID', '1')
+        assert homework.reload_config(registry, store, scheduler)
+        rotated = registry.get('token-rotated')
+        assert 'token-main' not in registry and rotated is not None
+        assert rotated.from_date == 2000, (
+            'Новый токен того же чата продолжает опрос с from_date старого')
+        assert homework.STATUS_CACHE.statuses('token-rotated') == [
+            ('hw', 'reviewing', None)], (
+            'Статусы домашек переносятся на новый токен')
+        restored = SubscriptionRegistry()
+        restored.add('token-rotated', '1')
+        cache = StatusCache()
+        store.restore(restored, cache)
+        assert cache.statuses('token-rotated') == [('7', 'reviewing', None)], (
+            'Чекпоинт тоже переносится на новый токен')
+        store.close()
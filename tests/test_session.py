@@ -0,0 +1,80 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from session import PooledSession
+
+
+class HomeworkStatusesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSession:
+
+    def test_connection_reused(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                     HomeworkStatusesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://{}:{}/'.format(*server.server_address)
+        session = PooledSession(pool_size=2, retries=0)
+        try:
+            for _ in range(5):
+                response = session.get(url, timeout=1)
+                assert response.json()['current_date'] == 1
+            stats = session.connection_stats()
+        finally:
+            server.shutdown()
+            session.close()
+        assert stats == {'opened': 1, 'reused': 4}, (
+            'Проверьте, что соединение с API переиспользуется'
+        )
+
+    def test_get_api_answer_uses_timeout(self, monkeypatch, api_url):
+        import homework
+
+        calls = []
+
+        class MockResponse:
+            status_code = 200
+
+            def json(self):
+                return {'homeworks': [], 'current_date': 1}
+
+        def mock_get(url, **kwargs):
+            calls.append(kwargs)
+            return MockResponse()
+
+        monkeypatch.setattr(homework.get_session(), 'get', mock_get)
+        homework.get_api_answer(api_url, 1)
+        assert calls[0]['timeout'] == (
+            homework.CONNECT_TIMEOUT, homework.READ_TIMEOUT), (
+            'Проверьте, что запрос к API выполняется с таймаутом'
+        )
+
+    def test_rate_limit_retry_after(self, monkeypatch, api_url):
+        import homework
+
+        class MockResponse:
+            status_code = 429
+            headers = {'Retry-After': '120'}
+
+        monkeypatch.setattr(homework.get_session(), 'get',
+                            lambda url, **kwargs: MockResponse())
+        try:
+            homework.get_api_answer(api_url, 1)
+        except homework.TheRateLimitError as error:
+            assert error.retry_after == 120
+            return
+        assert False, (
+            'Проверьте, что ответ 429 передаёт подсказку Retry-After'
+        )
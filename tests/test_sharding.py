@@ -0,0 +1,126 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from os.path import abspath, dirname, join
+
+import pytest
+
+from benchmarks.fake_services import FakePracticum, FakeTelegram
+from sharding import HashRing, ShardLeases
+from utils import FakeClock
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+def start_worker(number, url, telegram_url, directory):
+    env = dict(
+        os.environ,
+        PRACTICUM_TOKEN='token-0', TELEGRAM_TOKEN='123:fake', CHAT_ID='0',
+        SUBSCRIPTIONS_FILE=join(directory, 'subscriptions.json'),
+        STATE_FILE=join(directory, 'state.sqlite3'),
+        SHARDING='1', SHARD_TTL='1.5', WORKER_ID=f'worker-{number}',
+        BOT_COMMANDS='0', RETRY_TIME='1', REVIEWING_RETRY_TIME='1',
+        MAX_RETRY_TIME='2', READ_TIMEOUT='1', HTTP_RETRIES='0',
+        PRACTICUM_ENDPOINT=url, TELEGRAM_API_URL=telegram_url)
+    return subprocess.Popen(
+        [sys.executable, join(ROOT, 'homework.py')], cwd=directory, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class TestSharding:
+
+    def test_ring_moves_only_departed_tokens(self):
+        tokens = [f'token-{number}' for number in range(1000)]
+        full = HashRing(['a', 'b', 'c'])
+        reduced = HashRing(['a', 'b'])
+        owners = {token: full.owner(token) for token in tokens}
+        shares = {member: list(owners.values()).count(member)
+                  for member in 'abc'}
+        assert min(shares.values()) > 200, (
+            'Проверьте, что токены распределены между воркерами равномерно')
+        moved = [token for token in tokens
+                 if reduced.owner(token) != owners[token]]
+        assert all(owners[token] == 'c' for token in moved), (
+            'При уходе воркера должны переезжать только его токены')
+
+    def test_lease_is_exclusive_until_expired(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'state.sqlite3')
+        first = ShardLeases(path, 'a', ttl=10, clock=clock)
+        second = ShardLeases(path, 'b', ttl=10, clock=clock)
+        assert first.acquire('token') is True
+        assert first.acquire('token') is False, (
+            'Повторная аренда своим воркером - продление')
+        assert second.acquire('token') is None, (
+            'Действующая аренда не должна переходить другому воркеру')
+        clock.now = 11
+        assert second.acquire('token') is True, (
+            'Истёкшая аренда должна переходить другому воркеру')
+        second.release('token')
+        assert first.acquire('token') is True
+        first.heartbeat()
+        second.heartbeat()
+        assert first.leader and not second.leader, (
+            'Лидер - живой воркер с наименьшим именем')
+
+    @pytest.mark.parametrize('killed', [False, True])
+    def test_statuses_delivered_when_workers_stop(self, tmp_path, killed):
+        start = time.time()
+        rng = random.Random(1)
+        # Подписчики убитого воркера переходят к остальным через
+        # SHARD_TTL: статус, продержавшийся меньше, опрос может не
+        # застать, поэтому в этом случае ревью идёт дольше.
+        review = 5 if killed else 2
+        timelines = {}
+        for number in range(12):
+            name = f'hw-{number}'
+            taken = start + rng.uniform(3, 8)
+            timelines[f'token-{number}'] = [
+                (taken, 1, name, 'reviewing'),
+                (taken + review + rng.uniform(0, 1), 1, name, 'approved')]
+        (tmp_path / 'subscriptions.json').write_text(json.dumps(
+            {token: number for number, token in enumerate(timelines)}))
+        practicum = FakePracticum(timelines)
+        telegram = FakeTelegram()
+        url = practicum.start()
+        telegram_url = telegram.start()
+        workers = [start_worker(number, url, telegram_url, str(tmp_path))
+                   for number in range(3)]
+        try:
+            for moment, worker in ((4.5, workers[0]), (7.5, workers[1])):
+                time.sleep(max(start + moment - time.time(), 0))
+                if killed:
+                    worker.kill()
+                else:
+                    worker.terminate()
+            time.sleep(max(start + review + 12 - time.time(), 0))
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait(timeout=10)
+            practicum.stop()
+            telegram.stop()
+        texts = [
+            line for _, _, text in telegram.deliveries
+            for line in text.split('\n\n')
+            if line.startswith('Изменился статус')]
+        for number in range(12):
+            for verdict in ('Работа взята на проверку ревьюером.',
+                            'Работа проверена: ревьюеру всё понравилось. '
+                            'Ура!'):
+                message = (f'Изменился статус проверки работы '
+                           f'"hw-{number}". {verdict}')
+                if not killed:
+                    assert texts.count(message) == 1, (
+                        'Каждая смена статуса должна быть доставлена ровно '
+                        'один раз, когда воркеры останавливаются '
+                        f'посреди работы: {message}')
+                    continue
+                assert 1 <= texts.count(message) <= 2, (
+                    'Убитый воркер не должен терять уведомления: его '
+                    'очередь и подписчиков забирают остальные, повтор '
+                    f'возможен только для последнего опроса: {message}')
@@ -0,0 +1,181 @@
+import json
+import socketserver
+import threading
+import time
+
+import pytest
+
+from sinks import (AuditSink, EmailSink, FanOut, Sink, SinkWorker,
+                   TelegramSink, load_sinks)
+from status_cache import StatusCache
+from subscriptions import SubscriptionRegistry
+
+
+class SlowSink(Sink):
+
+    name = 'slow'
+
+    def __init__(self, delay):
+        super().__init__(timeout=1, retries=0)
+        self.delay = delay
+        self.sent = []
+
+    def send(self, chat_id, text):
+        time.sleep(self.delay)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+class FailingSink(Sink):
+
+    name = 'failing'
+
+    def __init__(self, retries):
+        super().__init__(timeout=1, retries=retries)
+        self.attempts = 0
+
+    def send(self, chat_id, text):
+        self.attempts += 1
+        raise OSError('получатель недоступен')
+
+
+class MockOutbox:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+    def join(self, timeout=None):
+        return True
+
+    def stop(self, timeout=None):
+        pass
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письмо и запоминает его."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 localhost')
+        data = None
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            if data is not None:
+                if line == '.':
+                    self.server.messages.append('\n'.join(data))
+                    data = None
+                    self.reply('250 OK')
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command == 'DATA':
+                data = []
+                self.reply('354 End data with .')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class TestSinks:
+
+    def test_slow_sink_does_not_delay_others(self):
+        slow = SlowSink(0.5)
+        fast = SlowSink(0)
+        fanout = FanOut([slow, fast]).start()
+        started = time.monotonic()
+        fanout.send_message(1, 'текст')
+        queued = time.monotonic() - started
+        assert fanout.join(timeout=5), 'Очереди получателей не опустели'
+        fanout.stop(timeout=1)
+        assert queued < 0.05, (
+            'send_message не должен ждать доставки получателям')
+        assert fast.sent[0][2] - started < 0.1, (
+            'Медленный получатель не должен задерживать остальных')
+        assert slow.sent[0][:2] == fast.sent[0][:2] == (1, 'текст')
+
+    def test_failed_sink_retried_then_counted(self):
+        from metrics import SINK_FAILURES
+
+        sink = FailingSink(retries=2)
+        before = SINK_FAILURES.value('failing')
+        assert not SinkWorker(sink, backoff=0.001).deliver([1], 'текст')
+        assert sink.attempts == 3, 'Проверьте число повторов доставки'
+        assert SINK_FAILURES.value('failing') == before + 1, (
+            'Недоставленное уведомление должно учитываться в метриках')
+
+    def test_sink_timeout_bounds_attempt(self, tmp_path):
+        sink = SlowSink(1)
+        sink.timeout = 0.1
+        started = time.monotonic()
+        assert not SinkWorker(sink).deliver([1], 'текст')
+        assert time.monotonic() - started < 0.5, (
+            'Попытка доставки не должна длиться дольше timeout получателя')
+        path = tmp_path / 'sinks.json'
+        path.write_text(json.dumps([
+            {'type': 'telegram', 'chat_ids': [5], 'timeout': 3}]))
+        telegram, = load_sinks(str(path), MockOutbox())
+        assert (telegram.chat_ids, telegram.timeout) == ([5], 3), (
+            'timeout записи telegram должен передаваться получателю')
+        with pytest.raises(TypeError):
+            Sink()
+
+    def test_audit_and_email_sinks(self, tmp_path):
+        server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), SMTPHandler)
+        server.messages = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        path = tmp_path / 'audit.jsonl'
+        fanout = FanOut([
+            AuditSink(str(path)),
+            EmailSink('127.0.0.1', server.server_address[1],
+                      'bot@localhost', ['student@localhost'], timeout=5),
+        ]).start()
+        fanout.send_message(7, 'Изменился статус\nподробности')
+        fanout.join(timeout=5)
+        fanout.stop(timeout=1)
+        server.shutdown()
+        server.server_close()
+        record = json.loads(path.read_text(encoding='utf-8'))
+        assert (record['chat_id'], record['text']) == (
+            7, 'Изменился статус\nподробности'), (
+            'Журнал должен содержать строку JSON на уведомление')
+        assert len(server.messages) == 1, 'Письмо не доставлено'
+        assert 'Subject: Изменился статус' in server.messages[0] or (
+            'Subject: =?utf-8?' in server.messages[0]), (
+            'Тема письма - первая строка уведомления')
+
+    def test_status_templates_keep_braces(self):
+        import homework
+
+        templates = homework.status_templates({'odd': 'Вердикт {x}.'})
+        assert templates['odd'].format(name='hw') == (
+            'Изменился статус проверки работы "hw". Вердикт {x}.'), (
+            'Фигурные скобки в вердикте не должны считаться полями шаблона')
+
+    def test_watchers_get_one_delivery_per_sink(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'fetch_api_answer', lambda *args: {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 42})
+        registry = SubscriptionRegistry()
+        for chat_id in range(5):
+            subscription = registry.add('token', chat_id)
+        outbox = MockOutbox()
+        audit = SlowSink(0)
+        fanout = FanOut([TelegramSink(outbox, [100, 3]), audit]).start()
+        homework.check_subscription(fanout, subscription)
+        assert fanout.join(timeout=5)
+        fanout.stop(timeout=1)
+        assert [chat_id for chat_id, _ in outbox.sent] == [0, 1, 2, 3, 4, 100], (
+            'Каждый чат Telegram должен получить уведомление один раз')
+        assert [chat_id for chat_id, _, _ in audit.sent] == [0], (
+            'Остальные получатели получают уведомление один раз на событие')
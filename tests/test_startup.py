@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from os.path import abspath, dirname, join
+
+from benchmarks.fake_services import FakePracticum, FakeTelegram
+from utils import MockBot
+
+ROOT = dirname(dirname(abspath(__file__)))
+RUN_ONCE = '''
+import sys
+import homework
+homework.run_once()
+print('telegram' in sys.modules, 'asyncio' in sys.modules)
+'''
+
+
+def run_once(directory, url, telegram_url):
+    env = dict(
+        os.environ, PRACTICUM_TOKEN='token', TELEGRAM_TOKEN='123:fake',
+        CHAT_ID='1', STATE_FILE=join(directory, 'state.sqlite3'),
+        PRACTICUM_ENDPOINT=url, TELEGRAM_API_URL=telegram_url,
+        HTTP_RETRIES='0', BOT_COMMANDS='0')
+    result = subprocess.run(
+        [sys.executable, '-c', RUN_ONCE], cwd=ROOT, env=env,
+        capture_output=True, text=True, timeout=30, check=True)
+    return result.stdout.split()
+
+
+class TestStartup:
+
+    def test_import_does_not_load_telegram(self):
+        result = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, homework; '
+             'print("telegram" in sys.modules, "asyncio" in sys.modules)'],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        assert result.stdout.split() == ['False', 'False'], (
+            'Импорт homework не должен загружать telegram и asyncio')
+
+    def test_import_does_not_load_http_stack(self):
+        result = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, homework; '
+             'print(*[name in sys.modules for name in ('
+             '"requests", "urllib3", "http.server", "session")])'],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        assert result.stdout.split() == ['False'] * 4, (
+            'Импорт homework не должен загружать requests, urllib3 и '
+            'http.server: сессия создаётся при первом запросе')
+
+    def test_once_polls_notifies_and_exits(self, tmp_path):
+        practicum = FakePracticum()
+        telegram = FakeTelegram()
+        url = practicum.start()
+        telegram_url = telegram.start()
+        try:
+            loaded = run_once(str(tmp_path), url, telegram_url)
+            assert loaded == ['False', 'False'] and not telegram.deliveries, (
+                'Без новых статусов --once не должен загружать telegram '
+                'и ничего не отправляет')
+            practicum.timelines['token'] = [
+                (time.time(), 1, 'hw', 'approved')]
+            run_once(str(tmp_path), url, telegram_url)
+            run_once(str(tmp_path), url, telegram_url)
+        finally:
+            practicum.stop()
+            telegram.stop()
+        assert [text for _, _, text in telegram.deliveries] == [
+            'Изменился статус проверки работы "hw". Работа проверена: '
+            'ревьюеру всё понравилось. Ура!'], (
+            'Новый статус должен быть отправлен один раз: --once '
+            'продолжает с from_date из чекпоинта')
+
+    def test_lazy_bot_created_once(self):
+        import homework
+
+        created = []
+
+        def factory():
+            time.sleep(0.05)
+            created.append(object())
+            return MockBot()
+
+        bot = homework.LazyBot(factory)
+        threads = [
+            threading.Thread(target=bot.send_message, args=(number, 'текст'))
+            for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(created) == 1, (
+            'Одновременные первые отправки должны создавать одного бота')
+        assert len(bot.bot.sent) == 8
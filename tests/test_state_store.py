@@ -0,0 +1,68 @@
+from state_store import StateStore
+from status_cache import StatusCache
+from subscriptions import SubscriptionRegistry
+from utils import MockBot
+
+
+RESPONSE = {
+    'homeworks': [
+        {'id': 7, 'homework_name': 'hw', 'status': 'approved',
+         'date_updated': '2021-11-01T10:00:00Z'},
+    ],
+    'current_date': 1636000000,
+}
+
+
+class TestStateStore:
+
+    def run_process(self, monkeypatch, path, response):
+        import homework
+
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'fetch_api_answer',
+                            lambda *args: response)
+        registry = SubscriptionRegistry()
+        subscription = registry.add('token', 1, 1)
+        store = StateStore(path)
+        store.restore(registry, homework.STATUS_CACHE)
+        bot = MockBot()
+        homework.check_subscription(bot, subscription, store=store)
+        store.close()
+        return bot, subscription
+
+    def test_warm_restart_does_not_resend(self, monkeypatch, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        bot, subscription = self.run_process(monkeypatch, path, RESPONSE)
+        assert len(bot.sent) == 1
+        assert subscription.from_date == RESPONSE['current_date']
+        bot, subscription = self.run_process(monkeypatch, path, RESPONSE)
+        assert bot.sent == [], (
+            'Проверьте, что после перезапуска уведомления не повторяются'
+        )
+
+    def test_restore_from_date_and_error_flag(self, monkeypatch, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        self.run_process(monkeypatch, path, {})
+        registry = SubscriptionRegistry()
+        subscription = registry.add('token', 1, 1)
+        store = StateStore(path)
+        assert store.restore(registry, StatusCache()) == 1
+        store.close()
+        assert subscription.send_error is False, (
+            'Проверьте, что об ошибке не сообщается повторно после перезапуска'
+        )
+        bot, subscription = self.run_process(monkeypatch, path, RESPONSE)
+        assert subscription.from_date == RESPONSE['current_date']
+
+    def test_error_window_survives_restarts(self, monkeypatch, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        unknown_status = {'homeworks': [
+            {'homework_name': 'hw', 'status': 'unknown'}]}
+        sent = []
+        for response in ({}, {}, unknown_status, {}):
+            bot, _ = self.run_process(monkeypatch, path, response)
+            sent.append(len(bot.sent))
+        assert sent == [1, 0, 1, 0], (
+            'Проверьте, что окно сообщений об ошибке действует между '
+            'перезапусками, а об ошибке другого вида сообщается сразу'
+        )
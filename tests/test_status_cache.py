@@ -0,0 +1,77 @@
+from status_cache import StatusCache
+from subscriptions import Subscription
+from utils import MockBot
+
+
+class MockResponse:
+
+    def __init__(self, status_code=200, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+
+class TestStatusCache:
+
+    def test_changed_only_on_transition(self):
+        cache = StatusCache()
+        homework = {'id': 1, 'status': 'reviewing', 'date_updated': 'a'}
+        assert cache.changed('token', homework)
+        assert not cache.changed('token', dict(homework))
+        assert cache.changed('other', homework), (
+            'Проверьте, что статусы разных подписчиков хранятся отдельно'
+        )
+        assert cache.changed(
+            'token', {'id': 1, 'status': 'approved', 'date_updated': 'b'})
+        assert cache.stats()['hits'] == 1
+
+    def test_notification_only_on_transition(self, monkeypatch):
+        import homework
+
+        answers = iter([
+            {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                            'status': 'reviewing'}], 'current_date': 1},
+            {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                            'status': 'reviewing'}], 'current_date': 2},
+            {'homeworks': [], 'current_date': 3},
+            {'homeworks': [{'id': 1, 'homework_name': 'hw',
+                            'status': 'approved'}], 'current_date': 4},
+        ])
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        monkeypatch.setattr(homework, 'fetch_api_answer',
+                            lambda *args: next(answers))
+        bot = MockBot()
+        subscription = Subscription('token', 1)
+        for _ in range(4):
+            homework.check_subscription(bot, subscription)
+        assert len(bot.sent) == 2, (
+            'Проверьте, что уведомление отправляется только при смене статуса'
+        )
+        assert subscription.from_date == 4
+
+    def test_conditional_request(self, monkeypatch, api_url):
+        import homework
+
+        requests_headers = []
+        responses = iter([
+            MockResponse(data={'homeworks': [], 'current_date': 5},
+                         headers={'ETag': '"v1"'}),
+            MockResponse(status_code=304),
+        ])
+
+        def mock_get(url, headers=None, **kwargs):
+            requests_headers.append(headers)
+            return next(responses)
+
+        monkeypatch.setattr(homework.get_session(), 'get', mock_get)
+        cache = StatusCache()
+        homework.fetch_api_answer(api_url, 1, 'token', cache)
+        result = homework.fetch_api_answer(api_url, 5, 'token', cache)
+        assert requests_headers[1]['If-None-Match'] == '"v1"', (
+            'Проверьте, что повторный запрос содержит If-None-Match'
+        )
+        assert result == {'homeworks': [], 'current_date': 5}
+        assert cache.stats()['hits'] == 1
@@ -0,0 +1,134 @@
+import json
+
+from subscriptions import (AdaptivePolicy, PollScheduler, Subscription,
+                           SubscriptionRegistry, request_budget)
+from utils import FakeClock
+
+
+class TestSubscriptions:
+
+    def test_registry_load(self, tmp_path):
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps({'token-1': 1, 'token-2': 2}))
+        registry = SubscriptionRegistry().load(path)
+        assert len(registry) == 2, (
+            'Проверьте, что реестр загружает всех подписчиков из файла'
+        )
+        assert registry.get('token-2').chat_id == 2
+
+    def test_scheduler_spreads_polls(self):
+        registry = SubscriptionRegistry()
+        for number in range(100):
+            registry.add(f'token-{number}', number)
+        clock = FakeClock()
+        polled = []
+        scheduler = PollScheduler(
+            registry, polled.append, interval=600, clock=clock)
+        clock.now = 300
+        first_half = scheduler.run_pending()
+        assert 0 < first_half < 100, (
+            'Проверьте, что опросы распределены по окну RETRY_TIME'
+        )
+        clock.now = 600
+        scheduler.run_pending()
+        assert len(polled) == 100
+        assert len({sub.token for sub in polled}) == 100, (
+            'Проверьте, что каждый подписчик опрошен ровно один раз за окно'
+        )
+
+    def test_scheduler_skips_removed(self):
+        registry = SubscriptionRegistry()
+        registry.add('token-1', 1)
+        registry.add('token-2', 2)
+        clock = FakeClock()
+        polled = []
+        scheduler = PollScheduler(
+            registry, polled.append, interval=600, clock=clock)
+        registry.remove('token-1')
+        clock.now = 600
+        scheduler.run_pending()
+        assert [sub.token for sub in polled] == ['token-2']
+
+    def test_adaptive_policy(self):
+        policy = AdaptivePolicy(
+            base=600, fast=60, maximum=3600, idle_polls=2, jitter=0)
+        subscription = Subscription('token', 1)
+        assert policy.next_interval(subscription) == 600
+        subscription.poll_succeeded(['reviewing'])
+        assert policy.next_interval(subscription) == 60, (
+            'Проверьте, что работа на ревью опрашивается чаще'
+        )
+        subscription.poll_failed()
+        subscription.poll_failed()
+        assert policy.next_interval(subscription) == 1200, (
+            'Проверьте экспоненциальную паузу после ошибок'
+        )
+        for _ in range(10):
+            subscription.poll_failed()
+        assert policy.next_interval(subscription) == 3600
+        subscription.poll_failed(retry_after=7200)
+        assert policy.next_interval(subscription) == 7200, (
+            'Проверьте, что соблюдается Retry-After от сервера'
+        )
+        subscription.poll_succeeded([])
+        subscription.poll_succeeded(['approved'])
+        for _ in range(4):
+            subscription.poll_succeeded([])
+        assert policy.next_interval(subscription) == 2400, (
+            'Проверьте, что после простоя интервал растёт'
+        )
+
+    def test_jitter_bounds(self):
+        policy = AdaptivePolicy(
+            base=600, fast=60, maximum=3600, idle_polls=2, jitter=0.1,
+            random=lambda: 1.0)
+        assert policy.next_interval(Subscription('token', 1)) == 660
+
+    def test_scheduler_uses_policy(self):
+        registry = SubscriptionRegistry()
+        registry.add('token', 1)
+        clock = FakeClock()
+        policy = AdaptivePolicy(
+            base=600, fast=60, maximum=3600, idle_polls=2, jitter=0)
+
+        def poll(subscription):
+            subscription.poll_succeeded(['reviewing'])
+
+        scheduler = PollScheduler(registry, poll, 600, policy, clock=clock)
+        clock.now = scheduler.next_due()
+        scheduler.run_pending()
+        assert scheduler.next_due() == clock.now + 60
+
+    def test_budget_limits_requests_and_stays_fair(self):
+        registry = SubscriptionRegistry()
+        for number in range(300):
+            registry.add(f'token-{number}', number).reviewing = (
+                number % 10 == 0)
+        clock = FakeClock()
+        policy = AdaptivePolicy(
+            base=600, fast=120, maximum=3600, idle_polls=1000, jitter=0)
+        polls = {subscription.token: [] for subscription in registry}
+
+        def poll(subscription):
+            polls[subscription.token].append(clock.now)
+
+        scheduler = PollScheduler(
+            registry, poll, 600, policy, clock=clock,
+            budget=request_budget(20, clock))
+        while clock.now < 2 * 60 * 60:
+            scheduler.run_pending()
+            clock.now += max(scheduler.delay(), 0.1)
+        moments = sorted(moment for times in polls.values()
+                         for moment in times)
+        assert len(moments) <= 20 * 120 + 10 / 60 * 20 + 1, (
+            'Опросов не должно быть больше бюджета запросов')
+        reviewing = [len(polls[f'token-{number}'])
+                     for number in range(0, 300, 10)]
+        others = [len(times) for token, times in polls.items()
+                  if int(token.split('-')[1]) % 10]
+        assert min(reviewing) > max(others), (
+            'При нехватке бюджета работы на ревью должны опрашиваться чаще')
+        gaps = [later - earlier for times in polls.values()
+                for earlier, later in zip([0] + times, times)]
+        assert min(others) >= 2 and max(gaps) < 40 * 60, (
+            'При нехватке бюджета никто из подписчиков не должен голодать')
@@ -1,3 +1,4 @@
+import time
 from inspect import signature
 from types import ModuleType
 
@@ -20,3 +21,42 @@ def check_function(scope: ModuleType, func_name: str, params_qty: int = 0):
         f'Функция `{func_name}` должна принимать '
         'количество аргументов: {params_qty}'
     )
+
+
+class FakeClock:
+    """Часы, которые тест сдвигает вручную через now или sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += max(delay, 0)
+
+
+class MockBot:
+    """Бот, который запоминает отправленные сообщения.
+
+    errors - исключения для первых отправок по порядку, None вместо
+    исключения означает успешную отправку; delay - пауза перед каждой
+    отправкой.
+    """
+
+    def __init__(self, errors=(), delay=0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.sent = []
+
+    @property
+    def texts(self):
+        return [text for _, text in self.sent]
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.delay)
+        if self.errors:
+            error = self.errors.pop(0)
+            if error:
+                raise error
+        self.sent.append((chat_id, text))